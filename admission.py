@@ -0,0 +1,165 @@
+"""
+Admission Control pro eMISTR MCP Server
+Omezení souběžně zpracovávaných tool volání podle třídy zátěže s ohraničenou
+frontou; při plné frontě se požadavek hned odmítne s doporučením, kdy to zkusit znovu
+"""
+
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger('emistr-mcp.admission')
+
+
+DEFAULT_ADMISSION_CONFIG = {
+    "concurrency": 16,    # souběžně zpracovávaná volání třídy
+    "queue_depth": 32,    # max. čekajících; další se hned odmítnou
+    "queue_timeout": 5,   # s; déle se na volné místo nečeká (odmítnutí)
+}
+
+# Nejkratší a nejdelší doporučení Retry-After (s)
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class AdmissionRejected(Exception):
+    """Fronta třídy zátěže je plná (nebo se na místo čekalo déle než queue_timeout)"""
+
+    def __init__(self, workload: str, retry_after: int, reason: str = "queue full"):
+        self.workload = workload
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f"Admission queue of workload '{workload}' rejected the call ({reason})")
+
+
+class _Gate:
+    """Semafor jedné třídy s počty čekajících a průměrnou dobou obsluhy"""
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        self.name = name
+        self.concurrency = max(1, int(config['concurrency']))
+        self.queue_depth = max(0, int(config['queue_depth']))
+        self.queue_timeout = float(config['queue_timeout'] or 0) or None
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Exponenciálně vážený průměr doby obsluhy (s) pro odhad Retry-After
+        self.avg_service: Optional[float] = None
+
+    async def acquire(self) -> bool:
+        """Počká na místo ve třídě nejdéle queue_timeout; False = nedočkalo se.
+
+        Čekání na semafor běží v samostatné úloze: pokud se místo uvolní právě
+        ve chvíli vypršení limitu (nebo zrušení volajícího), získané místo se
+        vrátí, místo aby se ztratilo.
+        """
+        if not self.queue_timeout:
+            await self._semaphore.acquire()
+            return True
+        waiter = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            return False
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        waiter.add_done_callback(self._release_if_acquired)
+
+    def _release_if_acquired(self, waiter: asyncio.Future) -> None:
+        if not waiter.cancelled() and waiter.exception() is None:
+            self._semaphore.release()
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+    def retry_after(self) -> int:
+        """Odhad, za jak dlouho se fronta uvolní: (čekající + 1) / souběh * průměrná doba obsluhy"""
+        service = self.avg_service if self.avg_service is not None else 1.0
+        estimate = (self.waiting + 1) / self.concurrency * service
+        return int(min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(estimate))))
+
+    def observe(self, duration: float) -> None:
+        self.avg_service = duration if self.avg_service is None else 0.8 * self.avg_service + 0.2 * duration
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'concurrency': self.concurrency,
+            'queue_depth': self.queue_depth,
+            'active': self.active,
+            'waiting': self.waiting,
+            'peak_waiting': self.peak_waiting,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'avg_service_ms': round(self.avg_service * 1000, 1) if self.avg_service is not None else None,
+            'retry_after': self.retry_after(),
+        }
+
+
+class AdmissionController:
+    """Vstupní fronty podle třídy zátěže (sekce admission).
+
+    Konfigurace: 'default' platí pro třídy bez vlastního nastavení,
+    'workloads' přepisuje hodnoty pro jednotlivé třídy (názvy jako
+    database.workloads).
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.defaults = dict(DEFAULT_ADMISSION_CONFIG)
+        self.defaults.update(config.get('default') or {})
+        self.workload_config: Dict[str, Dict[str, Any]] = dict(config.get('workloads') or {})
+        self._gates: Dict[str, _Gate] = {}
+
+    def _gate(self, workload: str) -> _Gate:
+        gate = self._gates.get(workload)
+        if gate is None:
+            cfg = dict(self.defaults)
+            cfg.update(self.workload_config.get(workload) or {})
+            gate = self._gates[workload] = _Gate(workload, cfg)
+        return gate
+
+    @asynccontextmanager
+    async def admit(self, workload: str):
+        """Počká na místo ve třídě; při plné frontě nebo po queue_timeout vyhodí AdmissionRejected"""
+        gate = self._gate(workload)
+        if gate.active >= gate.concurrency and gate.waiting >= gate.queue_depth:
+            gate.rejected += 1
+            raise AdmissionRejected(workload, gate.retry_after())
+
+        gate.waiting += 1
+        gate.peak_waiting = max(gate.peak_waiting, gate.waiting)
+        try:
+            acquired = await gate.acquire()
+        finally:
+            gate.waiting -= 1
+        if not acquired:
+            gate.rejected += 1
+            gate.timed_out += 1
+            raise AdmissionRejected(workload, gate.retry_after(), "queue timeout")
+
+        gate.active += 1
+        gate.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            gate.observe(time.monotonic() - started)
+            gate.active -= 1
+            gate.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: gate.stats() for name, gate in self._gates.items()}
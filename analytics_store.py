@@ -0,0 +1,430 @@
+"""
+Analytics Store pro eMISTR MCP Server
+Volitelný lokální sloupcový snapshot (DuckDB) tabulek pro agregace - periodická
+inkrementální kopie podle id watermarku; analytické tools pak nezatěžují ERP databázi
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+try:
+    import duckdb
+    import pyarrow
+except ImportError:  # volitelné závislosti
+    duckdb = None
+    pyarrow = None
+
+logger = logging.getLogger('emistr-mcp.analytics')
+
+
+# Kopírované tabulky: sloupce (kopírují se ty, které ve schématu existují),
+# watermark ('id' = inkrementálně podle id, None = vždy celá tabulka) a okno
+# opakované kopie pozdě měněných řádků (refresh_column >= dnes - refresh_days)
+SNAPSHOT_TABLES: Dict[str, Dict[str, Any]] = {
+    "readdata": {
+        "columns": ["id", "worker_id", "order_id", "operation_id", "start", "finish", "datum", "real_time"],
+        "watermark": "id",
+        "refresh_column": "start",
+        "refresh_days": 2,
+    },
+    "sklad_material_pohyb": {
+        "columns": ["id", "material_id", "mnozstvi", "datum", "typ_pohybu", "order_id", "sklad_id", "cena"],
+        "watermark": "id",
+        "refresh_column": "datum",
+        "refresh_days": 2,
+    },
+    # Číselník pro názvy operací v agregacích - malý, kopíruje se celý
+    "operation": {
+        "columns": ["id", "name", "group_name"],
+        "watermark": None,
+    },
+}
+
+DEFAULT_ANALYTICS_CONFIG = {
+    "enabled": False,
+    "path": "analytics.duckdb",
+    "interval": 300,        # s mezi synchronizacemi
+    "batch_size": 5000,     # řádků na jeden insert
+    "sync_timeout": 600,    # s; limit jednoho kopírovacího dotazu
+    "max_staleness": 900,   # s; starší snapshot se nepoužije (dotaz jde na živou databázi)
+}
+
+# Období trendu pohybů (jako database.MOVEMENT_BUCKETS) = jednotky date_trunc
+MOVEMENT_PERIODS = ("day", "week", "month")
+
+_DUCKDB_TYPES = {
+    'tinyint': 'BIGINT', 'smallint': 'BIGINT', 'mediumint': 'BIGINT', 'int': 'BIGINT', 'bigint': 'BIGINT',
+    'bit': 'BIGINT', 'decimal': 'DOUBLE', 'float': 'DOUBLE', 'double': 'DOUBLE',
+    'datetime': 'TIMESTAMP', 'timestamp': 'TIMESTAMP', 'date': 'DATE',
+}
+
+
+def duckdb_type(mysql_type: str) -> str:
+    return _DUCKDB_TYPES.get((mysql_type or '').lower(), 'VARCHAR')
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):  # BIT
+        return int.from_bytes(value, 'big')
+    return None if value is None else int(value)
+
+
+def _to_float(value: Any) -> Any:
+    return None if value is None else float(value)
+
+
+def _to_text(value: Any) -> Any:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    return str(value)
+
+
+def _arrow_batch(columns: List[Tuple[str, str]], rows: List[Dict[str, Any]]):
+    """Dávka řádků jako Arrow tabulka; časové sloupce jdou jako text a převádí je až TRY_CAST v DuckDB"""
+    arrays, fields = [], []
+    for name, mysql_type in columns:
+        kind = duckdb_type(mysql_type)
+        if kind == 'BIGINT':
+            convert, arrow_type = _to_int, pyarrow.int64()
+        elif kind == 'DOUBLE':
+            convert, arrow_type = _to_float, pyarrow.float64()
+        else:
+            convert, arrow_type = _to_text, pyarrow.string()
+        arrays.append(pyarrow.array([convert(row.get(name)) for row in rows], type=arrow_type))
+        fields.append(pyarrow.field(name, arrow_type))
+    return pyarrow.Table.from_arrays(arrays, schema=pyarrow.schema(fields))
+
+
+class _TableState:
+    """Stav kopie jedné tabulky"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns: List[Tuple[str, str]] = []
+        self.rows = 0
+        self.watermark: Optional[int] = None
+        self.synced_at: Optional[float] = None   # time.time() začátku poslední úspěšné synchronizace
+        self.duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'watermark': self.watermark,
+            'synced_at': datetime.fromtimestamp(self.synced_at).isoformat(timespec='seconds') if self.synced_at else None,
+            'duration_ms': round(self.duration * 1000, 1) if self.duration is not None else None,
+            'last_error': self.last_error,
+        }
+
+
+class AnalyticsStore:
+    """Snapshot tabulek v DuckDB souboru a agregace nad ním.
+
+    Nové řádky se kopírují podle id watermarku (MAX(id) ve snapshotu, takže
+    kopie po restartu pokračuje), řádky v okně refresh_days se kopírují znovu
+    (INSERT OR REPLACE), aby se projevily pozdní úpravy (např. doplněný konec
+    odpracovaného záznamu). Smazané řádky se u inkrementálních tabulek neprojeví.
+    Dotazy do DuckDB běží ve vlákně a jsou serializované zámkem.
+    """
+
+    def __init__(self, db, config: Optional[Dict[str, Any]] = None,
+                 tables: Optional[Dict[str, Dict[str, Any]]] = None):
+        if duckdb is None or pyarrow is None:
+            raise RuntimeError("database.analytics_store vyžaduje balíčky duckdb a pyarrow (pip install duckdb pyarrow)")
+        cfg = dict(DEFAULT_ANALYTICS_CONFIG)
+        cfg.update(config or {})
+        self._db = db
+        self.path = cfg['path']
+        self.interval = float(cfg['interval'])
+        self.batch_size = int(cfg['batch_size'])
+        self.sync_timeout = float(cfg['sync_timeout'])
+        self.max_staleness = float(cfg['max_staleness'])
+        self.tables = dict(tables if tables is not None else SNAPSHOT_TABLES)
+        self._state: Dict[str, _TableState] = {name: _TableState(name) for name in self.tables}
+        self._con = duckdb.connect(self.path)
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== DUCKDB ====================
+
+    def _run_sync(self, sql: str, params: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        cursor = self._con.cursor()
+        try:
+            cursor.execute(sql, list(params or ()))
+            if cursor.description is None:
+                return []
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    async def _run(self, sql: str, params: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        async with self._lock:
+            return await asyncio.to_thread(self._run_sync, sql, params)
+
+    # ==================== SYNCHRONIZACE ====================
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._con.close()
+
+    async def _loop(self) -> None:
+        while True:
+            await self.sync()
+            await asyncio.sleep(self.interval)
+
+    async def sync(self) -> None:
+        """Jedna synchronizace všech tabulek (chyba jedné tabulky nebrání ostatním)"""
+        for name in self.tables:
+            try:
+                await self.sync_table(name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Analytics snapshot of table %s failed", name)
+                self._state[name].last_error = str(e)
+
+    async def _prepare(self, name: str) -> _TableState:
+        """Sloupce podle katalogu schématu a tabulka v DuckDB (vytvoří se při prvním běhu)"""
+        state = self._state[name]
+        catalog = self._db.catalog
+        await catalog.ensure_fresh()
+        await catalog.ensure_table(name)
+        types = catalog.columns(name)
+        columns = [(c, types[c]) for c in self.tables[name]['columns'] if c in types]
+        if not columns or columns[0][0] != 'id':
+            raise RuntimeError(f"Tabulka {name} ve schématu chybí nebo nemá sloupec id")
+        if columns != state.columns:
+            existing = await self._run(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+                (name,)
+            )
+            if [r['column_name'] for r in existing] != [c for c, _ in columns]:
+                # Jiné sloupce (jiná verze schématu nebo starý soubor) = nová kopie od začátku
+                definition = ", ".join(
+                    f'"{c}" {duckdb_type(t)}' + (" PRIMARY KEY" if c == 'id' else "") for c, t in columns
+                )
+                await self._run(f'DROP TABLE IF EXISTS "{name}"')
+                await self._run(f'CREATE TABLE "{name}" ({definition})')
+            state.columns = columns
+        return state
+
+    async def sync_table(self, name: str) -> None:
+        spec = self.tables[name]
+        state = await self._prepare(name)
+        started = time.time()
+        column_list = ", ".join(f"t.{c}" for c, _ in state.columns)
+        select = f"SELECT {column_list} FROM {name} t"
+
+        if spec.get('watermark') is None:
+            await self._copy(state, select, (), replace=True)
+        else:
+            top = await self._run(f'SELECT MAX(id) AS max_id FROM "{name}"')
+            watermark = top[0]['max_id'] if top and top[0]['max_id'] is not None else 0
+            await self._copy(state, f"{select} WHERE t.id > %s ORDER BY t.id", (watermark,))
+            refresh_column = spec.get('refresh_column')
+            if watermark and refresh_column and refresh_column in dict(state.columns):
+                since = (date.today() - timedelta(days=int(spec.get('refresh_days', 2)))).isoformat()
+                await self._copy(state, f"{select} WHERE t.{refresh_column} >= %s AND t.id <= %s", (since, watermark))
+
+        stats = await self._run(f'SELECT COUNT(*) AS n, MAX(id) AS max_id FROM "{name}"')
+        state.rows = int(stats[0]['n'])
+        state.watermark = stats[0]['max_id']
+        state.synced_at = started
+        state.duration = time.time() - started
+        state.last_error = None
+
+    async def _copy(self, state: _TableState, query: str, params: tuple, replace: bool = False) -> None:
+        """Streamuje řádky ze zdroje a vkládá je po dávkách (INSERT OR REPLACE podle id).
+
+        Dávka se do DuckDB předává jako Arrow tabulka a vkládá jedním
+        INSERT ... SELECT (hromadně, ne po řádcích). replace=True: celý obsah
+        tabulky se nahradí v jedné transakci (malé číselníky).
+        """
+        names = ", ".join(f'"{c}"' for c, _ in state.columns)
+        # Nulová/nevalidní data ('0000-00-00') se uloží jako NULL
+        values = ", ".join(
+            f'TRY_CAST("{c}" AS {duckdb_type(t)})' if duckdb_type(t) in ('TIMESTAMP', 'DATE') else f'"{c}"'
+            for c, t in state.columns
+        )
+        insert = f'INSERT OR REPLACE INTO "{state.name}" ({names}) SELECT {values} FROM arrow_batch'
+        batch: List[Dict[str, Any]] = []
+        async for chunk in self._db.stream_query(query, params, chunk_size=self.batch_size, timeout=self.sync_timeout):
+            batch.extend(chunk)
+            if not replace and len(batch) >= self.batch_size:
+                await self._load(state, insert, batch)
+                batch = []
+        if replace or batch:
+            await self._load(state, insert, batch, replace=replace)
+
+    async def _load(self, state: _TableState, insert: str, rows: List[Dict[str, Any]], replace: bool = False) -> None:
+        table = _arrow_batch(state.columns, rows)
+        async with self._lock:
+            await asyncio.to_thread(self._load_sync, state.name, insert, table, replace)
+
+    def _load_sync(self, name: str, insert: str, table, replace: bool) -> None:
+        cursor = self._con.cursor()
+        try:
+            cursor.register('arrow_batch', table)
+            cursor.execute("BEGIN TRANSACTION")
+            if replace:
+                cursor.execute(f'DELETE FROM "{name}"')
+            if table.num_rows:
+                cursor.execute(insert)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.unregister('arrow_batch')
+            cursor.close()
+
+    # ==================== ČERSTVOST ====================
+
+    def synced_at(self, tables: Iterable[str]) -> Optional[float]:
+        """Čas nejstarší synchronizace z daných tabulek (None = některá ještě nebyla zkopírována)"""
+        times = [self._state[t].synced_at if t in self._state else None for t in tables]
+        if not times or any(t is None for t in times):
+            return None
+        return min(times)
+
+    def is_fresh(self, tables: Iterable[str]) -> bool:
+        at = self.synced_at(tables)
+        return at is not None and time.time() - at <= self.max_staleness
+
+    def freshness(self, tables: Iterable[str]) -> Dict[str, Any]:
+        """Údaj o čerstvosti do odpovědi tool"""
+        at = self.synced_at(tables)
+        return {
+            'source': 'snapshot',
+            'synced_at': datetime.fromtimestamp(at).isoformat(timespec='seconds') if at else None,
+            'age_seconds': int(time.time() - at) if at else None,
+        }
+
+    # ==================== AGREGACE ====================
+
+    async def production_stats(self, date_from: str, date_to: str, whole_days: bool = False) -> Dict[str, Any]:
+        """Denní hodiny a top operace nad snapshotem readdata (stejný tvar jako get_production_stats)"""
+        if whole_days:
+            # Rozsah celých dnů včetně date_to (jako denní rollup)
+            condition = "rd.start >= CAST(? AS TIMESTAMP) AND rd.start < CAST(? AS TIMESTAMP)"
+            params = (date_from, (date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+        else:
+            condition = "rd.start BETWEEN CAST(? AS TIMESTAMP) AND CAST(? AS TIMESTAMP)"
+            params = (date_from, date_to)
+        hours = await self._run(f"""
+            SELECT
+                CAST(rd.start AS DATE) AS date,
+                SUM(date_diff('second', rd.start, rd.finish)) / 3600.0 AS total_hours,
+                COUNT(DISTINCT rd.worker_id) AS workers_count,
+                COUNT(DISTINCT rd.order_id) AS orders_count
+            FROM readdata rd
+            WHERE {condition}
+            GROUP BY CAST(rd.start AS DATE)
+            ORDER BY date
+        """, params)
+        operations = await self._run(f"""
+            SELECT
+                op.name,
+                COUNT(*) AS count,
+                SUM(date_diff('second', rd.start, rd.finish)) / 3600.0 AS total_hours
+            FROM readdata rd
+            LEFT JOIN operation op ON rd.operation_id = op.id
+            WHERE {condition}
+            GROUP BY op.name
+            ORDER BY total_hours DESC NULLS LAST
+            LIMIT 10
+        """, params)
+        for row in hours:
+            row['date'] = row['date'].isoformat() if isinstance(row['date'], date) else row['date']
+        return {
+            'daily_stats': hours,
+            'top_operations': operations,
+            'freshness': self.freshness(('readdata', 'operation')),
+        }
+
+    async def worker_stats(self, worker_ids: List[int], days: int) -> List[Dict[str, Any]]:
+        """Statistiky zaměstnanců za posledních N dní nad snapshotem readdata (jako get_workers_stats)"""
+        if not worker_ids:
+            return []
+        placeholders = ", ".join(["?"] * len(worker_ids))
+        rows = await self._run(f"""
+            SELECT
+                rd.worker_id,
+                COUNT(DISTINCT rd.order_id) AS orders_count,
+                SUM(rd.real_time) AS total_hours,
+                AVG(rd.real_time) AS avg_hours_per_order,
+                MAX(rd.datum) AS last_work_date
+            FROM readdata rd
+            WHERE rd.worker_id IN ({placeholders})
+            AND rd.datum >= CAST(? AS TIMESTAMP)
+            GROUP BY rd.worker_id
+        """, (*worker_ids, (datetime.now() - timedelta(days=days)).isoformat(sep=' ', timespec='seconds')))
+        for row in rows:
+            value = row.get('last_work_date')
+            row['last_work_date'] = value.isoformat() if isinstance(value, (date, datetime)) else value
+        return rows
+
+    async def movement_groups(self, material_id: Optional[int], date_from: Optional[str], date_to: Optional[str],
+                              bucket: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Pohyby materiálu grupované podle typu (a období trendu) nad snapshotem
+        sklad_material_pohyb - stejné řádky jako souhrnné dotazy get_movement_summary"""
+        where = "1=1"
+        params: List[Any] = []
+        if material_id:
+            where += " AND smp.material_id = ?"
+            params.append(material_id)
+        if date_from:
+            where += " AND smp.datum >= CAST(? AS TIMESTAMP)"
+            params.append(date_from)
+        if date_to:
+            where += " AND smp.datum <= CAST(? AS TIMESTAMP)"
+            params.append(date_to)
+        totals = """
+            COUNT(*) AS movements_count,
+            COALESCE(SUM(smp.mnozstvi), 0) AS total_quantity,
+            COALESCE(SUM(smp.mnozstvi * COALESCE(smp.cena, 0)), 0) AS total_value
+        """
+        by_type = await self._run(f"""
+            SELECT smp.typ_pohybu, {totals}
+            FROM sklad_material_pohyb smp
+            WHERE {where}
+            GROUP BY smp.typ_pohybu
+        """, params)
+        trend: List[Dict[str, Any]] = []
+        if bucket:
+            if bucket not in MOVEMENT_PERIODS:
+                raise ValueError(f"Neplatné období trendu: {bucket}")
+            period = f"CAST(date_trunc('{bucket}', smp.datum) AS DATE)"
+            trend = await self._run(f"""
+                SELECT {period} AS period, smp.typ_pohybu, {totals}
+                FROM sklad_material_pohyb smp
+                WHERE {where}
+                GROUP BY period, smp.typ_pohybu
+                ORDER BY period, smp.typ_pohybu
+            """, params)
+            for row in trend:
+                row['period'] = row['period'].isoformat() if isinstance(row['period'], date) else row['period']
+        return by_type, trend
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'max_staleness': self.max_staleness,
+            'tables': {name: state.stats() for name, state in self._state.items()},
+        }
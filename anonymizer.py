@@ -110,10 +110,10 @@ class DataAnonymizer:
             
             anonymized_orders.append(anonymized_order)
         
-        return {
-            'orders': anonymized_orders,
-            'stats': data.get('stats', {})
-        }
+        result = dict(data)
+        result['orders'] = anonymized_orders
+        result['stats'] = data.get('stats', {})
+        return result
     
     def anonymize_order_detail(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Anonymizace detailu zakázky"""
@@ -197,10 +197,10 @@ class DataAnonymizer:
             
             anonymized_workers.append(anonymized_worker)
         
-        return {
-            'workers': anonymized_workers,
-            'count': data.get('count', 0)
-        }
+        result = dict(data)
+        result['workers'] = anonymized_workers
+        result['count'] = data.get('count', 0)
+        return result
     
     def anonymize_worker_detail(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Anonymizace detailu zaměstnance"""
@@ -210,44 +210,60 @@ class DataAnonymizer:
         result = data.copy()
         
         if 'worker' in result:
-            worker = result['worker'].copy()
-            worker_id = worker.get('id', 0)
-            
-            # Anonymizace jména
-            if 'name' in worker:
-                worker['name'] = self._anonymize_worker_name(worker['name'], worker_id)
-            
-            if 'firstname' in worker:
-                worker['firstname'] = 'XXX'
-            
-            if 'lastname' in worker:
-                worker['lastname'] = 'XXX'
-            
-            # Anonymizace kontaktů
-            if 'email' in worker:
-                worker['email'] = self._anonymize_email(worker['email'])
-            
-            if 'telefon' in worker:
-                worker['telefon'] = self._anonymize_phone(worker['telefon'])
-            
-            # Anonymizace poznámek
-            if 'comment' in worker:
-                worker['comment'] = self._anonymize_note(worker['comment'])
-            
-            # Odstranění osobních údajů
-            if 'birthdate' in worker:
-                worker['birthdate'] = None
-            
-            if 'card' in worker:
-                worker['card'] = '****'
-            
-            if 'card_dmr' in worker:
-                worker['card_dmr'] = '****'
-            
-            result['worker'] = worker
+            result['worker'] = self._anonymize_worker_record(result['worker'])
         
         return result
     
+    def anonymize_workers_stats(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Anonymizace statistik skupiny zaměstnanců (stejná pravidla jako detail)"""
+        if not self.enabled:
+            return data
+        
+        result = dict(data)
+        result['workers'] = [
+            {**entry, 'worker': self._anonymize_worker_record(entry.get('worker', {}))}
+            for entry in data.get('workers', [])
+        ]
+        return result
+    
+    def _anonymize_worker_record(self, worker: Dict[str, Any]) -> Dict[str, Any]:
+        """Anonymizace jednoho záznamu zaměstnance (celý řádek worker)"""
+        worker = worker.copy()
+        worker_id = worker.get('id', 0)
+        
+        # Anonymizace jména
+        if 'name' in worker:
+            worker['name'] = self._anonymize_worker_name(worker['name'], worker_id)
+        
+        if 'firstname' in worker:
+            worker['firstname'] = 'XXX'
+        
+        if 'lastname' in worker:
+            worker['lastname'] = 'XXX'
+        
+        # Anonymizace kontaktů
+        if 'email' in worker:
+            worker['email'] = self._anonymize_email(worker['email'])
+        
+        if 'telefon' in worker:
+            worker['telefon'] = self._anonymize_phone(worker['telefon'])
+        
+        # Anonymizace poznámek
+        if 'comment' in worker:
+            worker['comment'] = self._anonymize_note(worker['comment'])
+        
+        # Odstranění osobních údajů
+        if 'birthdate' in worker:
+            worker['birthdate'] = None
+        
+        if 'card' in worker:
+            worker['card'] = '****'
+        
+        if 'card_dmr' in worker:
+            worker['card_dmr'] = '****'
+        
+        return worker
+    
     # ==================== UTILITY ====================
     
     def get_anonymization_mapping(self) -> Dict[str, Any]:
@@ -2,6 +2,7 @@ import json
 from typing import Any, Dict, List, Optional, Union
 
 from fastapi import FastAPI, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
@@ -20,6 +21,16 @@ def parse_optional_int(value: Union[str, int, None]) -> Optional[int]:
         return None
 
 
+def parse_optional_int_list(value: Union[str, List[int], None]) -> Optional[List[int]]:
+    """Parse comma-separated integers from query param (e.g. "1,2,3")."""
+    if value is None or value == "" or value == "null":
+        return None
+    if isinstance(value, list):
+        return value
+    result = [parse_optional_int(part.strip()) for part in str(value).split(",")]
+    return [v for v in result if v is not None] or None
+
+
 def parse_optional_bool(value: Union[str, bool, None]) -> Optional[bool]:
     """Parse optional boolean from query param - handles empty strings from WebUI."""
     if value is None or value == "" or value == "null":
@@ -99,6 +110,7 @@ class OrdersQuery(BaseModel):
     date_to: Optional[str] = None
     limit: Optional[int] = 50
     offset: Optional[int] = 0
+    cursor: Optional[str] = None
     columns: Optional[List[str]] = None
 
 
@@ -129,6 +141,8 @@ async def get_orders(
     limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)"),
     offset: Optional[str] = Query(default=None, description="Počet záznamů k přeskočení (default: 0)"),
     columns: Optional[List[str]] = Query(default=None, description="Volitelný seznam sloupců k vrácení"),
+    cursor: Optional[str] = Query(default=None, description="Kurzor další stránky (next_cursor z předchozí odpovědi)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
 ):
     # Parse optional integers from WebUI (handles empty strings)
     customer_id_int = parse_optional_int(customer_id)
@@ -148,10 +162,36 @@ async def get_orders(
         args["date_to"] = date_to
     if columns:
         args["columns"] = columns
+    if cursor:
+        args["cursor"] = cursor
 
+    if format:
+        args["format"] = format
     return await call_mcp_tool("get_orders", args)
 
 
+@app.get(
+    "/orders:details",
+    operation_id="get_order_details",
+    summary="Get details of multiple orders",
+    description="Detaily více zakázek najednou (operace a materiál) podle ID nebo kódů.",
+    tags=["Orders"]
+)
+async def get_order_details(
+    order_ids: Optional[str] = Query(default=None, description="ID zakázek oddělená čárkou"),
+    order_codes: Optional[str] = Query(default=None, description="Kódy zakázek oddělené čárkou"),
+):
+    args: Dict[str, Any] = {}
+    ids = parse_optional_int_list(order_ids)
+    if ids:
+        args["order_ids"] = ids
+    if order_codes:
+        codes = [c.strip() for c in order_codes.split(",") if c.strip()]
+        if codes:
+            args["order_codes"] = codes
+    return await call_mcp_tool("get_order_details", args)
+
+
 @app.get(
     "/orders/{order_id}",
     operation_id="get_order_detail",
@@ -172,10 +212,14 @@ async def get_order_detail(order_id: int):
 )
 async def search_orders(
     search_term: str = Query(..., description="Hledaný výraz"),
-    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 20)")
+    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 20)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
 ):
     limit_int = parse_optional_int(limit)
-    return await call_mcp_tool("search_orders", {"search_term": search_term, "limit": limit_int if limit_int is not None else 20})
+    args: Dict[str, Any] = {"search_term": search_term, "limit": limit_int if limit_int is not None else 20}
+    if format:
+        args["format"] = format
+    return await call_mcp_tool("search_orders", args)
 
 
 @app.get(
@@ -189,6 +233,8 @@ async def get_workers(
     status: Optional[str] = Query(default=None, description="Filtr podle statusu (aktivní/neaktivní)"),
     group_name: Optional[str] = Query(default=None, description="Název skupiny"),
     limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)"),
+    cursor: Optional[str] = Query(default=None, description="Kurzor další stránky (next_cursor z předchozí odpovědi)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
 ):
     limit_int = parse_optional_int(limit)
     args: Dict[str, Any] = {
@@ -197,9 +243,43 @@ async def get_workers(
     }
     if group_name:
         args["group_name"] = group_name
+    if cursor:
+        args["cursor"] = cursor
+    if format:
+        args["format"] = format
     return await call_mcp_tool("get_workers", args)
 
 
+@app.get(
+    "/workers:stats",
+    operation_id="get_workers_stats",
+    summary="Get statistics for a group of workers",
+    description="Statistiky výkonu více zaměstnanců najednou (seznam id nebo skupina).",
+    tags=["Workers"]
+)
+async def get_workers_stats(
+    worker_ids: Optional[str] = Query(default=None, description="ID zaměstnanců oddělená čárkou"),
+    group_name: Optional[str] = Query(default=None, description="Název skupiny"),
+    days: Optional[str] = Query(default=None, description="Počet dní zpětně (default: 30)"),
+    limit: Optional[str] = Query(default=None, description="Maximální počet zaměstnanců (default: 200)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
+):
+    ids = parse_optional_int_list(worker_ids)
+    days_int = parse_optional_int(days)
+    limit_int = parse_optional_int(limit)
+    args: Dict[str, Any] = {
+        "days": days_int if days_int is not None else 30,
+        "limit": limit_int if limit_int is not None else 200
+    }
+    if ids:
+        args["worker_ids"] = ids
+    if group_name:
+        args["group_name"] = group_name
+    if format:
+        args["format"] = format
+    return await call_mcp_tool("get_workers_stats", args)
+
+
 @app.get(
     "/workers/{worker_id}",
     operation_id="get_worker_detail",
@@ -219,15 +299,26 @@ async def get_worker_detail(worker_id: int):
     tags=["Materials"]
 )
 async def get_materials(
+    sklad_id: Optional[str] = Query(default=None, description="ID skladu"),
     low_stock_only: Optional[str] = Query(default=None, description="Pouze materiály s nízkým stavem (true/false)"),
-    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)")
+    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)"),
+    cursor: Optional[str] = Query(default=None, description="Kurzor další stránky (next_cursor z předchozí odpovědi)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
 ):
     low_stock_bool = parse_optional_bool(low_stock_only)
     limit_int = parse_optional_int(limit)
-    return await call_mcp_tool("get_materials", {
+    args: Dict[str, Any] = {
         "low_stock_only": low_stock_bool if low_stock_bool is not None else False,
         "limit": limit_int if limit_int is not None else 50
-    })
+    }
+    sklad_id_int = parse_optional_int(sklad_id)
+    if sklad_id_int is not None:
+        args["sklad_id"] = sklad_id_int
+    if cursor:
+        args["cursor"] = cursor
+    if format:
+        args["format"] = format
+    return await call_mcp_tool("get_materials", args)
 
 
 @app.get(
@@ -242,6 +333,10 @@ async def get_material_movements(
     date_from: Optional[str] = Query(default=None, description="Datum od (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(default=None, description="Datum do (YYYY-MM-DD)"),
     limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 100)"),
+    cursor: Optional[str] = Query(default=None, description="Kurzor další stránky (next_cursor z předchozí odpovědi)"),
+    bucket: Optional[str] = Query(default=None, description="Trend za celý filtr: day, week, month"),
+    stream: Optional[str] = Query(default=None, description="Streamovaná odpověď pro velké výsledky (true/false)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
 ):
     material_id_int = parse_optional_int(material_id)
     limit_int = parse_optional_int(limit)
@@ -252,9 +347,59 @@ async def get_material_movements(
         args["date_from"] = date_from
     if date_to:
         args["date_to"] = date_to
+    if cursor:
+        args["cursor"] = cursor
+    if bucket:
+        args["bucket"] = bucket
+    if format:
+        args["format"] = format
+    if parse_optional_bool(stream):
+        # Položky se posílají po dávkách (chunked), limit je volitelný
+        if limit_int is None:
+            args.pop("limit")
+        return StreamingResponse(mcp_server.stream_tool("get_material_movements", args), media_type="application/json")
     return await call_mcp_tool("get_material_movements", args)
 
 
+@app.get(
+    "/export/{dataset}",
+    operation_id="export_data",
+    summary="Streamed bulk export",
+    description="Export celého výřezu zakázek nebo pohybů materiálu jako CSV, NDJSON nebo Parquet (chunked stream, anonymizace po dávkách).",
+    tags=["Export"]
+)
+async def export_data(
+    dataset: str,
+    format: str = Query(default="csv", description="Formát: csv, ndjson, parquet"),
+    status: Optional[str] = Query(default=None, description="Stav zakázky (orders)"),
+    customer_id: Optional[str] = Query(default=None, description="ID zákazníka (orders)"),
+    material_id: Optional[str] = Query(default=None, description="ID materiálu (material_movements)"),
+    date_from: Optional[str] = Query(default=None, description="Datum od (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(default=None, description="Datum do (YYYY-MM-DD)"),
+    limit: Optional[str] = Query(default=None, description="Maximální počet řádků (bez limitu = celý výřez)"),
+):
+    args = {
+        "status": status, "customer_id": customer_id, "material_id": material_id,
+        "date_from": date_from, "date_to": date_to, "limit": limit,
+    }
+    try:
+        content_type, filename, body = await mcp_server.open_export(dataset, format, args)
+    except mcp_server.ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except mcp_server.AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503, detail="Server je přetížen, zkuste to prosím znovu později",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export error: {e}")
+    return StreamingResponse(
+        body,
+        media_type=content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.get(
     "/operations",
     operation_id="get_operations",
@@ -264,12 +409,18 @@ async def get_material_movements(
 )
 async def get_operations(
     operation_group: Optional[str] = Query(default=None, description="Skupina operací"),
-    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)")
+    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)"),
+    cursor: Optional[str] = Query(default=None, description="Kurzor další stránky (next_cursor z předchozí odpovědi)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
 ):
     limit_int = parse_optional_int(limit)
     args: Dict[str, Any] = {"limit": limit_int if limit_int is not None else 50}
     if operation_group:
         args["operation_group"] = operation_group
+    if cursor:
+        args["cursor"] = cursor
+    if format:
+        args["format"] = format
     return await call_mcp_tool("get_operations", args)
 
 
@@ -282,12 +433,18 @@ async def get_operations(
 )
 async def get_machines(
     status_filter: Optional[str] = Query(default=None, description="Filtr podle statusu stroje"),
-    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)")
+    limit: Optional[str] = Query(default=None, description="Maximální počet výsledků (default: 50)"),
+    cursor: Optional[str] = Query(default=None, description="Kurzor další stránky (next_cursor z předchozí odpovědi)"),
+    format: Optional[str] = Query(default=None, description="Tvar položek: rows (výchozí) nebo columnar"),
 ):
     limit_int = parse_optional_int(limit)
     args: Dict[str, Any] = {"limit": limit_int if limit_int is not None else 50}
     if status_filter:
         args["status_filter"] = status_filter
+    if cursor:
+        args["cursor"] = cursor
+    if format:
+        args["format"] = format
     return await call_mcp_tool("get_machines", args)
 
 
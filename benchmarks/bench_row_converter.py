@@ -0,0 +1,85 @@
+"""
+Microbenchmark konverze řádků pro eMISTR MCP Server
+Porovná původní cestu (DictCursor + isinstance řetězec na každé hodnotě) s
+převodníkem sestaveným jednou z cursor.description.
+
+Spuštění: python benchmarks/bench_row_converter.py [počet_řádků]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from pymysql.constants import FIELD_TYPE
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import build_row_converter  # noqa: E402
+
+
+# Široký výsledek podobný "SELECT o.*, ..." z get_order_detail
+COLUMNS = (
+    [(f"int_{i}", FIELD_TYPE.LONG, 45) for i in range(12)]
+    + [(f"text_{i}", FIELD_TYPE.VAR_STRING, 33) for i in range(14)]
+    + [(f"price_{i}", FIELD_TYPE.NEWDECIMAL, 63) for i in range(6)]
+    + [(f"date_{i}", FIELD_TYPE.DATETIME, 63) for i in range(5)]
+    + [(f"day_{i}", FIELD_TYPE.DATE, 63) for i in range(2)]
+    + [("flags", FIELD_TYPE.BIT, 63)]
+)
+SAMPLE = {
+    FIELD_TYPE.LONG: 123456,
+    FIELD_TYPE.VAR_STRING: "Zakázka 2024/001",
+    FIELD_TYPE.NEWDECIMAL: Decimal("1234.50"),
+    FIELD_TYPE.DATETIME: datetime(2024, 5, 1, 8, 30),
+    FIELD_TYPE.DATE: date(2024, 5, 1),
+    FIELD_TYPE.BIT: b"\x01",
+}
+
+
+def legacy_serialize_row(row):
+    """Původní DatabaseManager._serialize_row"""
+    serialized = {}
+    for key, value in row.items():
+        if isinstance(value, (datetime, date)):
+            serialized[key] = value.isoformat()
+        elif isinstance(value, Decimal):
+            serialized[key] = float(value)
+        elif isinstance(value, bytes):
+            serialized[key] = value.decode('utf-8', errors='ignore')
+        else:
+            serialized[key] = value
+    return serialized
+
+
+def main(rows_count: int = 200_000) -> None:
+    names = [name for name, _, _ in COLUMNS]
+    row = tuple(SAMPLE[type_code] for _, type_code, _ in COLUMNS)
+    rows = [row] * rows_count
+    cursor = SimpleNamespace(
+        description=[(name, type_code, None, None, None, None, True) for name, type_code, _ in COLUMNS],
+        _result=SimpleNamespace(fields=[SimpleNamespace(table_name='c_order', charsetnr=charset) for _, _, charset in COLUMNS]),
+    )
+
+    # Před: DictCursor postaví dict, pak isinstance řetězec na každou hodnotu
+    started = time.perf_counter()
+    legacy = [legacy_serialize_row(dict(zip(names, r))) for r in rows]
+    legacy_time = time.perf_counter() - started
+
+    # Po: převodník sestavený jednou na výsledek, řádky jako tuple
+    started = time.perf_counter()
+    convert = build_row_converter(cursor)
+    compiled = [convert(r) for r in rows]
+    compiled_time = time.perf_counter() - started
+
+    assert legacy == compiled
+    print(f"columns: {len(COLUMNS)}, rows: {rows_count}")
+    print(f"before (DictCursor + _serialize_row): {rows_count / legacy_time:>12,.0f} rows/s")
+    print(f"after  (build_row_converter):         {rows_count / compiled_time:>12,.0f} rows/s")
+    print(f"speedup: {legacy_time / compiled_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
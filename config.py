@@ -74,6 +74,31 @@ class Config:
         """Limity dotazů"""
         return self._config.get('limits', {})
     
+    @property
+    def cache(self) -> Dict[str, Any]:
+        """Nastavení cache výsledků"""
+        return self._config.get('cache', {})
+    
+    @property
+    def coalescing(self) -> Dict[str, Any]:
+        """Slučování souběžných identických volání (single-flight)"""
+        return self._config.get('coalescing', {})
+    
+    @property
+    def export(self) -> Dict[str, Any]:
+        """Nastavení streamovaného exportu"""
+        return self._config.get('export', {})
+    
+    @property
+    def admin(self) -> Dict[str, Any]:
+        """Přístup k admin endpointům (/admin/*)"""
+        return self._config.get('admin', {})
+    
+    @property
+    def admission(self) -> Dict[str, Any]:
+        """Vstupní fronty /mcp podle třídy zátěže"""
+        return self._config.get('admission', {})
+    
     def save(self, path: str = None):
         """Uloží konfiguraci do souboru"""
         save_path = path or self.config_path
@@ -4,14 +4,172 @@ Zajišťuje bezpečný přístup k databázi s parametrizovanými dotazy
 """
 
 import asyncio
+import contextvars
+import time
+from contextlib import aclosing, contextmanager, nullcontext
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, AsyncIterator
 import aiomysql
 import logging
-from decimal import Decimal
+from pymysql.constants import FIELD_TYPE
+
+from analytics_store import AnalyticsStore
+from db_pool import ManagedPool
+from query_timeout import CLIENT_GRACE, QueryTimeoutError, deadline, is_server_timeout, remaining, reset_deadline, set_deadline, with_statement_timeout
+from replicas import DEFAULT_ROUTING, Replica, ReplicaSet, is_connection_error
+from workloads import WorkloadManager
+from result_cache import ResultCache, make_key
+from pagination import InvalidCursorError, SortKey, decode_cursor, encode_cursor, keyset_predicate, order_by_clause, paginate
+from schema_catalog import SchemaCatalog
+from search_index import OrderSearchIndex
+from slow_query_log import SlowQueryLog
+from stats_rollup import DailyRollup, parse_day
 
 logger = logging.getLogger('emistr-mcp.database')
 
+# Tool, v rámci jehož volání dotaz běží (řídí třídu zátěže a směrování na repliky)
+_current_tool: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('emistr_current_tool', default=None)
+
+# Souběh dotazů jednoho tool volání (max_fanout) - sdílený všemi i vnořenými _gather
+_fanout: contextvars.ContextVar[Optional[asyncio.Semaphore]] = contextvars.ContextVar('emistr_fanout', default=None)
+
+# Režim zachytávání (index advisor): dotazy se místo spuštění zapíšou do seznamu (dotaz, parametry, tool);
+# druhý prvek je volitelná funkce dotaz -> vzorové řádky výsledku
+SampleRows = Callable[[str], List[Dict[str, Any]]]
+_captured_queries: contextvars.ContextVar[Optional[Tuple[List[Tuple[str, tuple, Optional[str]]], Optional[SampleRows]]]] = (
+    contextvars.ContextVar('emistr_captured_queries', default=None)
+)
+
+
+# Třídicí klíče seznamů pro keyset stránkování (poslední pole je vždy unikátní id)
+ORDERS_SORT: Tuple[SortKey, ...] = (('priorita', 'o.priorita', 'DESC'), ('start', 'o.start', 'ASC'), ('id', 'o.id', 'ASC'))
+WORKERS_SORT: Tuple[SortKey, ...] = (('name', 'w.name', 'ASC'), ('id', 'w.id', 'ASC'))
+MOVEMENTS_SORT: Tuple[SortKey, ...] = (('datum', 'smp.datum', 'DESC'), ('id', 'smp.id', 'DESC'))
+OPERATIONS_SORT: Tuple[SortKey, ...] = (('name', 'op.name', 'ASC'), ('id', 'op.id', 'ASC'))
+MATERIALS_SORT: Tuple[SortKey, ...] = (('name', 'sm.name', 'ASC'), ('id', 'sm.id', 'ASC'))
+MACHINES_SORT: Tuple[SortKey, ...] = (('name', 's.name', 'ASC'), ('id', 's.id', 'ASC'))
+
+# Hlavička zakázky (get_order_detail / get_order_details), WHERE doplní volající
+ORDER_HEADER_SELECT = """
+    SELECT 
+        o.*,
+        os.name as status_name,
+        c.name as customer_full_name,
+        c.ico,
+        c.dic
+    FROM c_order o
+    LEFT JOIN order_stav os ON o.active = os.name
+    LEFT JOIN customer c ON o.customer_id = c.id
+"""
+
+# Operace zakázky; {order_id} = volitelný sloupec pro seskupení více zakázek
+ORDER_OPERATIONS_SELECT = """
+    SELECT {order_id}
+        ow.id,
+        ow.operation_id,
+        op.name as operation_name,
+        op.bar_id as operation_code,
+        ow.user_time,
+        ow.real_time,
+        ow.odpracovano,
+        ow.user_price,
+        ow.real_price,
+        ow.vyrobenocelkem,
+        ow.units,
+        ow.poradi,
+        ow.start_req,
+        ow.finish_req,
+        ow.comment
+    FROM order_work ow
+    LEFT JOIN operation op ON ow.operation_id = op.id
+"""
+
+# Materiál pod minimální zásobou (NULL množství/limit = 0)
+LOW_STOCK_PREDICATE = "IFNULL(sm.count, 0) < IFNULL(sm.limit_count, 0)"
+
+# Období trendu pohybů materiálu -> první den období (bez "%" kvůli formátování parametrů)
+MOVEMENT_BUCKETS = {
+    "day": "DATE(smp.datum)",
+    "week": "DATE_SUB(DATE(smp.datum), INTERVAL WEEKDAY(smp.datum) DAY)",
+    "month": "DATE_SUB(DATE(smp.datum), INTERVAL DAYOFMONTH(smp.datum) - 1 DAY)",
+}
+
+# Prohledávané sloupce search_orders (LIKE scan i ověření kandidátů z trigramového indexu)
+SEARCH_LIKE_CONDITION = (
+    "o.code LIKE %s OR o.name LIKE %s OR o.customer_name LIKE %s"
+    " OR o.cislo_objednavky LIKE %s OR o.note LIKE %s"
+)
+
+# Kolikrát víc kandidátů než limit se z indexu bere (rezerva na smazané/změněné zakázky)
+SEARCH_OVERFETCH = 2
+
+# Počty, množství a hodnota pohybů (cena = jednotková cena pohybu)
+MOVEMENT_TOTALS = """
+    COUNT(*) as movements_count,
+    IFNULL(SUM(smp.mnozstvi), 0) as total_quantity,
+    IFNULL(SUM(smp.mnozstvi * IFNULL(smp.cena, 0)), 0) as total_value
+"""
+
+
+# ==================== KONVERZE ŘÁDKŮ ====================
+
+_TEMPORAL_TYPES = frozenset((FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP))
+_DECIMAL_TYPES = frozenset((FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL))
+_BINARY_CAPABLE_TYPES = frozenset((
+    FIELD_TYPE.BIT, FIELD_TYPE.BLOB, FIELD_TYPE.TINY_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.LONG_BLOB,
+    FIELD_TYPE.STRING, FIELD_TYPE.VAR_STRING, FIELD_TYPE.VARCHAR, FIELD_TYPE.GEOMETRY,
+))
+BINARY_CHARSET = 63
+
+
+def _to_iso(value):
+    # Nulová data ('0000-00-00') vrací PyMySQL jako řetězec - ty necháme být
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _to_float(value):
+    return float(value) if value is not None else None
+
+
+def _to_text(value):
+    return value.decode('utf-8', errors='ignore') if isinstance(value, bytes) else value
+
+
+def build_row_converter(cursor) -> Callable[[tuple], Dict[str, Any]]:
+    """Sestaví převodník řádků (tuple -> dict) pro jednu výsledkovou sadu.
+
+    Typy sloupců jsou známé z cursor.description, takže konverze pro JSON
+    (datum -> ISO, Decimal -> float, binární data -> str) se aplikují jen na
+    sloupce, které je potřebují, místo isinstance kontrol u každé hodnoty.
+    """
+    fields = getattr(getattr(cursor, '_result', None), 'fields', None) or []
+    names: List[str] = []
+    conversions: List[Tuple[int, Callable[[Any], Any]]] = []
+    for i, column in enumerate(cursor.description or ()):
+        name, type_code = column[0], column[1]
+        field = fields[i] if i < len(fields) else None
+        # Duplicitní názvy pojmenujeme stejně jako aiomysql.DictCursor (tabulka.sloupec)
+        if name in names and field is not None:
+            name = f"{field.table_name}.{name}"
+        names.append(name)
+        if type_code in _TEMPORAL_TYPES:
+            conversions.append((i, _to_iso))
+        elif type_code in _DECIMAL_TYPES:
+            conversions.append((i, _to_float))
+        elif type_code in _BINARY_CAPABLE_TYPES and (field is None or field.charsetnr == BINARY_CHARSET):
+            conversions.append((i, _to_text))
+
+    if not conversions:
+        return lambda row: dict(zip(names, row))
+
+    def convert(row: tuple) -> Dict[str, Any]:
+        values = list(row)
+        for i, fn in conversions:
+            values[i] = fn(values[i])
+        return dict(zip(names, values))
+
+    return convert
+
 
 class DatabaseManager:
     """Správce databázových připojení a dotazů"""
@@ -19,11 +177,76 @@ class DatabaseManager:
     def __init__(self, config):
         self.config = config
         self.pool = None
+        catalog_config = self._db_setting('schema_catalog', {}) or {}
+        self.catalog = SchemaCatalog(self, ttl=float(catalog_config.get('ttl', 3600)))
+        # Varianty dotazů zkompilované pro připojené schéma: name -> (verze katalogu, SQL)
+        self._query_variants: Dict[str, Tuple[int, str]] = {}
+        # Kolik dotazů jednoho tool volání smí běžet souběžně (aby jeden požadavek nevyčerpal pool)
+        self.max_fanout = max(1, int(self._db_setting('max_fanout', 3)))
+        # Časové limity dotazů: výchozí limits.query_timeout, per-tool limits.tool_timeouts
+        limits = getattr(config, 'limits', None)
+        limits = limits if isinstance(limits, dict) else {}
+        self.query_timeout = float(limits.get('query_timeout') or 0)
+        self.tool_timeouts: Dict[str, float] = dict(limits.get('tool_timeouts') or {})
+        self.server_timeouts = bool(limits.get('server_timeout', True))
+        # 'mariadb' / 'mysql' podle serveru (syntaxe serverového limitu), zjistí se při connect()
+        self._timeout_dialect: Optional[str] = None
+        self._query_counters = {'timeouts': 0, 'cancelled': 0, 'killed': 0}
+        self._background_tasks: set = set()
+        # Read-repliky: analytické tools (replica_routing.tools) smí číst z repliky v limitu zpoždění
+        routing = dict(DEFAULT_ROUTING)
+        routing.update(self._db_setting('replica_routing', {}) or {})
+        self.replica_routing = routing
+        self.replica_tools = set(routing['tools'])
+        self.replicas: Optional[ReplicaSet] = None
+        # Třídy zátěže: vlastní pool, fronta, limit a session pro skupiny tools
+        self.workloads = WorkloadManager(self._db_setting('workloads'), self._db_setting('tool_workloads'))
+        # Časování příkazů podle otisku a log pomalých příkazů s EXPLAIN
+        self.slow_log = SlowQueryLog(self._db_setting('slow_query_log'), explain=self._explain)
+        # Počty zakázek pro souhrn get_orders: memoizace podle sady filtrů s krátkým TTL
+        counts_config = self._db_setting('counts', {}) or {}
+        self._count_cache = ResultCache(max_entries=256, default_ttl=float(counts_config.get('ttl', 30)))
+        self.counts_approximate = bool(counts_config.get('approximate', False))
+        self.approximate_threshold = int(counts_config.get('approximate_threshold', 1000000))
+        # Denní rollup výrobních statistik (uzavřené dny se počítají jednou)
+        rollup_config = self._db_setting('stats_rollup', {}) or {}
+        self.stats_rollup: Optional[DailyRollup] = None
+        if rollup_config.get('enabled', True):
+            self.stats_rollup = DailyRollup(
+                self,
+                settle_days=int(rollup_config.get('settle_days', 1)),
+                max_days=int(rollup_config.get('max_days', 1100)),
+            )
+        # Trigramový index pro search_orders (staví se na pozadí po connect())
+        search_config = self._db_setting('search_index', {}) or {}
+        self.search_index: Optional[OrderSearchIndex] = None
+        if search_config.get('enabled', True):
+            self.search_index = OrderSearchIndex(
+                self,
+                interval=float(search_config.get('interval', 30)),
+                rebuild_interval=float(search_config.get('rebuild_interval', 3600)),
+                fold_accents=bool(search_config.get('fold_accents', True)),
+            )
+        # Lokální sloupcový snapshot pro analytické tools (volitelný, vyžaduje duckdb)
+        analytics_config = self._db_setting('analytics_store', {}) or {}
+        self.analytics_store: Optional[AnalyticsStore] = None
+        if analytics_config.get('enabled', False):
+            try:
+                self.analytics_store = AnalyticsStore(self, analytics_config)
+            except Exception as e:
+                logger.warning("Analytics store disabled: %s", e)
+
+    def _db_setting(self, key: str, default: Any = None) -> Any:
+        """Hodnota z sekce 'database' konfigurace (config může být i jednoduchý namespace)"""
+        db_config = getattr(self.config, 'database', None)
+        if isinstance(db_config, dict):
+            return db_config.get(key, default)
+        return default
     
-    async def connect(self):
-        """Vytvoření connection poolu"""
+    async def connect(self, start_background: bool = True):
+        """Vytvoření connection poolu (start_background=False: bez stavby vyhledávacího indexu, pro CLI nástroje)"""
         db_config = self.config.database
-        self.pool = await aiomysql.create_pool(
+        conn_kwargs = dict(
             host=db_config['host'],
             port=db_config['port'],
             user=db_config['user'],
@@ -31,67 +254,362 @@ class DatabaseManager:
             db=db_config['database'],
             charset='utf8mb4',
             autocommit=True,
-            minsize=1,
-            maxsize=10
         )
+        self.pool = ManagedPool('primary', conn_kwargs, db_config.get('pool'))
+        await self.pool.open()
         logger.info("Database connection pool created")
-    
+        if self.server_timeouts:
+            try:
+                version = await self.execute_query("SELECT VERSION() AS version")
+                self._timeout_dialect = 'mariadb' if 'mariadb' in str(version[0]['version']).lower() else 'mysql'
+            except Exception:
+                logger.exception("Server version could not be detected, server-side query timeouts disabled")
+        # Zvolené varianty dotazů platí jen pro konkrétní pool/schéma
+        self._query_variants.clear()
+        # Metadata schématu načteme jednou; chyba nesmí zablokovat start serveru
+        try:
+            await self.catalog.load()
+        except Exception:
+            logger.exception("Schema catalog could not be loaded at startup")
+        # Předkompilace variant dotazů podle zjištěných schopností schématu
+        for name, builder in self._variant_builders().items():
+            self._compiled_query(name, builder)
+        await self.workloads.open(conn_kwargs, db_config.get('pool'))
+        await self._open_replicas(db_config, conn_kwargs)
+        if self.search_index and start_background:
+            self.search_index.start()
+        if self.analytics_store and start_background:
+            self.analytics_store.start()
+
+    async def _open_replicas(self, db_config: Dict[str, Any], conn_kwargs: Dict[str, Any]) -> None:
+        """Pooly read-replik (database.replicas); přihlašovací údaje se dědí z primáru"""
+        replica_configs = db_config.get('replicas') or []
+        if not replica_configs:
+            return
+        replicas = []
+        for i, rc in enumerate(replica_configs):
+            kwargs = dict(conn_kwargs)
+            kwargs.update({k: rc[k] for k in ('host', 'port', 'user', 'password') if k in rc})
+            if 'database' in rc:
+                kwargs['db'] = rc['database']
+            name = rc.get('name') or f"replica{i + 1}"
+            replicas.append(Replica(name, ManagedPool(name, kwargs, rc.get('pool', db_config.get('pool')))))
+        self.replicas = ReplicaSet(
+            replicas,
+            max_lag=float(self.replica_routing['max_lag_seconds']),
+            check_interval=float(self.replica_routing['check_interval']),
+        )
+        await self.replicas.open()
+        logger.info("Read replicas configured: %s", ", ".join(r.name for r in replicas))
+
+    @property
+    def capabilities(self) -> Dict[str, bool]:
+        """Volitelné sloupce detekované v připojeném schématu ('tabulka.sloupec' -> bool)"""
+        return self.catalog.capabilities
+
+    async def refresh_schema(self) -> Dict[str, Any]:
+        """Explicitní obnova katalogu schématu (admin)"""
+        return await self.catalog.refresh()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Provozní metriky databázové vrstvy (pro admin endpoint)"""
+        return {
+            "pool": self.pool.stats() if self.pool else None,
+            "workloads": self.workloads.stats(),
+            "replicas": self.replicas.stats() if self.replicas else None,
+            "queries": dict(self._query_counters, default_timeout=self.query_timeout),
+            "search_index": self.search_index.stats() if self.search_index else None,
+            "stats_rollup": self.stats_rollup.stats() if self.stats_rollup else None,
+            "analytics_store": self.analytics_store.stats() if self.analytics_store else None
+        }
+
     async def close(self):
         """Uzavření connection poolu"""
+        if self.search_index:
+            await self.search_index.stop()
+        if self.analytics_store:
+            await self.analytics_store.stop()
+        if self.replicas:
+            await self.replicas.close()
+        await self.workloads.close()
         if self.pool:
-            self.pool.close()
-            await self.pool.wait_closed()
+            await self.pool.close()
 
     async def disconnect(self):
         """Backward-compatible alias for closing the pool (used by server cleanup)."""
         await self.close()
     
+    def timeout_for(self, tool: Optional[str]) -> float:
+        """Časový limit dotazů toolu: limits.tool_timeouts, pak limit třídy zátěže, pak výchozí (0 = bez limitu)"""
+        if tool in self.tool_timeouts:
+            return float(self.tool_timeouts[tool] or 0)
+        workload_timeout = self.workloads.timeout(self.workloads.workload_for(tool))
+        if workload_timeout is not None:
+            return workload_timeout
+        return self.query_timeout
+
+    @contextmanager
+    def tool_scope(self, tool: Optional[str]):
+        """Kontext jednoho tool volání: deadline dotazů a směrování (primár / replika)"""
+        deadline_token = set_deadline(self.timeout_for(tool))
+        tool_token = _current_tool.set(tool)
+        fanout_token = _fanout.set(asyncio.Semaphore(self.max_fanout))
+        try:
+            yield
+        finally:
+            _fanout.reset(fanout_token)
+            _current_tool.reset(tool_token)
+            reset_deadline(deadline_token)
+
+    @contextmanager
+    def capture_queries(self, sample_rows: Optional[SampleRows] = None):
+        """Dotazy se místo spuštění zaznamenají do vráceného seznamu (dotaz, parametry, tool).
+
+        execute_query vrací řádky ze sample_rows(dotaz) (bez funkce prázdný výsledek),
+        stream_query nic. Slouží k výčtu tvarů dotazů, které tools vydávají (index_advisor);
+        volající by měl použít samostatnou instanci, aby se vzorové výsledky nedostaly
+        do rollupu a cache počtů.
+        """
+        captured: List[Tuple[str, tuple, Optional[str]]] = []
+        token = _captured_queries.set((captured, sample_rows))
+        try:
+            yield captured
+        finally:
+            _captured_queries.reset(token)
+
+    def _route(self, streaming: bool = False) -> Tuple[ManagedPool, Optional[Replica]]:
+        """Pool pro dotaz: replika pro analytické tools (je-li v limitu zpoždění), jinak pool
+        třídy zátěže aktuálního toolu (bez konfigurace třídy primární pool)"""
+        tool = _current_tool.get()
+        workload = self.workloads.workload_for(tool, streaming)
+        if self.replicas and (tool in self.replica_tools or self.workloads.uses_replicas(workload)):
+            replica = self.replicas.choose()
+            if replica:
+                return replica.pool, replica
+        return self.workloads.pool(workload) or self.pool, None
+
+    def _time_budget(self) -> Optional[float]:
+        """Zbývající čas pro další dotaz (deadline tool volání, jinak výchozí limit)"""
+        budget = remaining(self.query_timeout)
+        if budget is not None and budget <= 0:
+            self._query_counters['timeouts'] += 1
+            raise QueryTimeoutError()
+        return budget
+
+    def _abandon(self, conn, pool: ManagedPool) -> None:
+        """Zahodí spojení s rozběhnutým dotazem a dotaz na serveru ukončí (KILL QUERY na pozadí)"""
+        thread_id = conn.thread_id()
+        conn.close()
+
+        async def kill():
+            if await pool.kill_query(thread_id):
+                self._query_counters['killed'] += 1
+
+        task = asyncio.create_task(kill())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _guarded(self, conn, coro, timeout: Optional[float], pool: Optional[ManagedPool] = None):
+        """Provede operaci na spojení s klientským timeoutem.
+        
+        Při timeoutu nebo zrušení (klient odešel) se spojení zahodí a dotaz se
+        na serveru zabije; serverový timeout se převede na QueryTimeoutError.
+        """
+        try:
+            if timeout is None:
+                return await coro
+            return await asyncio.wait_for(coro, timeout + CLIENT_GRACE)
+        except asyncio.TimeoutError:
+            self._query_counters['timeouts'] += 1
+            self._abandon(conn, pool or self.pool)
+            raise QueryTimeoutError(timeout) from None
+        except asyncio.CancelledError:
+            self._query_counters['cancelled'] += 1
+            self._abandon(conn, pool or self.pool)
+            raise
+        except Exception as e:
+            if is_server_timeout(e):
+                self._query_counters['timeouts'] += 1
+                raise QueryTimeoutError(timeout) from e
+            raise
+
     async def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
-        """Spuštění SELECT dotazu"""
-        async with self.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(query, params or ())
-                result = await cursor.fetchall()
-                # Konverze datetime a decimal objektů na serializovatelné
-                return [self._serialize_row(row) for row in result]
-    
-    def _serialize_row(self, row: Dict) -> Dict:
-        """Konverze datových typů pro JSON serializaci"""
-        serialized = {}
-        for key, value in row.items():
-            if isinstance(value, (datetime, date)):
-                serialized[key] = value.isoformat()
-            elif isinstance(value, Decimal):
-                serialized[key] = float(value)  # Convert Decimal to float
-            elif isinstance(value, bytes):
-                serialized[key] = value.decode('utf-8', errors='ignore')
-            else:
-                serialized[key] = value
-        return serialized
+        """Spuštění SELECT dotazu (s časovým limitem, viz _guarded).
+        
+        Dotaz analytického toolu jde na repliku; při chybě spojení s replikou se
+        replika vyřadí z rotace a dotaz se zopakuje na primáru.
+        """
+        capture = _captured_queries.get()
+        if capture is not None:
+            captured, sample_rows = capture
+            captured.append((query, tuple(params or ()), _current_tool.get()))
+            return [dict(row) for row in sample_rows(query)] if sample_rows else []
+        # Spojení drží jen dotazy; limit souběhu se proto uplatňuje tady, ne na úrovni _gather
+        async with _fanout.get() or nullcontext():
+            return await self._execute_routed(query, params)
 
+    async def _execute_routed(self, query: str, params: tuple = None) -> List[Dict]:
+        pool, replica = self._route()
+        if replica is None:
+            return await self._execute_on(pool, query, params)
+        try:
+            return await self._execute_on(pool, query, params)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            logger.warning("Replica '%s' failed, falling back to primary: %s", replica.name, e)
+            replica.mark_down(e)
+            workload = self.workloads.workload_for(_current_tool.get())
+            return await self._execute_on(self.workloads.pool(workload) or self.pool, query, params)
+    
+    async def _execute_on(self, pool: ManagedPool, query: str, params: tuple = None, record: bool = True) -> List[Dict]:
+        timeout = self._time_budget()
+        sql = with_statement_timeout(query, timeout, self._timeout_dialect)
+        async with pool.acquire() as conn:
+            cursor = await conn.cursor()
+            
+            async def run():
+                await cursor.execute(sql, params or ())
+                return await cursor.fetchall()
+            
+            started = time.perf_counter()
+            try:
+                result = await self._guarded(conn, run(), timeout, pool)
+            except QueryTimeoutError:
+                if record:
+                    self.slow_log.record(query, params, time.perf_counter() - started, 0, _current_tool.get())
+                raise
+            finally:
+                if not conn.closed:
+                    await cursor.close()
+            if record:
+                self.slow_log.record(query, params, time.perf_counter() - started, len(result), _current_tool.get())
+            if not cursor.description:
+                return []
+            # Konverze datetime a decimal hodnot na serializovatelné (převodník jednou na výsledek)
+            convert = build_row_converter(cursor)
+            return [convert(row) for row in result]
+    
+    async def _explain(self, query: str, params: tuple = None) -> List[Dict]:
+        """EXPLAIN dotazu na primáru (pro slow query log; neměří se, vlastní výchozí limit)"""
+        if not query.lstrip().upper().startswith('SELECT'):
+            return []
+        with deadline(None):
+            return await self._execute_on(self.pool, "EXPLAIN " + query, params, record=False)
+    
+    async def stream_query(self, query: str, params: tuple = None, chunk_size: int = 500, timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Streamovaný SELECT přes nebufferovaný (server-side) kurzor; vrací řádky po dávkách chunk_size.
+
+        Spojení je po celou dobu iterace zapůjčené z poolu. Pokud konzument iteraci
+        ukončí předčasně, nedočtený výsledek by spojení zablokoval - spojení se
+        proto zahodí (dotaz se na serveru zabije) a pool si otevře nové.
+        Limit (timeout, jinak deadline tool volání) platí pro celý stream; výchozí
+        limits.query_timeout se na streamy neuplatňuje. Stejně jako u execute_query
+        se při chybě spojení s replikou stream přesměruje na primár - ale jen před
+        odesláním první dávky, potom už by se řádky opakovaly.
+        """
+        capture = _captured_queries.get()
+        if capture is not None:
+            capture[0].append((query, tuple(params or ()), _current_tool.get()))
+            return
+        budget = timeout if timeout else remaining()
+        if budget is not None and budget <= 0:
+            self._query_counters['timeouts'] += 1
+            raise QueryTimeoutError()
+        deadline_at = time.monotonic() + budget if budget is not None else None
+        sql = with_statement_timeout(query, budget, self._timeout_dialect)
+        
+        def left() -> Optional[float]:
+            return max(0.0, deadline_at - time.monotonic()) if deadline_at is not None else None
+        
+        pool, replica = self._route(streaming=True)
+        stream = self._stream_on(pool, sql, params, chunk_size, left)
+        first = None
+        if replica is not None:
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                await stream.aclose()
+                if not is_connection_error(e):
+                    raise
+                logger.warning("Replica '%s' failed, falling back to primary for stream: %s", replica.name, e)
+                replica.mark_down(e)
+                workload = self.workloads.workload_for(_current_tool.get(), streaming=True)
+                stream = self._stream_on(self.workloads.pool(workload) or self.pool, sql, params, chunk_size, left)
+        async with aclosing(stream):
+            if first is not None:
+                yield first
+            async for chunk in stream:
+                yield chunk
+
+    async def _stream_on(self, pool: ManagedPool, sql: str, params: tuple, chunk_size: int,
+                         left: Callable[[], Optional[float]]) -> AsyncIterator[List[Dict]]:
+        async with pool.acquire() as conn:
+            cursor = await conn.cursor(aiomysql.SSCursor)
+            completed = False
+            try:
+                await self._guarded(conn, cursor.execute(sql, params or ()), left(), pool)
+                convert = build_row_converter(cursor)
+                while True:
+                    rows = await self._guarded(conn, cursor.fetchmany(chunk_size), left(), pool)
+                    if not rows:
+                        break
+                    yield [convert(row) for row in rows]
+                completed = True
+            finally:
+                if completed:
+                    await cursor.close()
+                elif not conn.closed:
+                    self._abandon(conn, pool)
+
+    @staticmethod
+    def _keyset_filter(keys, cursor: Optional[str], params: List[Any]) -> str:
+        """Fragment ' AND (...)' omezující výsledek na řádky za kurzorem (parametry přidá do params)"""
+        if not cursor:
+            return ""
+        keyset, keyset_params = keyset_predicate(keys, decode_cursor(cursor))
+        params.extend(keyset_params)
+        return f" AND {keyset}"
+
+    async def _gather(self, *coros) -> List[Any]:
+        """Spustí nezávislé dotazy souběžně, každý na vlastním spojení z poolu.
+
+        Souběh je omezen na max_fanout dotazů na jedno tool volání (semafor z tool_scope,
+        sdílený i vnořenými _gather); výsledky jsou ve stejném pořadí jako vstupy.
+        Při chybě jednoho dotazu se ostatní zruší.
+        """
+        if len(coros) == 1:
+            return [await coros[0]]
+        # Mimo tool_scope platí limit pro tento _gather včetně vnořených
+        token = _fanout.set(asyncio.Semaphore(self.max_fanout)) if _fanout.get() is None else None
+        try:
+            tasks = [asyncio.ensure_future(c) for c in coros]
+        finally:
+            if token is not None:
+                _fanout.reset(token)
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+    
     async def _detect_datetime_column(self, table_name: str) -> Optional[str]:
         """Najde název sloupce typu datetime/timestamp/date v dané tabulce (preferuje známé názvy)."""
         try:
-            db_name = self.config.database.get('database') if isinstance(self.config.database, dict) else None
-            if not db_name:
-                return None
-            rows = await self.execute_query(
-                """
-                SELECT COLUMN_NAME, DATA_TYPE
-                FROM information_schema.COLUMNS
-                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
-                  AND DATA_TYPE IN ('datetime','timestamp','date')
-                """,
-                (db_name, table_name)
-            )
+            await self.catalog.ensure_fresh()
+            await self.catalog.ensure_table(table_name)
+            names = self.catalog.datetime_columns(table_name)
             preferred = ['datum', 'date', 'datumcas', 'datetime', 'ts', 'timestamp']
             # Prefer known names
             for name in preferred:
-                if any(r.get('COLUMN_NAME') == name for r in rows):
+                if name in names:
                     return name
             # Otherwise pick the first available
-            if rows:
-                name = rows[0].get('COLUMN_NAME')
+            if names:
+                name = names[0]
                 # basic safety
                 if isinstance(name, str) and name.replace('_', '').isalnum():
                     return name
@@ -100,30 +618,89 @@ class DatabaseManager:
             return None
 
     async def _existing_columns(self, table_name: str, candidates: List[str]) -> List[str]:
-        """Vrátí existující sloupce z candidates v dané tabulce (přes information_schema; fallback SHOW COLUMNS)."""
-        try:
-            db_name = self.config.database.get('database') if isinstance(self.config.database, dict) else None
-            if db_name:
-                rows = await self.execute_query(
-                    """
-                    SELECT COLUMN_NAME
-                    FROM information_schema.COLUMNS
-                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
-                    """,
-                    (db_name, table_name)
-                )
-                names = {r.get('COLUMN_NAME') for r in rows}
-                return [c for c in candidates if c in names]
-        except Exception:
-            pass
-        # Fallback SHOW COLUMNS
+        """Vrátí existující sloupce z candidates v dané tabulce (z katalogu schématu)."""
         try:
-            rows = await self.execute_query(f"SHOW COLUMNS FROM {table_name}")
-            names = {r.get('Field') or r.get('COLUMN_NAME') for r in rows}
-            return [c for c in candidates if c in names]
+            await self.catalog.ensure_fresh()
+            await self.catalog.ensure_table(table_name)
+            return self.catalog.existing_columns(table_name, candidates)
         except Exception:
             return []
     
+    def _column_or_default(self, table_name: str, alias: str, column: str, default: str = '0') -> str:
+        """Výraz sloupce, nebo konstanta 'default as column', pokud sloupec ve schématu chybí"""
+        if self.catalog.has_column(table_name, column, default=True):
+            return f"{alias}.{column}"
+        return f"{default} as {column}"
+
+    def _compiled_query(self, name: str, builder: Callable[[], str]) -> str:
+        """Varianta dotazu pro připojené schéma; sestaví se jednou a pamatuje se až do změny katalogu"""
+        cached = self._query_variants.get(name)
+        if cached is not None and cached[0] == self.catalog.version:
+            return cached[1]
+        query = builder()
+        self._query_variants[name] = (self.catalog.version, query)
+        return query
+
+    async def _execute_compiled(self, name: str, builder: Callable[[], str], suffix: str = "", params: tuple = None) -> List[Dict]:
+        """Spustí zkompilovanou variantu dotazu (+ dynamický suffix s filtry)
+
+        Na hot path se vydává jen varianta, která ve schématu projde. Pokud se schéma
+        změnilo od posledního načtení katalogu ("Unknown column"), katalog se obnoví
+        a dotaz se jednou zopakuje s novou variantou.
+        """
+        query = self._compiled_query(name, builder) + suffix
+        try:
+            return await self.execute_query(query, params)
+        except Exception as e:
+            if "Unknown column" not in str(e):
+                raise
+            logger.warning("Query variant '%s' no longer matches schema, refreshing catalog", name)
+            await self.catalog.refresh()
+            return await self.execute_query(self._compiled_query(name, builder) + suffix, params)
+
+    def _variant_builders(self) -> Dict[str, Callable[[], str]]:
+        """Dotazy, jejichž podoba závisí na volitelných sloupcích schématu"""
+        return {
+            'material_select': self._build_material_select,
+            'material_select_batch': self._build_material_select_batch,
+            'operations_select': self._build_operations_select,
+        }
+
+    def _build_material_select(self, include_order_id: bool = False) -> str:
+        order_id = "m.order_id AS _order_id," if include_order_id else ""
+        return f"""
+            SELECT {order_id}
+                m.id,
+                m.material_id,
+                mat.name as material_name,
+                m.mnozstvi,
+                m.jednotka,
+                {self._column_or_default('material', 'm', 'vydano_mnozstvi')},
+                {self._column_or_default('material', 'm', 'cena_nakup')},
+                {self._column_or_default('material', 'm', 'cena_celkem')}
+            FROM material m
+            LEFT JOIN sklad_material mat ON m.material_id = mat.id
+        """
+
+    def _build_material_select_batch(self) -> str:
+        """Materiál více zakázek najednou (navíc _order_id pro seskupení)"""
+        return self._build_material_select(include_order_id=True)
+
+    def _build_operations_select(self) -> str:
+        return f"""
+            SELECT 
+                op.id,
+                op.name,
+                op.bar_id,
+                {self._column_or_default('operation', 'op', 'user_price')},
+                {self._column_or_default('operation', 'op', 'user_time')},
+                op.group_name,
+                og.name as group_full_name
+            FROM operation op
+            LEFT JOIN operation_group og ON op.group_name = og.name
+            WHERE 1=1
+        """
+
     # ==================== ZAKÁZKY ====================
     
     async def get_orders(
@@ -133,11 +710,64 @@ class DatabaseManager:
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Získání seznamu zakázek"""
+        """Získání seznamu zakázek (cursor = keyset stránkování, offset jen pro zpětnou kompatibilitu)"""
         
-        query = """
+        where, where_params = self._orders_filter(status, customer_id, date_from, date_to)
+        
+        query = self._orders_select(where)
+        
+        params = list(where_params)
+        
+        if cursor:
+            query += self._keyset_filter(ORDERS_SORT, cursor, params)
+            offset = 0
+        
+        # O řádek navíc, abychom poznali, zda existuje další stránka
+        query += f" {order_by_clause(ORDERS_SORT)} LIMIT %s OFFSET %s"
+        params.append(limit + 1)
+        params.append(offset)
+        
+        # Stránka a počty (se stejnými filtry) jsou nezávislé - běží souběžně
+        orders, stats = await self._gather(
+            self.execute_query(query, tuple(params)),
+            self._count_orders(where, where_params),
+        )
+        
+        orders, next_cursor = paginate(orders, limit, ORDERS_SORT)
+        
+        return {
+            "orders": orders,
+            "stats": stats,
+            "next_cursor": next_cursor
+        }
+    
+    async def iter_orders(
+        self,
+        status: str = "",
+        customer_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None,
+        chunk_size: int = 500,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[List[Dict]]:
+        """Zakázky (filtry jako get_orders) streamované po dávkách - pro export celé knihy zakázek"""
+        where, where_params = self._orders_filter(status, customer_id, date_from, date_to)
+        query = self._orders_select(where) + f" {order_by_clause(ORDERS_SORT)}"
+        params = list(where_params)
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        async for chunk in self.stream_query(query, tuple(params), chunk_size, timeout=timeout):
+            yield chunk
+    
+    @staticmethod
+    def _orders_select(where: str) -> str:
+        """SELECT seznamu zakázek s podmínkou (bez řazení a limitu)"""
+        return f"""
             SELECT 
                 o.id,
                 o.bar_id,
@@ -160,53 +790,105 @@ class DatabaseManager:
                 os.name as status_name
             FROM c_order o
             LEFT JOIN order_stav os ON o.active = os.id
-            WHERE 1=1
+            WHERE {where}
         """
-        
-        params = []
-        
+    
+    @staticmethod
+    def _orders_filter(
+        status: str = "",
+        customer_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ) -> Tuple[str, List[Any]]:
+        """WHERE podmínka get_orders (sdílí ji stránka i počty)"""
+        conditions = ["1=1"]
+        params: List[Any] = []
         if status:
-            query += " AND o.active = %s"
+            conditions.append("o.active = %s")
             params.append(status)
-        
         if customer_id:
-            query += " AND o.customer_id = %s"
+            conditions.append("o.customer_id = %s")
             params.append(customer_id)
-        
         if date_from:
-            query += " AND o.start >= %s"
+            conditions.append("o.start >= %s")
             params.append(date_from)
-        
         if date_to:
-            query += " AND o.finish <= %s"
+            conditions.append("o.finish <= %s")
             params.append(date_to)
+        return " AND ".join(conditions), params
+    
+    async def _count_orders(self, where: str, params: List[Any]) -> Dict[str, Any]:
+        """Počty zakázek odpovídajících filtru (celkem, aktivní, zpožděné).
         
-        query += " ORDER BY o.priorita DESC, o.start ASC LIMIT %s OFFSET %s"
-        params.append(limit)
-        params.append(offset)
-        
-        orders = await self.execute_query(query, tuple(params))
-        
-        # Statistiky
-        stats_query = """
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN active = 'ANO' THEN 1 ELSE 0 END) as active_count,
-                SUM(CASE WHEN finish < CURDATE() AND active = 'ANO' THEN 1 ELSE 0 END) as delayed_count
-            FROM c_order
-            WHERE 1=1
+        Přesné počty se memoizují podle filtru s krátkým TTL. Při zapnutém
+        'database.counts.approximate' se pro velké tabulky použije odhad z EXPLAIN
+        (výsledek nese approximate=True).
         """
+        key = make_key('order_counts', {'where': where, 'params': list(params)})
+        hit, counts = self._count_cache.get(key)
+        if hit:
+            return counts
         
-        stats_params = []
-        if customer_id:
-            stats_query += " AND customer_id = %s"
-            stats_params.append(customer_id)
-        
-        stats = await self.execute_query(stats_query, tuple(stats_params))
-        
+        counts = None
+        if self.counts_approximate:
+            counts = await self._approximate_order_counts(where, params)
+        if counts is None:
+            rows = await self.execute_query(f"""
+                SELECT 
+                    COUNT(*) as total,
+                    SUM(CASE WHEN o.active = 'ANO' THEN 1 ELSE 0 END) as active_count,
+                    SUM(CASE WHEN o.finish < CURDATE() AND o.active = 'ANO' THEN 1 ELSE 0 END) as delayed_count
+                FROM c_order o
+                WHERE {where}
+            """, tuple(params))
+            row = rows[0] if rows else {}
+            counts = {
+                'total': int(row.get('total') or 0),
+                'active_count': int(row.get('active_count') or 0),
+                'delayed_count': int(row.get('delayed_count') or 0),
+                'approximate': False,
+            }
+        self._count_cache.set(key, 'order_counts', counts)
+        return counts
+    
+    async def _approximate_order_counts(self, where: str, params: List[Any]) -> Optional[Dict[str, Any]]:
+        """Odhad počtů z plánu dotazu; None = tabulka je malá nebo odhad nelze získat"""
+        try:
+            size = await self.execute_query(
+                """
+                SELECT TABLE_ROWS FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'c_order'
+                """,
+                (self._db_setting('database'),)
+            )
+            if not size or int(size[0].get('TABLE_ROWS') or 0) < self.approximate_threshold:
+                return None
+            
+            async def estimate(extra: str) -> int:
+                plan = await self.execute_query(
+                    f"EXPLAIN SELECT 1 FROM c_order o WHERE {where}{extra}", tuple(params)
+                )
+                if not plan:
+                    return 0
+                rows = float(plan[0].get('rows') or 0)
+                filtered = plan[0].get('filtered')
+                if filtered is not None:
+                    rows = rows * float(filtered) / 100
+                return int(rows)
+            
+            total, active, delayed = await self._gather(
+                estimate(""),
+                estimate(" AND o.active = 'ANO'"),
+                estimate(" AND o.finish < CURDATE() AND o.active = 'ANO'"),
+            )
+        except Exception:
+            logger.exception("Approximate order count failed, falling back to exact count")
+            return None
         return {
-            "orders": orders,
-            "stats": stats[0] if stats else {}
+            'total': total,
+            'active_count': min(active, total),
+            'delayed_count': min(delayed, active, total),
+            'approximate': True,
         }
     
     async def get_order_detail(
@@ -217,18 +899,7 @@ class DatabaseManager:
         """Detail zakázky včetně operací"""
         
         # Hlavička zakázky
-        query = """
-            SELECT 
-                o.*,
-                os.name as status_name,
-                c.name as customer_full_name,
-                c.ico,
-                c.dic
-            FROM c_order o
-            LEFT JOIN order_stav os ON o.active = os.name
-            LEFT JOIN customer c ON o.customer_id = c.id
-            WHERE 
-        """
+        query = ORDER_HEADER_SELECT + " WHERE "
         
         if order_id:
             query += "o.id = %s"
@@ -239,94 +910,29 @@ class DatabaseManager:
         else:
             return {"error": "Musíte zadat order_id nebo order_code"}
         
-        order = await self.execute_query(query, params)
-        if not order:
-            return {"error": "Zakázka nenalezena"}
-        
-        order = order[0]
-        
         # Operace zakázky
-        operations_query = """
-            SELECT 
-                ow.id,
-                ow.operation_id,
-                op.name as operation_name,
-                op.bar_id as operation_code,
-                ow.user_time,
-                ow.real_time,
-                ow.odpracovano,
-                ow.user_price,
-                ow.real_price,
-                ow.vyrobenocelkem,
-                ow.units,
-                ow.poradi,
-                ow.start_req,
-                ow.finish_req,
-                ow.comment
-            FROM order_work ow
-            LEFT JOIN operation op ON ow.operation_id = op.id
-            WHERE ow.order_id = %s
-            ORDER BY ow.poradi
-        """
+        operations_query = ORDER_OPERATIONS_SELECT.format(order_id="") + " WHERE ow.order_id = %s ORDER BY ow.poradi"
+        material_suffix = " WHERE m.order_id = %s"
         
-        operations = await self.execute_query(operations_query, (str(order['id']),))
-        
-        # Materiál
-        material_query = """
-            SELECT 
-                m.id,
-                m.material_id,
-                mat.name as material_name,
-                m.mnozstvi,
-                m.jednotka,
-                m.vydano_mnozstvi,
-                m.cena_nakup,
-                m.cena_celkem
-            FROM material m
-            LEFT JOIN sklad_material mat ON m.material_id = mat.id
-            WHERE m.order_id = %s
-        """
-        material_fallback = """
-            SELECT 
-                m.id,
-                m.material_id,
-                mat.name as material_name,
-                m.mnozstvi,
-                m.jednotka,
-                0 as vydano_mnozstvi,
-                m.cena_nakup,
-                m.cena_celkem
-            FROM material m
-            LEFT JOIN sklad_material mat ON m.material_id = mat.id
-            WHERE m.order_id = %s
-        """
-        material_fallback2 = """
-            SELECT 
-                m.id,
-                m.material_id,
-                mat.name as material_name,
-                m.mnozstvi,
-                m.jednotka,
-                0 as vydano_mnozstvi,
-                0 as cena_nakup,
-                0 as cena_celkem
-            FROM material m
-            LEFT JOIN sklad_material mat ON m.material_id = mat.id
-            WHERE m.order_id = %s
-        """
-        try:
-            materials = await self.execute_query(material_query, (order['id'],))
-        except Exception as e:
-            if "Unknown column" in str(e):
-                try:
-                    materials = await self.execute_query(material_fallback, (order['id'],))
-                except Exception as e2:
-                    if "Unknown column" in str(e2):
-                        materials = await self.execute_query(material_fallback2, (order['id'],))
-                    else:
-                        raise
-            else:
-                raise
+        if order_id:
+            # ID je známé předem: hlavička, operace i materiál běží souběžně
+            order, operations, materials = await self._gather(
+                self.execute_query(query, params),
+                self.execute_query(operations_query, (str(order_id),)),
+                self._execute_compiled('material_select', self._build_material_select, material_suffix, (order_id,)),
+            )
+            if not order:
+                return {"error": "Zakázka nenalezena"}
+            order = order[0]
+        else:
+            order = await self.execute_query(query, params)
+            if not order:
+                return {"error": "Zakázka nenalezena"}
+            order = order[0]
+            operations, materials = await self._gather(
+                self.execute_query(operations_query, (str(order['id']),)),
+                self._execute_compiled('material_select', self._build_material_select, material_suffix, (order['id'],)),
+            )
         
         return {
             "order": order,
@@ -334,11 +940,96 @@ class DatabaseManager:
             "materials": materials
         }
     
+    async def get_order_details(
+        self,
+        order_ids: Optional[List[int]] = None,
+        order_codes: Optional[List[str]] = None,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Detaily více zakázek najednou - jeden IN (...) dotaz na tabulku, seskupení v Pythonu.
+        
+        Každá položka má stejný tvar jako výsledek get_order_detail; nenalezená
+        id/kódy se vrací v 'not_found'.
+        """
+        ids = list(dict.fromkeys(int(i) for i in (order_ids or [])))[:limit]
+        codes = list(dict.fromkeys(str(c) for c in (order_codes or [])))[:max(0, limit - len(ids))]
+        if not ids and not codes:
+            return {"error": "Musíte zadat order_ids nebo order_codes"}
+        
+        def in_list(values) -> str:
+            return ", ".join(["%s"] * len(values))
+        
+        header_conditions = []
+        if ids:
+            header_conditions.append(f"o.id IN ({in_list(ids)})")
+        if codes:
+            header_conditions.append(f"o.code IN ({in_list(codes)})")
+        header_query = ORDER_HEADER_SELECT + " WHERE " + " OR ".join(header_conditions)
+        header_params = tuple(ids) + tuple(codes)
+        
+        def children(order_ids: List[int]):
+            operations_query = (
+                ORDER_OPERATIONS_SELECT.format(order_id="ow.order_id AS _order_id,")
+                + f" WHERE ow.order_id IN ({in_list(order_ids)}) ORDER BY ow.order_id, ow.poradi"
+            )
+            return (
+                self.execute_query(operations_query, tuple(str(i) for i in order_ids)),
+                self._execute_compiled(
+                    'material_select_batch', self._build_material_select_batch,
+                    f" WHERE m.order_id IN ({in_list(order_ids)})", tuple(order_ids)
+                ),
+            )
+        
+        if ids and not codes:
+            # Id jsou známá předem: všechny tři dotazy běží souběžně
+            headers, operations, materials = await self._gather(
+                self.execute_query(header_query, header_params), *children(ids)
+            )
+        else:
+            headers = await self.execute_query(header_query, header_params)
+            found_ids = [h['id'] for h in headers]
+            operations, materials = await self._gather(*children(found_ids)) if found_ids else ([], [])
+        
+        operations_by_order: Dict[str, List[Dict]] = {}
+        for row in operations:
+            operations_by_order.setdefault(str(row.pop('_order_id')), []).append(row)
+        materials_by_order: Dict[str, List[Dict]] = {}
+        for row in materials:
+            materials_by_order.setdefault(str(row.pop('_order_id')), []).append(row)
+        
+        by_id = {h['id']: h for h in headers}
+        by_code = {h.get('code'): h for h in headers}
+        details = []
+        not_found = []
+        seen = set()
+        for key, header in [(i, by_id.get(i)) for i in ids] + [(c, by_code.get(c)) for c in codes]:
+            if header is None:
+                not_found.append(key)
+                continue
+            if header['id'] in seen:
+                continue
+            seen.add(header['id'])
+            details.append({
+                "order": header,
+                "operations": operations_by_order.get(str(header['id']), []),
+                "materials": materials_by_order.get(str(header['id']), [])
+            })
+        
+        return {
+            "orders": details,
+            "not_found": not_found,
+            "count": len(details)
+        }
+    
     async def search_orders(self, search_term: str, limit: int = 20) -> Dict[str, Any]:
-        """Fulltextové vyhledávání zakázek"""
+        """Fulltextové vyhledávání zakázek.
         
-        query = """
-            SELECT 
+        Je-li postaven trigramový index, kandidáti se najdou v paměti (s rezervou
+        SEARCH_OVERFETCH pro smazané a změněné zakázky) a z databáze se načtou podle
+        PK s ověřením LIKE; když se tak stránka nezaplní, nebo index nelze použít
+        (staví se, příliš krátký term), použije se LIKE přes všechny prohledávané sloupce.
+        """
+        columns = """
                 o.id,
                 o.code,
                 o.name,
@@ -346,22 +1037,38 @@ class DatabaseManager:
                 o.active,
                 o.start,
                 o.finish,
-                o.note
+                o.note"""
+        search_pattern = f"%{search_term}%"
+        like_params = (search_pattern,) * SEARCH_LIKE_CONDITION.count("%s")
+        
+        fetch = limit * SEARCH_OVERFETCH
+        ids = self.search_index.search(search_term, fetch) if self.search_index else None
+        if ids is not None:
+            orders = []
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                orders = await self.execute_query(
+                    f"SELECT {columns} FROM c_order o WHERE o.id IN ({placeholders}) AND ({SEARCH_LIKE_CONDITION})"
+                    f" ORDER BY o.start DESC LIMIT %s",
+                    tuple(ids) + like_params + (limit,)
+                )
+            # Nezaplněná stránka z plného seznamu kandidátů = index je zastaralý
+            if len(orders) >= limit or len(ids) < fetch:
+                return {
+                    "orders": orders,
+                    "search_term": search_term,
+                    "count": len(orders)
+                }
+        
+        query = f"""
+            SELECT {columns}
             FROM c_order o
-            WHERE 
-                o.code LIKE %s OR
-                o.name LIKE %s OR
-                o.customer_name LIKE %s OR
-                o.cislo_objednavky LIKE %s OR
-                o.note LIKE %s
+            WHERE {SEARCH_LIKE_CONDITION}
             ORDER BY o.start DESC
             LIMIT %s
         """
         
-        search_pattern = f"%{search_term}%"
-        params = (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern, limit)
-        
-        orders = await self.execute_query(query, params)
+        orders = await self.execute_query(query, like_params + (limit,))
         
         return {
             "orders": orders,
@@ -375,7 +1082,8 @@ class DatabaseManager:
         self,
         status: str = "",
         group_name: Optional[str] = None,
-        limit: int = 50
+        limit: int = 50,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """Seznam zaměstnanců"""
         
@@ -408,14 +1116,29 @@ class DatabaseManager:
             query += " AND w.group_name = %s"
             params.append(group_name)
         
-        query += " ORDER BY w.name LIMIT %s"
-        params.append(limit)
+        if cursor:
+            # Jméno se anonymizuje, proto kurzor nese jen id; jméno dohledáme podle PK
+            anchor_id = decode_cursor(cursor).get('id')
+            anchor = await self.execute_query("SELECT w.name, w.id FROM worker w WHERE w.id = %s", (anchor_id,))
+            if not anchor:
+                # Zaměstnanec z kurzoru mezitím zmizel - bez kotvy by se vrátila znovu první stránka
+                raise InvalidCursorError("Kurzor stránkování už neplatí (záznam byl odstraněn)")
+            keyset, keyset_params = keyset_predicate(WORKERS_SORT, anchor[0])
+            query += f" AND {keyset}"
+            params.extend(keyset_params)
+        
+        query += f" {order_by_clause(WORKERS_SORT)} LIMIT %s"
+        params.append(limit + 1)
         
         workers = await self.execute_query(query, tuple(params))
+        has_more = len(workers) > limit
+        workers = workers[:limit]
+        next_cursor = encode_cursor({'id': workers[-1]['id']}) if has_more and workers else None
         
         return {
             "workers": workers,
-            "count": len(workers)
+            "count": len(workers),
+            "next_cursor": next_cursor
         }
     
     async def get_worker_detail(self, worker_id: int) -> Dict[str, Any]:
@@ -455,16 +1178,208 @@ class DatabaseManager:
             "worker": worker,
             "stats": stats[0] if stats else {}
         }
+    
+    async def get_workers_stats(
+        self,
+        worker_ids: Optional[List[int]] = None,
+        group_name: Optional[str] = None,
+        days: int = 30,
+        limit: int = 200
+    ) -> Dict[str, Any]:
+        """Statistiky skupiny zaměstnanců (seznam id nebo skupina) za posledních N dní.
+        
+        Statistiky všech zaměstnanců počítá jeden grupovaný dotaz nad readdata
+        (stejné metriky jako get_worker_detail), souběžně s načtením zaměstnanců.
+        Agreguje se jen stejná omezená množina (řazení + LIMIT), jakou vrací seznam.
+        """
+        if worker_ids:
+            ids = list(dict.fromkeys(int(i) for i in worker_ids))[:limit]
+            placeholders = ", ".join(["%s"] * len(ids))
+            worker_filter = f"w.id IN ({placeholders})"
+            filter_params: List[Any] = ids
+        elif group_name:
+            worker_filter = "w.group_name = %s"
+            filter_params = [group_name]
+        else:
+            return {"error": "Zadejte worker_ids nebo group_name"}
+        
+        workers_query = f"""
+            SELECT 
+                w.*,
+                wg.name as group_full_name
+            FROM worker w
+            LEFT JOIN worker_group wg ON w.group_id = wg.id
+            WHERE {worker_filter}
+            ORDER BY w.name, w.id
+            LIMIT %s
+        """
+        selected_workers = f"SELECT w.id FROM worker w WHERE {worker_filter} ORDER BY w.name, w.id LIMIT %s"
+        stats_query = f"""
+            SELECT 
+                rd.worker_id,
+                COUNT(DISTINCT rd.order_id) as orders_count,
+                SUM(rd.real_time) as total_hours,
+                AVG(rd.real_time) as avg_hours_per_order,
+                MAX(rd.datum) as last_work_date
+            FROM readdata rd
+            JOIN ({selected_workers}) w ON w.id = rd.worker_id
+            WHERE rd.datum >= DATE_SUB(NOW(), INTERVAL %s DAY)
+            GROUP BY rd.worker_id
+        """
+        freshness = {'source': 'live'}
+        if self.analytics_store and self.analytics_store.is_fresh(('readdata',)):
+            # Statistiky ze snapshotu pro načtené zaměstnance (ERP databáze čte jen worker)
+            workers = await self.execute_query(workers_query, tuple(filter_params + [limit]))
+            stats = await self.analytics_store.worker_stats([w['id'] for w in workers], days)
+            freshness = self.analytics_store.freshness(('readdata',))
+        else:
+            workers, stats = await self._gather(
+                self.execute_query(workers_query, tuple(filter_params + [limit])),
+                self.execute_query(stats_query, tuple(filter_params + [limit, days])),
+            )
+        
+        stats_by_worker = {row.pop('worker_id'): row for row in stats}
+        empty_stats = {'orders_count': 0, 'total_hours': 0, 'avg_hours_per_order': 0, 'last_work_date': None}
+        return {
+            "workers": [
+                {"worker": w, "stats": stats_by_worker.get(w['id'], dict(empty_stats))}
+                for w in workers
+            ],
+            "days": days,
+            "count": len(workers),
+            "freshness": freshness
+        }
 
     async def get_material_movements(
         self,
         material_id: Optional[int] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        bucket: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Pohyby materiálu"""
-        query = """
+        """Pohyby materiálu; souhrn podle typu pohybu (a volitelně trend po dnech/týdnech/měsících)
+        počítá databáze za celý filtr, ne jen za stránku"""
+        if bucket and bucket not in MOVEMENT_BUCKETS:
+            return {"error": f"Neplatné období trendu: {bucket} (dostupné: {', '.join(MOVEMENT_BUCKETS)})"}
+        
+        query, params = self._movements_query(material_id, date_from, date_to)
+        
+        query += self._keyset_filter(MOVEMENTS_SORT, cursor, params)
+        
+        query += f" {order_by_clause(MOVEMENTS_SORT)} LIMIT %s"
+        params.append(limit + 1)
+        
+        page, aggregates = await self._gather(
+            self.execute_query(query, tuple(params)),
+            self.get_movement_summary(material_id, date_from, date_to, bucket),
+        )
+        movements, next_cursor = paginate(page, limit, MOVEMENTS_SORT)
+        return {
+            "movements": movements,
+            "count": len(movements),
+            "next_cursor": next_cursor,
+            **aggregates
+        }
+    
+    async def get_movement_summary(
+        self,
+        material_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        bucket: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Souhrn pohybů za celý filtr ('summary') a volitelně trend po obdobích ('trend');
+        sdílí ho stránkovaná i streamovaná odpověď. Při čerstvém analytickém snapshotu
+        se počítá nad ním, jinak grupovanými dotazy nad živou databází ('freshness')."""
+        if bucket and bucket not in MOVEMENT_BUCKETS:
+            return {"error": f"Neplatné období trendu: {bucket} (dostupné: {', '.join(MOVEMENT_BUCKETS)})"}
+        
+        store = self.analytics_store
+        if store and store.is_fresh(('sklad_material_pohyb',)):
+            by_type, trend_rows = await store.movement_groups(material_id, date_from, date_to, bucket)
+            freshness = store.freshness(('sklad_material_pohyb',))
+        else:
+            where, where_params = self._movements_filter(material_id, date_from, date_to)
+            summary_query = f"""
+                SELECT smp.typ_pohybu, {MOVEMENT_TOTALS}
+                FROM sklad_material_pohyb smp
+                WHERE {where}
+                GROUP BY smp.typ_pohybu
+            """
+            queries = [self.execute_query(summary_query, tuple(where_params))]
+            if bucket:
+                trend_query = f"""
+                    SELECT {MOVEMENT_BUCKETS[bucket]} as period, smp.typ_pohybu, {MOVEMENT_TOTALS}
+                    FROM sklad_material_pohyb smp
+                    WHERE {where}
+                    GROUP BY period, smp.typ_pohybu
+                    ORDER BY period, smp.typ_pohybu
+                """
+                queries.append(self.execute_query(trend_query, tuple(where_params)))
+            by_type, *trend = await self._gather(*queries)
+            trend_rows = trend[0] if trend else []
+            freshness = {"source": "live"}
+        
+        result = {"summary": self._movement_totals(by_type), "freshness": freshness}
+        if bucket:
+            result["trend"] = {"bucket": bucket, "periods": [self._movement_group(row) for row in trend_rows]}
+        return result
+    
+    @staticmethod
+    def _movement_group(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Řádek grupovaného dotazu pohybů s čísly převedenými na int/float"""
+        group = {k: v for k, v in row.items() if k not in ('movements_count', 'total_quantity', 'total_value')}
+        group.update({
+            "movements_count": int(row.get('movements_count') or 0),
+            "total_quantity": float(row.get('total_quantity') or 0),
+            "total_value": float(row.get('total_value') or 0),
+        })
+        return group
+    
+    @classmethod
+    def _movement_totals(cls, by_type: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Souhrn pohybů za celý filtr: celkové počty, příjem (P) / výdej (V) a rozpad podle typu"""
+        groups = [cls._movement_group(row) for row in by_type]
+        totals = {g.get('typ_pohybu'): g for g in groups}
+        empty = {"movements_count": 0, "total_quantity": 0.0, "total_value": 0.0}
+        return {
+            "movements_count": sum(g['movements_count'] for g in groups),
+            "total_in": totals.get('P', empty)['total_quantity'],
+            "total_out": totals.get('V', empty)['total_quantity'],
+            "value_in": totals.get('P', empty)['total_value'],
+            "value_out": totals.get('V', empty)['total_value'],
+            "by_type": groups,
+        }
+
+    async def iter_material_movements(
+        self,
+        material_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None,
+        chunk_size: int = 500,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[List[Dict]]:
+        """Pohyby materiálu streamované po dávkách (bez načtení celého výsledku do paměti)"""
+        query, params = self._movements_query(material_id, date_from, date_to)
+        query += f" {order_by_clause(MOVEMENTS_SORT)}"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        async for chunk in self.stream_query(query, tuple(params), chunk_size, timeout=timeout):
+            yield chunk
+
+    def _movements_query(
+        self,
+        material_id: Optional[int],
+        date_from: Optional[str],
+        date_to: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        """SELECT pohybů materiálu s filtry (bez řazení a limitu)"""
+        where, params = self._movements_filter(material_id, date_from, date_to)
+        query = f"""
             SELECT 
                 smp.id,
                 smp.material_id,
@@ -477,98 +1392,81 @@ class DatabaseManager:
                 smp.cena
             FROM sklad_material_pohyb smp
             LEFT JOIN sklad_material sm ON smp.material_id = sm.id
-            WHERE 1=1
+            WHERE {where}
         """
-        
-        params = []
+        return query, params
+    
+    @staticmethod
+    def _movements_filter(
+        material_id: Optional[int],
+        date_from: Optional[str],
+        date_to: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        """WHERE podmínka pohybů materiálu (sdílená stránkou, souhrnem i trendem)"""
+        where = "1=1"
+        params: List[Any] = []
         
         if material_id:
-            query += " AND smp.material_id = %s"
+            where += " AND smp.material_id = %s"
             params.append(material_id)
         
         if date_from:
-            query += " AND smp.datum >= %s"
+            where += " AND smp.datum >= %s"
             params.append(date_from)
         
         if date_to:
-            query += " AND smp.datum <= %s"
+            where += " AND smp.datum <= %s"
             params.append(date_to)
         
-        query += " ORDER BY smp.datum DESC LIMIT %s"
-        params.append(limit)
-        
-        movements = await self.execute_query(query, tuple(params))
-        return {
-            "movements": movements,
-            "count": len(movements)
-        }
+        return where, params
     
     # ==================== OPERACE ====================
     
     async def get_operations(
         self,
         operation_group: Optional[str] = None,
-        limit: int = 50
+        limit: int = 50,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """Seznam operací"""
         
-        base_query = """
-            SELECT 
-                op.id,
-                op.name,
-                op.bar_id,
-                op.user_price,
-                op.user_time,
-                op.group_name,
-                og.name as group_full_name
-            FROM operation op
-            LEFT JOIN operation_group og ON op.group_name = og.name
-            WHERE 1=1
-        """
-        fallback_query = """
-            SELECT 
-                op.id,
-                op.name,
-                op.bar_id,
-                0 as user_price,
-                0 as user_time,
-                op.group_name,
-                og.name as group_full_name
-            FROM operation op
-            LEFT JOIN operation_group og ON op.group_name = og.name
-            WHERE 1=1
-        """
-        
+        query = ""
         params = []
         
         if operation_group:
-            base_query += " AND op.group_name = %s"
-            fallback_query += " AND op.group_name = %s"
+            query += " AND op.group_name = %s"
             params.append(operation_group)
         
-        base_query += " ORDER BY op.name LIMIT %s"
-        fallback_query += " ORDER BY op.name LIMIT %s"
-        params.append(limit)
+        query += self._keyset_filter(OPERATIONS_SORT, cursor, params)
         
-        try:
-            operations = await self.execute_query(base_query, tuple(params))
-        except Exception as e:
-            if "Unknown column" in str(e):
-                operations = await self.execute_query(fallback_query, tuple(params))
-            else:
-                raise
+        query += f" {order_by_clause(OPERATIONS_SORT)} LIMIT %s"
+        params.append(limit + 1)
+        
+        operations = await self._execute_compiled(
+            'operations_select', self._build_operations_select, query, tuple(params)
+        )
+        operations, next_cursor = paginate(operations, limit, OPERATIONS_SORT)
         
         return {
             "operations": operations,
-            "count": len(operations)
+            "count": len(operations),
+            "next_cursor": next_cursor
         }
     
     async def get_materials(
         self,
+        sklad_id: Optional[int] = None,
         low_stock_only: bool = False,
-        limit: int = 50
+        limit: int = 50,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Seznam materiálů na skladu (sklad_material)"""
+        """Seznam materiálů na skladu (sklad_material) a ocenění celého skladu"""
+        warehouse_filter = ""
+        warehouse_params: List[Any] = []
+        if sklad_id:
+            warehouse_filter = " AND sm.sklad_id = %s"
+            warehouse_params.append(sklad_id)
+        
         query = """
             SELECT 
                 sm.id,
@@ -580,15 +1478,40 @@ class DatabaseManager:
                 IFNULL(sm.price, 0) as cena_nakup,
                 sm.sklad_id as warehouse_id
             FROM sklad_material sm
-            ORDER BY sm.name
-            LIMIT %s
-        """
-        materials = await self.execute_query(query, (limit,))
+            WHERE 1=1
+        """ + warehouse_filter
+        params = list(warehouse_params)
         if low_stock_only:
-            materials = [m for m in materials if float(m.get('stock_quantity', 0) or 0) < float(m.get('min_quantity', 0) or 0)]
+            query += f" AND {LOW_STOCK_PREDICATE}"
+        query += self._keyset_filter(MATERIALS_SORT, cursor, params)
+        query += f" {order_by_clause(MATERIALS_SORT)} LIMIT %s"
+        params.append(limit + 1)
+        
+        # Ocenění a počty za celý sklad (ne jen za stránku) počítá databáze
+        summary_query = f"""
+            SELECT 
+                COUNT(*) as total_count,
+                IFNULL(SUM(CASE WHEN {LOW_STOCK_PREDICATE} THEN 1 ELSE 0 END), 0) as low_stock_count,
+                IFNULL(SUM(IFNULL(sm.count, 0) * IFNULL(sm.price, 0)), 0) as total_value
+            FROM sklad_material sm
+            WHERE 1=1
+        """ + warehouse_filter
+        
+        materials, summary = await self._gather(
+            self.execute_query(query, tuple(params)),
+            self.execute_query(summary_query, tuple(warehouse_params)),
+        )
+        materials, next_cursor = paginate(materials, limit, MATERIALS_SORT)
+        summary = summary[0] if summary else {}
         return {
             "materials": materials,
-            "count": len(materials)
+            "count": len(materials),
+            "summary": {
+                "total_count": int(summary.get('total_count') or 0),
+                "low_stock_count": int(summary.get('low_stock_count') or 0),
+                "total_value": float(summary.get('total_value') or 0),
+            },
+            "next_cursor": next_cursor
         }
     
     # ==================== STROJE ====================
@@ -596,7 +1519,8 @@ class DatabaseManager:
     async def get_machines(
         self,
         status_filter: Optional[str] = None,
-        limit: int = 50
+        limit: int = 50,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """Seznam strojů (podle schema: stroje + stroj_group)"""
         # status_filter není v aktuálním schématu podporován, ignorujeme ho
@@ -608,13 +1532,18 @@ class DatabaseManager:
                 sg.name AS group_name
             FROM stroje s
             LEFT JOIN stroj_group sg ON sg.id = s.group_id
-            ORDER BY s.name
-            LIMIT %s
+            WHERE 1=1
         """
-        machines = await self.execute_query(query, (limit,))
+        params = []
+        query += self._keyset_filter(MACHINES_SORT, cursor, params)
+        query += f" {order_by_clause(MACHINES_SORT)} LIMIT %s"
+        params.append(limit + 1)
+        machines = await self.execute_query(query, tuple(params))
+        machines, next_cursor = paginate(machines, limit, MACHINES_SORT)
         return {
             "machines": machines,
-            "count": len(machines)
+            "count": len(machines),
+            "next_cursor": next_cursor
         }
     
     # ==================== STATISTIKY ====================
@@ -624,7 +1553,36 @@ class DatabaseManager:
         date_from: str,
         date_to: str
     ) -> Dict[str, Any]:
-        """Statistiky výroby"""
+        """Statistiky výroby.
+        
+        Je-li čerstvý analytický snapshot, počítá se nad ním. Jinak se pro rozsah
+        celých dnů (YYYY-MM-DD, včetně date_to) odpověď skládá z denního rollupu;
+        rozsah s časovou složkou nebo delší než cache rollupu (max_days) se počítá
+        přímo nad readdata. Výsledek nese
+        'freshness' (zdroj dat a stáří snapshotu).
+        """
+        day_from, day_to = parse_day(date_from), parse_day(date_to)
+        whole_days = bool(day_from and day_to and day_from <= day_to)
+        if self.analytics_store and self.analytics_store.is_fresh(('readdata', 'operation')):
+            stats = await self.analytics_store.production_stats(date_from, date_to, whole_days=whole_days)
+            return {
+                "period": {
+                    "from": date_from,
+                    "to": date_to
+                },
+                **stats
+            }
+        if self.stats_rollup and whole_days and self.stats_rollup.covers(day_from, day_to):
+            daily, operations = await self.stats_rollup.get_range(day_from, day_to)
+            return {
+                "period": {
+                    "from": date_from,
+                    "to": date_to
+                },
+                "daily_stats": daily,
+                "top_operations": operations,
+                "freshness": {"source": "live"}
+            }
         
         # Podle schema má readdata sloupec 'start' a 'finish' (datetime). Použijeme 'start'.
         coalesce_expr = "rd.start"
@@ -639,7 +1597,6 @@ class DatabaseManager:
             GROUP BY DATE({coalesce_expr})
             ORDER BY date
         """
-        hours = await self.execute_query(hours_query, (date_from, date_to))
 
         operations_query = f"""
             SELECT 
@@ -653,7 +1610,10 @@ class DatabaseManager:
             ORDER BY total_hours DESC
             LIMIT 10
         """
-        operations = await self.execute_query(operations_query, (date_from, date_to))
+        hours, operations = await self._gather(
+            self.execute_query(hours_query, (date_from, date_to)),
+            self.execute_query(operations_query, (date_from, date_to)),
+        )
         
         return {
             "period": {
@@ -661,5 +1621,6 @@ class DatabaseManager:
                 "to": date_to
             },
             "daily_stats": hours,
-            "top_operations": operations
+            "top_operations": operations,
+            "freshness": {"source": "live"}
         }
@@ -0,0 +1,262 @@
+"""
+Connection Pool pro eMISTR MCP Server
+Konfigurovatelný pool nad aiomysql s předehřátím, pingem nečinných spojení,
+měřením čekání na acquire a volitelným adaptivním řízením velikosti
+"""
+
+import asyncio
+import collections
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+import aiomysql
+
+logger = logging.getLogger('emistr-mcp.pool')
+
+
+DEFAULT_POOL_CONFIG = {
+    "minsize": 1,
+    "maxsize": 10,
+    "recycle": 3600,        # s; spojení nečinná déle se zavřou (-1 = vypnuto)
+    "ping_interval": 60,    # s; spojení nečinná déle se před použitím pingnou (0 = vypnuto)
+    "prewarm": True,        # při startu otevřít a ověřit minsize spojení
+    "queue_depth": None,    # max. počet čekajících na spojení; další požadavky se hned odmítnou (None = bez limitu)
+    "adaptive": {
+        "enabled": False,
+        "min_size": None,   # výchozí = minsize
+        "max_size": None,   # výchozí = maxsize
+        "interval": 10,     # s; perioda vyhodnocení
+        "target_wait_ms": 50,
+        "low_utilisation": 0.5,
+    },
+}
+
+
+class PoolBusyError(Exception):
+    """Fronta na spojení z poolu je plná - požadavek se odmítne místo čekání"""
+
+    def __init__(self, pool_name: str):
+        self.pool_name = pool_name
+        super().__init__(f"Pool '{pool_name}' je přetížen")
+
+
+class _ResizableLimiter:
+    """Semafor s měnitelným limitem (aiomysql pool za běhu velikost měnit neumí)"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.waiting = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            self.waiting += 1
+            try:
+                await self._cond.wait_for(lambda: self.in_use < self.limit)
+            finally:
+                self.waiting -= 1
+            self.in_use += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.in_use -= 1
+            self._cond.notify()
+
+    async def set_limit(self, limit: int) -> None:
+        async with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+
+class ManagedPool:
+    """aiomysql pool s měřením čekání a volitelným adaptivním limitem"""
+
+    def __init__(self, name: str, conn_kwargs: Dict[str, Any], pool_config: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self._conn_kwargs = conn_kwargs
+        cfg = dict(DEFAULT_POOL_CONFIG)
+        cfg.update(pool_config or {})
+        adaptive = dict(DEFAULT_POOL_CONFIG['adaptive'])
+        adaptive.update((pool_config or {}).get('adaptive') or {})
+
+        self.minsize = int(cfg['minsize'])
+        self.maxsize = max(int(cfg['maxsize']), self.minsize)
+        self.recycle = int(cfg['recycle']) if cfg['recycle'] is not None else -1
+        self.ping_interval = float(cfg['ping_interval'] or 0)
+        self.prewarm = bool(cfg['prewarm'])
+        self.queue_depth = int(cfg['queue_depth']) if cfg.get('queue_depth') is not None else None
+
+        self.adaptive = bool(adaptive['enabled'])
+        self.adaptive_min = int(adaptive['min_size'] or self.minsize)
+        self.adaptive_max = max(int(adaptive['max_size'] or self.maxsize), self.adaptive_min)
+        self.adaptive_interval = float(adaptive['interval'])
+        self.target_wait_ms = float(adaptive['target_wait_ms'])
+        self.low_utilisation = float(adaptive['low_utilisation'])
+
+        # V adaptivním režimu je fyzický pool dimenzován na horní mez a skutečný
+        # počet souběžných spojení řídí limiter
+        initial_limit = self.maxsize if not self.adaptive else min(max(self.maxsize, self.adaptive_min), self.adaptive_max)
+        self._limiter = _ResizableLimiter(initial_limit)
+        self._pool = None
+        self._tuner_task: Optional[asyncio.Task] = None
+
+        # Statistiky čekání na acquire
+        self._acquires = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recent_waits = collections.deque(maxlen=1000)
+        self._peak_in_use = 0
+        self._pings = 0
+        self._rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._pool is not None
+
+    async def open(self) -> None:
+        """Vytvoří aiomysql pool, předehřeje spojení a případně spustí adaptivní ladění"""
+        self._pool = await aiomysql.create_pool(
+            minsize=self.minsize,
+            maxsize=self.adaptive_max if self.adaptive else self.maxsize,
+            pool_recycle=self.recycle,
+            **self._conn_kwargs
+        )
+        if self.prewarm:
+            await self._prewarm()
+        if self.adaptive:
+            self._tuner_task = asyncio.create_task(self._tune_loop())
+        logger.info("Connection pool '%s' created (minsize=%d, maxsize=%d, adaptive=%s)",
+                    self.name, self.minsize, self._limiter.limit, self.adaptive)
+
+    async def _prewarm(self) -> None:
+        """Otevře a pingne minsize spojení, aby první požadavky nečekaly na handshake"""
+        conns = []
+        try:
+            for _ in range(self.minsize):
+                conn = await self._pool.acquire()
+                conns.append(conn)
+            await asyncio.gather(*(conn.ping(reconnect=True) for conn in conns))
+        finally:
+            for conn in conns:
+                await self._pool.release(conn)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Zapůjčí spojení; měří čas čekání a pingne spojení nečinné déle než ping_interval"""
+        limiter = self._limiter
+        if (self.queue_depth is not None and limiter.in_use >= limiter.limit
+                and limiter.waiting >= self.queue_depth):
+            self._rejected += 1
+            raise PoolBusyError(self.name)
+        started = time.perf_counter()
+        await self._limiter.acquire()
+        try:
+            conn = await self._pool.acquire()
+        except BaseException:
+            await self._limiter.release()
+            raise
+        self._record_wait(time.perf_counter() - started)
+        try:
+            if self.ping_interval > 0 and asyncio.get_running_loop().time() - conn.last_usage > self.ping_interval:
+                self._pings += 1
+                await conn.ping(reconnect=True)
+            yield conn
+        finally:
+            await self._pool.release(conn)
+            await self._limiter.release()
+
+    def _record_wait(self, wait: float) -> None:
+        self._acquires += 1
+        self._total_wait += wait
+        if wait > self._max_wait:
+            self._max_wait = wait
+        self._recent_waits.append((time.monotonic(), wait))
+        if self._limiter.in_use > self._peak_in_use:
+            self._peak_in_use = self._limiter.in_use
+
+    def _window_waits(self, seconds: float):
+        horizon = time.monotonic() - seconds
+        return [w for ts, w in self._recent_waits if ts >= horizon]
+
+    async def _tune_loop(self) -> None:
+        """Periodicky upraví limit podle průměrného čekání a vytížení v posledním intervalu"""
+        while True:
+            await asyncio.sleep(self.adaptive_interval)
+            try:
+                await self._tune_once()
+            except Exception:
+                logger.exception("Adaptive tuning of pool '%s' failed", self.name)
+
+    async def _tune_once(self) -> None:
+        waits = self._window_waits(self.adaptive_interval)
+        avg_wait_ms = (sum(waits) / len(waits) * 1000) if waits else 0.0
+        limit = self._limiter.limit
+        utilisation = self._peak_in_use / limit if limit else 0.0
+        self._peak_in_use = self._limiter.in_use
+
+        new_limit = limit
+        if avg_wait_ms > self.target_wait_ms and limit < self.adaptive_max:
+            # Rychlý růst při frontě, pomalý pokles při nečinnosti
+            new_limit = min(self.adaptive_max, limit + max(1, limit // 4))
+        elif avg_wait_ms < self.target_wait_ms / 4 and utilisation < self.low_utilisation and limit > self.adaptive_min:
+            new_limit = limit - 1
+        if new_limit != limit:
+            logger.info("Pool '%s' resized %d -> %d (avg wait %.1f ms, utilisation %.0f%%)",
+                        self.name, limit, new_limit, avg_wait_ms, utilisation * 100)
+            await self._limiter.set_limit(new_limit)
+
+    async def kill_query(self, thread_id: int) -> bool:
+        """KILL QUERY přes samostatné spojení (pool může být vyčerpaný); False = nepodařilo se"""
+        try:
+            conn = await aiomysql.connect(connect_timeout=5, **self._conn_kwargs)
+        except Exception:
+            logger.warning("Pool '%s': cannot open connection to kill query %s", self.name, thread_id)
+            return False
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute("KILL QUERY %s", (thread_id,))
+            return True
+        except Exception as e:
+            # Typicky "Unknown thread id" - dotaz mezitím skončil
+            logger.debug("Pool '%s': KILL QUERY %s failed: %s", self.name, thread_id, e)
+            return False
+        finally:
+            conn.close()
+
+    async def close(self) -> None:
+        if self._tuner_task:
+            self._tuner_task.cancel()
+            try:
+                await self._tuner_task
+            except asyncio.CancelledError:
+                pass
+            self._tuner_task = None
+        if self._pool:
+            self._pool.close()
+            await self._pool.wait_closed()
+
+    def stats(self) -> Dict[str, Any]:
+        """Metriky poolu (velikost, vytížení, čekání na acquire)"""
+        recent = sorted(w for _, w in self._recent_waits)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            'name': self.name,
+            'minsize': self.minsize,
+            'maxsize': self.adaptive_max if self.adaptive else self.maxsize,
+            'limit': self._limiter.limit,
+            'adaptive': self.adaptive,
+            'size': self._pool.size if self._pool else 0,
+            'free': self._pool.freesize if self._pool else 0,
+            'in_use': self._limiter.in_use,
+            'waiting': self._limiter.waiting,
+            'queue_depth': self.queue_depth,
+            'rejected': self._rejected,
+            'acquires': self._acquires,
+            'avg_wait_ms': round(self._total_wait / self._acquires * 1000, 3) if self._acquires else 0.0,
+            'p95_wait_ms': round(p95 * 1000, 3),
+            'max_wait_ms': round(self._max_wait * 1000, 3),
+            'pings': self._pings,
+        }
@@ -0,0 +1,261 @@
+"""
+Exporter pro eMISTR MCP Server
+Streamovaný export celého výřezu tabulky (zakázky, pohyby materiálu) jako CSV,
+NDJSON nebo Parquet - dávky z DB se anonymizují a kódují jedna po druhé,
+paměť je konstantní bez ohledu na velikost exportu
+"""
+
+import csv
+import io
+import json
+import logging
+from typing import Dict, List, Any, Optional, AsyncIterator, Callable, Tuple
+from urllib.parse import urlencode
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # volitelná závislost (jen pro formát parquet)
+    pyarrow = None
+
+logger = logging.getLogger('emistr-mcp.export')
+
+
+# Formát -> (Content-Type, přípona souboru)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Datová sada -> povolené filtry (stejné jako u odpovídajícího list toolu)
+EXPORT_DATASETS = {
+    "orders": ("status", "customer_id", "date_from", "date_to", "limit"),
+    "material_movements": ("material_id", "date_from", "date_to", "limit"),
+}
+
+INTEGER_FILTERS = ("customer_id", "material_id", "limit")
+
+DEFAULT_EXPORT_CONFIG = {
+    "chunk_size": 1000,
+    "base_url": "",   # veřejná adresa HTTP serveru pro odkazy z toolu export_data ("" = relativní cesta)
+}
+
+
+class ExportError(ValueError):
+    """Neplatný požadavek na export (datová sada, formát, filtry)"""
+
+
+def export_filters(dataset: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Povolené filtry datové sady z argumentů (prázdné hodnoty se vynechají, čísla se převedou)"""
+    if dataset not in EXPORT_DATASETS:
+        raise ExportError(f"Neznámá datová sada exportu: {dataset} (dostupné: {', '.join(EXPORT_DATASETS)})")
+    filters: Dict[str, Any] = {}
+    for key in EXPORT_DATASETS[dataset]:
+        value = arguments.get(key)
+        if value is None or value == "":
+            continue
+        if key in INTEGER_FILTERS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ExportError(f"Parametr {key} musí být celé číslo") from None
+        filters[key] = value
+    return filters
+
+
+def check_format(fmt: str) -> str:
+    fmt = (fmt or "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Nepodporovaný formát exportu: {fmt} (dostupné: {', '.join(EXPORT_FORMATS)})")
+    if fmt == "parquet" and pyarrow is None:
+        raise ExportError("Formát parquet vyžaduje balíček pyarrow")
+    return fmt
+
+
+def export_url(dataset: str, fmt: str, filters: Dict[str, Any], base_url: str = "") -> str:
+    query = urlencode({"format": fmt, **filters})
+    return f"{base_url.rstrip('/')}/export/{dataset}?{query}"
+
+
+# ==================== KODÉRY ====================
+
+async def encode_csv(chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """CSV s hlavičkou podle sloupců první dávky (UTF-8 s BOM kvůli Excelu)"""
+    buffer = io.StringIO()
+    writer = None
+    first = True
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(chunk[0].keys()), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerows(chunk)
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        yield (b'\xef\xbb\xbf' + data) if first else data
+        first = False
+
+
+async def encode_ndjson(chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Jeden JSON objekt na řádek"""
+    async for chunk in chunks:
+        if chunk:
+            yield "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in chunk).encode('utf-8')
+
+
+class _ChunkSink:
+    """Zapisovatelný "soubor", ze kterého se po každé dávce odebere zapsaný obsah"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet_schema(rows: List[Dict[str, Any]]):
+    """Schéma z první dávky; sloupce bez hodnot (jen NULL) se ukládají jako text"""
+    inferred = pyarrow.Table.from_pylist(rows).schema
+    return pyarrow.schema([
+        pyarrow.field(f.name, pyarrow.string()) if pyarrow.types.is_null(f.type) else f
+        for f in inferred
+    ])
+
+
+async def encode_parquet(chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Parquet - každá dávka je jedna row group, zapsané bajty se posílají průběžně"""
+    sink = _ChunkSink()
+    writer = None
+    text_columns: List[str] = []
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if writer is None:
+                schema = _parquet_schema(chunk)
+                text_columns = [f.name for f in schema if pyarrow.types.is_string(f.type)]
+                writer = pyarrow.parquet.ParquetWriter(sink, schema)
+            rows = [
+                {**row, **{c: str(row[c]) for c in text_columns if row.get(c) is not None and not isinstance(row[c], str)}}
+                for row in chunk
+            ]
+            writer.write_table(pyarrow.Table.from_pylist(rows, schema=writer.schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        if writer is not None:
+            writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+ENCODERS: Dict[str, Callable[[AsyncIterator[List[Dict[str, Any]]]], AsyncIterator[bytes]]] = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+    "parquet": encode_parquet,
+}
+
+
+class Exporter:
+    """Sestavení exportu: DB stream -> anonymizace po dávkách -> kodér formátu"""
+
+    def __init__(self, db, anonymizer, config: Optional[Dict[str, Any]] = None):
+        cfg = dict(DEFAULT_EXPORT_CONFIG)
+        cfg.update(config or {})
+        self._db = db
+        self._anonymizer = anonymizer
+        self.chunk_size = int(cfg['chunk_size'])
+        self.base_url = cfg['base_url'] or ""
+
+    def _chunks(self, dataset: str, filters: Dict[str, Any], timeout: Optional[float]) -> AsyncIterator[List[Dict[str, Any]]]:
+        if dataset == "orders":
+            return self._db.iter_orders(
+                status=filters.get('status', ""),
+                customer_id=filters.get('customer_id'),
+                date_from=filters.get('date_from'),
+                date_to=filters.get('date_to'),
+                limit=filters.get('limit'),
+                chunk_size=self.chunk_size,
+                timeout=timeout,
+            )
+        return self._db.iter_material_movements(
+            material_id=filters.get('material_id'),
+            date_from=filters.get('date_from'),
+            date_to=filters.get('date_to'),
+            limit=filters.get('limit'),
+            chunk_size=self.chunk_size,
+            timeout=timeout,
+        )
+
+    def _anonymize(self, dataset: str, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if dataset == "orders" and hasattr(self._anonymizer, 'anonymize_orders'):
+            return self._anonymizer.anonymize_orders({'orders': chunk})['orders']
+        return chunk
+
+    async def _anonymized(self, dataset: str, chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[List[Dict[str, Any]]]:
+        async for chunk in chunks:
+            yield self._anonymize(dataset, chunk)
+
+    def open(self, dataset: str, fmt: str, arguments: Dict[str, Any],
+             timeout: Optional[float] = None) -> Tuple[str, str, AsyncIterator[bytes]]:
+        """Validuje požadavek a vrátí (Content-Type, název souboru, iterátor bajtů).
+
+        Iterátor je třeba dočíst nebo uzavřít (aclose), aby se uvolnilo spojení s DB.
+        """
+        filters = export_filters(dataset, arguments)
+        fmt = check_format(fmt)
+        content_type, extension = EXPORT_FORMATS[fmt]
+        return content_type, f"{dataset}.{extension}", self._stream(dataset, fmt, filters, timeout)
+
+    async def _stream(self, dataset: str, fmt: str, filters: Dict[str, Any], timeout: Optional[float]) -> AsyncIterator[bytes]:
+        chunks = self._chunks(dataset, filters, timeout)
+        try:
+            encoded = ENCODERS[fmt](self._anonymized(dataset, chunks))
+            try:
+                async for data in encoded:
+                    yield data
+            finally:
+                await encoded.aclose()
+        finally:
+            await chunks.aclose()
+
+    def describe(self, dataset: str, fmt: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Popis exportu pro tool export_data (odkaz na streamovaný HTTP download)"""
+        filters = export_filters(dataset, arguments)
+        fmt = check_format(fmt)
+        content_type, extension = EXPORT_FORMATS[fmt]
+        return {
+            "dataset": dataset,
+            "format": fmt,
+            "content_type": content_type,
+            "filename": f"{dataset}.{extension}",
+            "filters": filters,
+            "url": export_url(dataset, fmt, filters, self.base_url),
+        }
@@ -0,0 +1,369 @@
+"""
+Index Advisor pro eMISTR MCP Server
+Projde tvary dotazů, které tools vydávají, spustí pro ně EXPLAIN, porovná
+existující indexy (information_schema.STATISTICS) s doporučenými a navrhne
+příkazy CREATE INDEX. Nic neaplikuje - jen diagnostika před nasazením.
+
+Spuštění: python index_advisor.py [--config config.json] [--json] [--min-rows 1000]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional, Tuple
+
+from database import DatabaseManager
+from pagination import encode_cursor
+from slow_query_log import fingerprint
+
+logger = logging.getLogger('emistr-mcp.index-advisor')
+
+
+# Vzorová volání tools: každá varianta filtrů vydá jiný tvar dotazu.
+# Hodnoty jsou jen pro EXPLAIN (plán nezávisí na tom, zda řádky existují).
+TOOL_SCENARIOS: Dict[str, List[Dict[str, Any]]] = {
+    "get_orders": [
+        {},
+        {"status": "ANO"},
+        {"customer_id": 1, "date_from": "2024-01-01", "date_to": "2024-12-31"},
+        {"cursor": encode_cursor({"priorita": 1, "start": "2024-01-01 00:00:00", "id": 1})},
+    ],
+    "get_order_detail": [
+        {"order_id": 1},
+        {"order_code": "ZAK-1"},
+    ],
+    "get_order_details": [
+        {"order_ids": [1, 2]},
+        {"order_codes": ["ZAK-1", "ZAK-2"]},
+    ],
+    "search_orders": [
+        {"search_term": "abc"},   # trigramový index -> načtení nalezených id (o.id IN ...)
+        {"search_term": "ab"},    # krátký term -> LIKE přes prohledávané sloupce
+    ],
+    "get_workers": [
+        {},
+        {"group_name": "Výroba", "cursor": encode_cursor({"id": 1})},
+    ],
+    "get_worker_detail": [
+        {"worker_id": 1},
+    ],
+    "get_workers_stats": [
+        {"worker_ids": [1, 2]},
+        {"group_name": "Výroba"},
+    ],
+    "get_materials": [
+        {},
+        {"sklad_id": 1, "low_stock_only": True},
+    ],
+    "get_material_movements": [
+        {},
+        {"material_id": 1, "date_from": "2024-01-01", "date_to": "2024-12-31", "bucket": "month"},
+        {"date_from": "2024-01-01", "cursor": encode_cursor({"datum": "2024-06-01 00:00:00", "id": 1})},
+    ],
+    "get_operations": [
+        {},
+        {"operation_group": "Montáž"},
+    ],
+    "get_machines": [
+        {},
+    ],
+    "get_production_stats": [
+        {"date_from": "2024-01-01", "date_to": "2024-01-31"},
+        {"date_from": "2024-01-01 06:00:00", "date_to": "2024-01-01 14:00:00"},
+    ],
+}
+
+# Indexy, na které dotazy serveru spoléhají: (tabulka, sloupce, k čemu slouží)
+RECOMMENDED_INDEXES: List[Tuple[str, Tuple[str, ...], str]] = [
+    ("c_order", ("priorita", "start"), "get_orders: řazení a keyset stránkování (priorita, start, id)"),
+    ("c_order", ("customer_id",), "get_orders: filtr zákazníka"),
+    ("c_order", ("code",), "get_order_detail / get_order_details podle kódu zakázky"),
+    ("order_work", ("order_id", "poradi"), "operace zakázky seřazené podle pořadí"),
+    ("material", ("order_id",), "materiál zakázky"),
+    ("readdata", ("start",), "get_production_stats: rozsah dnů"),
+    ("readdata", ("worker_id", "datum"), "get_worker_detail / get_workers_stats: hodiny za posledních N dní"),
+    ("sklad_material_pohyb", ("material_id", "datum"), "get_material_movements: pohyby materiálu"),
+    ("sklad_material_pohyb", ("datum",), "get_material_movements: pohyby za období bez materiálu"),
+    ("sklad_material", ("sklad_id",), "get_materials: filtr skladu"),
+    ("worker", ("group_name",), "get_workers / get_workers_stats: filtr skupiny"),
+]
+
+# Vzorové výsledky dotazů, na které navazují další dotazy toolu (podřetězec dotazu -> řádky);
+# ostatní dotazy vrací v režimu zachytávání prázdný výsledek
+SAMPLE_ROWS: List[Tuple[str, List[Dict[str, Any]]]] = [
+    # kotva kurzoru get_workers a hlavička get_worker_detail
+    ("WHERE w.id = %s", [{"id": 1, "name": "Vzor", "group_id": 1}]),
+]
+
+
+def sample_rows(query: str) -> List[Dict[str, Any]]:
+    for fragment, rows in SAMPLE_ROWS:
+        if fragment in query:
+            return rows
+    return []
+
+
+class _SampleSearchIndex:
+    """Postavený vyhledávací index pro zachytávání: termy od 3 znaků najdou dvě zakázky"""
+
+    ready = True
+
+    def search(self, term: str, limit: Optional[int] = None) -> Optional[List[int]]:
+        return [1, 2] if len(term) >= 3 else None
+
+    async def stop(self) -> None:
+        pass
+
+
+def _capture_config(config) -> SimpleNamespace:
+    """Konfigurace stínové instance: bez komponent s vlastními prostředky (snapshot, index)"""
+    database = dict(getattr(config, 'database', None) or {})
+    database['analytics_store'] = {'enabled': False}
+    database['search_index'] = {'enabled': False}
+    return SimpleNamespace(database=database, limits=getattr(config, 'limits', None))
+
+
+# Přístup k tabulce, který čte všechny řádky (celou tabulku nebo celý index)
+FULL_SCAN_TYPES = ("ALL", "index")
+
+_TABLE_REF_RE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NOT_ALIASES = {"where", "left", "right", "inner", "join", "on", "order", "group", "limit", "using"}
+_IDENTIFIER_MAX = 64
+
+
+def table_aliases(query: str) -> Dict[str, str]:
+    """alias -> tabulka pro tabulky z FROM/JOIN (tabulka bez aliasu mapuje sama na sebe)"""
+    aliases: Dict[str, str] = {}
+    for table, alias in _TABLE_REF_RE.findall(query):
+        if table.lower() == "information_schema":
+            continue
+        aliases[table] = table
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+def index_name(table: str, columns: Tuple[str, ...]) -> str:
+    return f"idx_{table}_{'_'.join(columns)}"[:_IDENTIFIER_MAX]
+
+
+def create_index_statement(table: str, columns: Tuple[str, ...]) -> str:
+    return f"CREATE INDEX {index_name(table, columns)} ON {table} ({', '.join(columns)});"
+
+
+def is_covered(columns: Tuple[str, ...], indexes: Dict[str, List[str]]) -> Optional[str]:
+    """Název existujícího indexu, jehož levý prefix jsou dané sloupce (None = chybí)"""
+    wanted = [c.lower() for c in columns]
+    for name, index_columns in indexes.items():
+        if [c.lower() for c in index_columns[:len(wanted)]] == wanted:
+            return name
+    return None
+
+
+class IndexAdvisor:
+    """Analýza indexů pro dotazy serveru nad připojenou databází.
+
+    Tvary dotazů se získají spuštěním vzorových volání na samostatné instanci
+    DatabaseManager v režimu zachytávání (capture_queries), takže odpovídají
+    přesně tomu, co tools vydávají pro aktuální schéma. Stínová instance sdílí
+    katalog schématu, nemá analytický snapshot ani vlastní vyhledávací index
+    (search_orders jde cestou postaveného indexu přes _SampleSearchIndex) a nic
+    neotevírá. EXPLAIN a čtení information_schema běží na primáru přes předané
+    připojení.
+    """
+
+    def __init__(self, db, min_rows: int = 1000, scenarios: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self._db = db
+        self.min_rows = min_rows
+        self.scenarios = scenarios if scenarios is not None else TOOL_SCENARIOS
+
+    async def capture_shapes(self) -> List[Tuple[str, str, tuple]]:
+        """Unikátní tvary dotazů: [(tool, dotaz, vzorové parametry)]"""
+        shadow = DatabaseManager(_capture_config(self._db.config))
+        shadow.catalog = self._db.catalog
+        shadow.search_index = _SampleSearchIndex()
+        shapes: List[Tuple[str, str, tuple]] = []
+        seen = set()
+        try:
+            for tool, calls in self.scenarios.items():
+                method = getattr(shadow, tool, None)
+                if method is None:
+                    continue
+                for kwargs in calls:
+                    with shadow.tool_scope(tool), shadow.capture_queries(sample_rows) as captured:
+                        try:
+                            await method(**kwargs)
+                        except Exception as e:
+                            logger.warning("Scenario %s(%s) failed: %s", tool, kwargs, e)
+                    for query, params, _ in captured:
+                        key = (tool, fingerprint(query))
+                        if key not in seen:
+                            seen.add(key)
+                            shapes.append((tool, query, params))
+        finally:
+            await shadow.close()
+        return shapes
+
+    async def existing_indexes(self, tables: List[str]) -> Dict[str, Dict[str, List[str]]]:
+        """tabulka -> {název indexu: sloupce v pořadí} z information_schema.STATISTICS"""
+        if not tables:
+            return {}
+        placeholders = ", ".join(["%s"] * len(tables))
+        rows = await self._db.execute_query(
+            f"""
+            SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders})
+            ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+            """,
+            (self._db_name(), *tables)
+        )
+        result: Dict[str, Dict[str, List[str]]] = {table: {} for table in tables}
+        for row in rows:
+            result.setdefault(row['TABLE_NAME'], {}).setdefault(row['INDEX_NAME'], []).append(row['COLUMN_NAME'])
+        return result
+
+    async def _existing_columns(self, tables: List[str]) -> Dict[str, set]:
+        placeholders = ", ".join(["%s"] * len(tables))
+        rows = await self._db.execute_query(
+            f"""
+            SELECT TABLE_NAME, COLUMN_NAME
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders})
+            """,
+            (self._db_name(), *tables)
+        )
+        columns: Dict[str, set] = {}
+        for row in rows:
+            columns.setdefault(row['TABLE_NAME'], set()).add(row['COLUMN_NAME'].lower())
+        return columns
+
+    def _db_name(self) -> Optional[str]:
+        return self._db._db_setting('database')
+
+    async def _explain_shape(self, query: str, params: tuple) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {'fingerprint': fingerprint(query), 'full_scans': [], 'filesort': False}
+        try:
+            plan = await self._db._explain(query, params)
+        except Exception as e:
+            entry['error'] = str(e)
+            return entry
+        aliases = table_aliases(query)
+        entry['plan'] = [
+            {
+                'table': aliases.get(row.get('table'), row.get('table')),
+                'type': row.get('type'),
+                'key': row.get('key'),
+                'rows': row.get('rows'),
+                'extra': row.get('Extra'),
+            }
+            for row in plan
+        ]
+        for step in entry['plan']:
+            rows = int(step['rows'] or 0)
+            if step['type'] in FULL_SCAN_TYPES and rows >= self.min_rows:
+                entry['full_scans'].append({'table': step['table'], 'type': step['type'], 'rows': rows})
+            if 'filesort' in str(step['extra'] or '') and rows >= self.min_rows:
+                entry['filesort'] = True
+        return entry
+
+    async def run(self) -> Dict[str, Any]:
+        """Kompletní report: plány po tools, existující a chybějící indexy"""
+        shapes = await self.capture_shapes()
+        tools: Dict[str, Dict[str, Any]] = {}
+        scanned: Dict[str, set] = {}
+        for tool, query, params in shapes:
+            entry = await self._explain_shape(query, params)
+            report = tools.setdefault(tool, {'full_scan': False, 'statements': []})
+            report['statements'].append(entry)
+            for scan in entry['full_scans']:
+                report['full_scan'] = True
+                scanned.setdefault(scan['table'], set()).add(tool)
+
+        queried_tables = {table for _, query, _ in shapes for table in table_aliases(query).values()}
+        recommended_tables = sorted({table for table, _, _ in RECOMMENDED_INDEXES})
+        tables = sorted(queried_tables | set(recommended_tables))
+        indexes = await self.existing_indexes(tables)
+        columns = await self._existing_columns(recommended_tables)
+
+        missing = []
+        for table, index_columns, reason in RECOMMENDED_INDEXES:
+            available = columns.get(table, set())
+            if not all(c.lower() in available for c in index_columns):
+                # Tabulka nebo sloupec v tomto schématu není - index nemá smysl navrhovat
+                continue
+            if is_covered(index_columns, indexes.get(table, {})):
+                continue
+            missing.append({
+                'table': table,
+                'columns': list(index_columns),
+                'reason': reason,
+                'full_scan_tools': sorted(scanned.get(table, ())),
+                'statement': create_index_statement(table, index_columns),
+            })
+
+        return {
+            'database': self._db_name(),
+            'min_rows': self.min_rows,
+            'full_scan_tools': sorted(tool for tool, report in tools.items() if report['full_scan']),
+            'missing_indexes': missing,
+            'existing_indexes': indexes,
+            'tools': tools,
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Čitelný textový výpis reportu (pro CLI)"""
+    lines = [f"Databáze: {report['database']} (plné průchody od {report['min_rows']} řádků)", ""]
+    lines.append("Tools s plným průchodem tabulky:")
+    for tool in report['full_scan_tools'] or []:
+        tables = sorted({
+            f"{scan['table']} (~{scan['rows']} řádků)"
+            for stmt in report['tools'][tool]['statements'] for scan in stmt['full_scans']
+        })
+        lines.append(f"  {tool}: {', '.join(tables)}")
+    if not report['full_scan_tools']:
+        lines.append("  žádné")
+    errors = [(tool, stmt) for tool, r in report['tools'].items() for stmt in r['statements'] if stmt.get('error')]
+    if errors:
+        lines.append("")
+        lines.append("EXPLAIN selhal:")
+        for tool, stmt in errors:
+            lines.append(f"  {tool}: {stmt['error']}")
+    lines.append("")
+    lines.append("Doporučené indexy (neaplikováno):")
+    for index in report['missing_indexes']:
+        lines.append(f"  -- {index['reason']}")
+        lines.append(f"  {index['statement']}")
+    if not report['missing_indexes']:
+        lines.append("  všechny doporučené indexy existují")
+    return "\n".join(lines)
+
+
+async def _main(args) -> int:
+    from config import Config
+
+    db = DatabaseManager(Config(args.config))
+    await db.connect(start_background=False)
+    try:
+        report = await IndexAdvisor(db, min_rows=args.min_rows).run()
+    finally:
+        await db.close()
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    else:
+        print(format_report(report))
+    return 1 if report['missing_indexes'] else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Index advisor pro dotazy eMISTR MCP Serveru")
+    parser.add_argument('--config', default=None, help="cesta ke config.json (výchozí EMISTR_CONFIG nebo config.json)")
+    parser.add_argument('--json', action='store_true', help="výstup jako JSON")
+    parser.add_argument('--min-rows', type=int, default=1000, help="plný průchod menší tabulky se nehlásí")
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
@@ -0,0 +1,95 @@
+"""
+Stránkování pro eMISTR MCP Server
+Keyset (cursor) stránkování - neprůhledný kurzor nese hodnoty třídicího klíče
+posledního vráceného řádku, takže každá stránka stojí stejně bez ohledu na hloubku
+"""
+
+import base64
+import json
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+# Třídicí klíč: (pole ve výsledku, SQL výraz, směr 'ASC'/'DESC')
+SortKey = Tuple[str, str, str]
+
+
+class InvalidCursorError(ValueError):
+    """Kurzor nelze dekódovat nebo neodpovídá třídicímu klíči"""
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Zakóduje hodnoty klíče do neprůhledného URL-safe řetězce"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Dekóduje kurzor vytvořený encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception as e:
+        raise InvalidCursorError("Neplatný kurzor stránkování") from e
+    if not isinstance(values, dict):
+        raise InvalidCursorError("Neplatný kurzor stránkování")
+    return values
+
+
+def order_by_clause(keys: Sequence[SortKey]) -> str:
+    return "ORDER BY " + ", ".join(f"{expr} {direction}" for _, expr, direction in keys)
+
+
+def keyset_predicate(keys: Sequence[SortKey], values: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Podmínka "řádky za kurzorem" pro daný třídicí klíč.
+
+    Respektuje řazení NULL v MariaDB/MySQL (NULL je nejmenší hodnota: v ASC na
+    začátku, v DESC na konci), takže stránkování je přesné i pro NULL sloupce.
+    """
+    missing = [field for field, _, _ in keys if field not in values]
+    if missing:
+        raise InvalidCursorError("Neplatný kurzor stránkování")
+
+    disjuncts: List[str] = []
+    params: List[Any] = []
+    for i, (field, expr, direction) in enumerate(keys):
+        value = values[field]
+        if direction.upper() == 'DESC':
+            if value is None:
+                # V DESC jsou NULL poslední - za nimi v tomto sloupci nic není
+                continue
+            after = f"({expr} < %s OR {expr} IS NULL)"
+            after_params = [value]
+        else:
+            if value is None:
+                after = f"{expr} IS NOT NULL"
+                after_params = []
+            else:
+                after = f"{expr} > %s"
+                after_params = [value]
+
+        equal_parts: List[str] = []
+        equal_params: List[Any] = []
+        for prev_field, prev_expr, _ in keys[:i]:
+            prev_value = values[prev_field]
+            if prev_value is None:
+                equal_parts.append(f"{prev_expr} IS NULL")
+            else:
+                equal_parts.append(f"{prev_expr} = %s")
+                equal_params.append(prev_value)
+
+        disjuncts.append("(" + " AND ".join(equal_parts + [after]) + ")")
+        params.extend(equal_params + after_params)
+
+    if not disjuncts:
+        return "1=0", []
+    return "(" + " OR ".join(disjuncts) + ")", params
+
+
+def paginate(rows: List[Dict[str, Any]], limit: int, keys: Sequence[SortKey]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Ořízne řádky načtené s LIMIT limit+1 a vrátí (stránka, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    if not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor({field: last.get(field) for field, _, _ in keys})
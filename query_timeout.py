@@ -0,0 +1,72 @@
+"""
+Query Timeout pro eMISTR MCP Server
+Deadline dotazů pro jedno tool volání (contextvar) a jejich vynucení na straně
+serveru (MariaDB max_statement_time / MySQL MAX_EXECUTION_TIME) i klienta
+"""
+
+import contextvars
+import re
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Absolutní deadline (time.monotonic) aktuálního tool volání; dědí ho i úlohy z _gather
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('emistr_query_deadline', default=None)
+
+# Chybové kódy "statement timeout" (MariaDB ER_STATEMENT_TIMEOUT, MySQL ER_QUERY_TIMEOUT)
+SERVER_TIMEOUT_ERRORS = (1969, 3024)
+
+# Klientský timeout je o chvilku delší, aby dotaz normálně ukončil server a spojení zůstalo použitelné
+CLIENT_GRACE = 1.0
+
+_SELECT_RE = re.compile(r'^\s*SELECT\b', re.IGNORECASE)
+
+
+class QueryTimeoutError(Exception):
+    """Dotaz překročil časový limit (nebo byl deadline vyčerpán dřív, než začal)"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        super().__init__(f"Dotaz překročil časový limit {timeout:.0f} s" if timeout else "Dotaz překročil časový limit")
+
+
+def set_deadline(seconds: Optional[float]) -> contextvars.Token:
+    """Nastaví deadline za `seconds` od teď (None/0 = bez limitu); vrací token pro reset_deadline"""
+    return _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _deadline.reset(token)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    token = set_deadline(seconds)
+    try:
+        yield
+    finally:
+        reset_deadline(token)
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Zbývající čas do deadline v sekundách; bez nastaveného deadline vrací default"""
+    at = _deadline.get()
+    if at is None:
+        return default if default else None
+    return at - time.monotonic()
+
+
+def with_statement_timeout(query: str, seconds: Optional[float], dialect: Optional[str]) -> str:
+    """Přidá serverový limit doby běhu k SELECT dotazu podle dialektu serveru"""
+    if not seconds or not dialect or not _SELECT_RE.match(query):
+        return query
+    if dialect == 'mariadb':
+        return f"SET STATEMENT max_statement_time={seconds:.3f} FOR {query}"
+    if dialect == 'mysql':
+        return _SELECT_RE.sub(f"SELECT /*+ MAX_EXECUTION_TIME({int(seconds * 1000)}) */", query, count=1)
+    return query
+
+
+def is_server_timeout(exc: BaseException) -> bool:
+    args = getattr(exc, 'args', ())
+    return bool(args) and args[0] in SERVER_TIMEOUT_ERRORS
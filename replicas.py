@@ -0,0 +1,154 @@
+"""
+Read Replicas pro eMISTR MCP Server
+Sada read-replik s periodickým měřením replikačního zpoždění; analytické dotazy
+jdou na repliku v limitu zpoždění, jinak (nebo při výpadku) na primární server
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Any, Optional
+
+import aiomysql
+
+from db_pool import ManagedPool
+
+logger = logging.getLogger('emistr-mcp.replicas')
+
+
+DEFAULT_ROUTING = {
+    "max_lag_seconds": 30,
+    "check_interval": 10,
+    # Tools, jejichž dotazy smí jít na repliku (interaktivní lookupy zůstávají na primáru)
+    "tools": ["get_production_stats", "get_workers_stats"],
+}
+
+# Chyby spojení (pymysql CR_*): replika je nedostupná, dotaz se zopakuje na primáru
+CONNECTION_ERRORS = (2003, 2006, 2013, 2055)
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    args = getattr(exc, 'args', ())
+    return isinstance(exc, (ConnectionError, OSError)) or (bool(args) and args[0] in CONNECTION_ERRORS)
+
+
+class Replica:
+    """Pool jedné repliky a její poslední změřený stav"""
+
+    def __init__(self, name: str, pool: ManagedPool):
+        self.name = name
+        self.pool = pool
+        self.lag: Optional[float] = None
+        self.healthy = False
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def mark_down(self, error: Any) -> None:
+        self.healthy = False
+        self.last_error = str(error)
+
+
+class ReplicaSet:
+    """Výběr repliky podle zpoždění s automatickým návratem na primár"""
+
+    def __init__(self, replicas: List[Replica], max_lag: float = 30, check_interval: float = 10):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._task: Optional[asyncio.Task] = None
+        self._next = 0
+
+    async def open(self) -> None:
+        """Otevře pooly replik (nedostupná replika nebrání startu) a spustí kontroly zpoždění"""
+        for replica in self.replicas:
+            try:
+                await replica.pool.open()
+            except Exception as e:
+                logger.warning("Replica '%s' unavailable at startup: %s", replica.name, e)
+                replica.mark_down(e)
+        await self.check_all()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            try:
+                await replica.pool.close()
+            except Exception:
+                logger.exception("Error while closing replica '%s'", replica.name)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_all()
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self._check(r) for r in self.replicas))
+
+    async def _check(self, replica: Replica) -> None:
+        """Změří zpoždění repliky (Seconds_Behind_Master / Seconds_Behind_Source)"""
+        replica.checked_at = time.monotonic()
+        try:
+            if not replica.pool.is_open:
+                await replica.pool.open()
+            async with replica.pool.acquire() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    status = await self._replica_status(cursor)
+        except Exception as e:
+            if replica.healthy:
+                logger.warning("Replica '%s' check failed, routing to primary: %s", replica.name, e)
+            replica.mark_down(e)
+            return
+
+        if not status:
+            replica.mark_down("not a replica (empty SHOW REPLICA STATUS)")
+            return
+        lag = status.get('Seconds_Behind_Source') if 'Seconds_Behind_Source' in status else status.get('Seconds_Behind_Master')
+        if lag is None:
+            # Replikace neběží (SQL/IO vlákno zastaveno) - data mohou být libovolně stará
+            replica.lag = None
+            replica.mark_down("replication not running")
+            return
+        replica.lag = float(lag)
+        was_healthy = replica.healthy
+        replica.healthy = replica.lag <= self.max_lag
+        replica.last_error = None if replica.healthy else f"lag {replica.lag:.0f} s > {self.max_lag:.0f} s"
+        if replica.healthy != was_healthy:
+            logger.info("Replica '%s' %s (lag %.0f s)", replica.name,
+                        "back in rotation" if replica.healthy else "out of rotation", replica.lag)
+
+    @staticmethod
+    async def _replica_status(cursor) -> Optional[Dict[str, Any]]:
+        """SHOW REPLICA STATUS (MySQL 8.0.22+, MariaDB 10.5.1+; MySQL 8.4 jinou syntaxi nezná),
+        na starších serverech SHOW SLAVE STATUS"""
+        try:
+            await cursor.execute("SHOW REPLICA STATUS")
+        except aiomysql.ProgrammingError:
+            await cursor.execute("SHOW SLAVE STATUS")
+        return await cursor.fetchone()
+
+    def choose(self) -> Optional[Replica]:
+        """Zdravá replika v limitu zpoždění (střídavě); None = použít primár"""
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'name': r.name,
+                'healthy': r.healthy,
+                'lag_seconds': r.lag,
+                'last_error': r.last_error,
+                'pool': r.pool.stats(),
+            }
+            for r in self.replicas
+        ]
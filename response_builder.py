@@ -3,7 +3,8 @@ Response Builder pro eMISTR MCP Server
 Vytváří strukturované odpovědi s akcemi pro Delphi aplikaci
 """
 
-from typing import Dict, List, Any, Optional
+import json
+from typing import Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime
 
 
@@ -22,7 +23,27 @@ class ResponseBuilder:
             "data": {},
             "message": ""
         }
-    
+
+    @staticmethod
+    def _items(items: List[Dict[str, Any]], filters: Dict[str, Any]) -> Any:
+        """Položky seznamu podle argumentu format: "rows" (výchozí) = pole objektů,
+        "columnar" = {columns, rows} - názvy klíčů se neopakují v každé položce"""
+        if (filters or {}).get('format') != 'columnar':
+            return items
+        columns = list(dict.fromkeys(key for item in items for key in item))
+        return {
+            'columns': columns,
+            'rows': [[item.get(key) for key in columns] for item in items]
+        }
+
+    @staticmethod
+    def _freshness_note(data: Dict[str, Any]) -> str:
+        """Doplněk zprávy o stáří dat, pokud odpověď pochází z analytického snapshotu"""
+        freshness = data.get('freshness') or {}
+        if freshness.get('source') != 'snapshot':
+            return ""
+        return f" (data ze snapshotu k {freshness.get('synced_at')}, stáří {freshness.get('age_seconds')} s)"
+
     # ==================== ZAKÁZKY ====================
     
     def build_orders_response(self, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict[str, Any]:
@@ -41,12 +62,14 @@ class ResponseBuilder:
         
         # Data
         response['data'] = {
-            'items': orders,
+            'items': self._items(orders, filters),
+            'next_cursor': data.get('next_cursor'),
             'summary': {
-                'total_count': len(orders),
+                'total_count': stats.get('total', len(orders)),
                 'active_count': stats.get('active_count', 0),
                 'delayed_count': stats.get('delayed_count', 0),
-                'displayed_count': len(orders)
+                'displayed_count': len(orders),
+                'approximate': bool(stats.get('approximate', False))
             },
             'metadata': {
                 'filters_applied': filters,
@@ -66,7 +89,42 @@ class ResponseBuilder:
         
         # Zpráva
         delayed_msg = f", {stats.get('delayed_count', 0)} zpožděno" if int(stats.get('delayed_count', 0)) > 0 else ""
-        response['message'] = f"Nalezeno {len(orders)} zakázek{delayed_msg}"
+        total = stats.get('total', len(orders))
+        total_msg = f"přibližně {total}" if stats.get('approximate') else f"{total}"
+        shown_msg = f" (zobrazeno {len(orders)})" if total != len(orders) else ""
+        response['message'] = f"Nalezeno {total_msg} zakázek{shown_msg}{delayed_msg}"
+        
+        return response
+    
+    def build_order_details_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Odpověď pro detaily více zakázek (položky mají tvar odpovědi detailu)"""
+        response = self._create_base_response()
+        
+        if 'error' in data:
+            response['status'] = 'error'
+            response['message'] = data['error']
+            return response
+        
+        details = data.get('orders', [])
+        not_found = data.get('not_found', [])
+        
+        response['action'] = {
+            'type': 'show_details',
+            'window': 'order_detail',
+            'item_ids': [d.get('order', {}).get('id') for d in details]
+        }
+        
+        response['data'] = {
+            'items': [self.build_order_detail_response(d) for d in details],
+            'not_found': not_found,
+            'summary': {
+                'requested_count': len(details) + len(not_found),
+                'found_count': len(details)
+            }
+        }
+        
+        missing_msg = f", {len(not_found)} nenalezeno" if not_found else ""
+        response['message'] = f"Načteno {len(details)} zakázek{missing_msg}"
         
         return response
     
@@ -134,7 +192,7 @@ class ResponseBuilder:
         }
         
         response['data'] = {
-            'items': orders,
+            'items': self._items(orders, filters),
             'summary': {
                 'results_count': len(orders),
                 'search_term': search_term
@@ -160,7 +218,8 @@ class ResponseBuilder:
         }
         
         response['data'] = {
-            'items': workers,
+            'items': self._items(workers, filters),
+            'next_cursor': data.get('next_cursor'),
             'summary': {
                 'total_count': len(workers),
                 'active_count': sum(1 for w in workers if w.get('active') == 'ANO')
@@ -214,6 +273,40 @@ class ResponseBuilder:
         
         return response
     
+    def build_workers_stats_response(self, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Odpověď pro statistiky skupiny zaměstnanců"""
+        response = self._create_base_response()
+        
+        if 'error' in data:
+            response['status'] = 'error'
+            response['message'] = data['error']
+            return response
+        
+        entries = data.get('workers', [])
+        days = data.get('days', 30)
+        
+        response['action'] = {
+            'type': 'open_window',
+            'window': 'worker_stats',
+            'filters': filters
+        }
+        
+        # Sloupcově jen vnější seznam; položky "worker" a "stats" zůstávají objekty
+        response['data'] = {
+            'items': self._items(entries, filters),
+            'summary': {
+                'workers_count': len(entries),
+                'days': days,
+                'total_hours': sum(float(e.get('stats', {}).get('total_hours') or 0) for e in entries),
+                'active_workers': sum(1 for e in entries if e.get('stats', {}).get('orders_count'))
+            }
+        }
+        
+        response['data']['freshness'] = data.get('freshness')
+        response['message'] = f"Statistiky {len(entries)} zaměstnanců za posledních {days} dní" + self._freshness_note(data)
+        
+        return response
+    
     # ==================== MATERIÁL ====================
     
     def build_materials_response(self, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict[str, Any]:
@@ -221,23 +314,32 @@ class ResponseBuilder:
         response = self._create_base_response()
         
         materials = data.get('materials', [])
+        # Souhrn za celý sklad z databáze; bez něj (starší data) dopočet ze stránky
+        summary = data.get('summary') or {}
         
         # Identifikace materiálů s nízkou zásobou
         low_stock = [m for m in materials if float(m.get('stock_quantity', 0)) < float(m.get('min_quantity', 0))]
+        low_stock_count = summary.get('low_stock_count', len(low_stock))
+        if filters.get('low_stock_only'):
+            total_count = low_stock_count
+        else:
+            total_count = summary.get('total_count', len(materials))
         
         response['action'] = {
             'type': 'open_window',
             'window': 'material_list',
             'filters': filters,
-            'highlight_low_stock': True if low_stock else False
+            'highlight_low_stock': True if low_stock_count else False
         }
         
         response['data'] = {
-            'items': materials,
+            'items': self._items(materials, filters),
+            'next_cursor': data.get('next_cursor'),
             'summary': {
-                'total_count': len(materials),
-                'low_stock_count': len(low_stock),
-                'total_value': sum(float(m.get('stock_quantity', 0)) * float(m.get('cena_nakup', 0)) for m in materials)
+                'total_count': total_count,
+                'displayed_count': len(materials),
+                'low_stock_count': low_stock_count,
+                'total_value': summary.get('total_value', sum(float(m.get('stock_quantity', 0)) * float(m.get('cena_nakup', 0)) for m in materials))
             },
             'metadata': {
                 'columns': [
@@ -251,10 +353,10 @@ class ResponseBuilder:
             }
         }
         
-        if low_stock:
-            response['message'] = f"Nalezeno {len(materials)} materiálů, {len(low_stock)} pod minimální zásobou"
+        if low_stock_count:
+            response['message'] = f"Nalezeno {total_count} materiálů, {low_stock_count} pod minimální zásobou"
         else:
-            response['message'] = f"Nalezeno {len(materials)} materiálů"
+            response['message'] = f"Nalezeno {total_count} materiálů"
         
         return response
     
@@ -262,6 +364,11 @@ class ResponseBuilder:
         """Odpověď pro pohyby materiálu"""
         response = self._create_base_response()
         
+        if 'error' in data:
+            response['status'] = 'error'
+            response['message'] = data['error']
+            return response
+        
         movements = data.get('movements', [])
         
         response['action'] = {
@@ -270,19 +377,111 @@ class ResponseBuilder:
             'filters': filters
         }
         
-        response['data'] = {
-            'items': movements,
-            'summary': {
+        # Souhrn za celý filtr z databáze; bez něj (starší data) dopočet ze stránky
+        if data.get('summary'):
+            summary = {**data['summary'], 'displayed_count': len(movements)}
+        else:
+            summary = {
                 'movements_count': len(movements),
-                'total_in': sum(float(m.get('mnozstvi', 0)) for m in movements if m.get('typ_pohybu') == 'P'),
-                'total_out': sum(float(m.get('mnozstvi', 0)) for m in movements if m.get('typ_pohybu') == 'V')
+                'total_in': sum(float(m.get('mnozstvi') or 0) for m in movements if m.get('typ_pohybu') == 'P'),
+                'total_out': sum(float(m.get('mnozstvi') or 0) for m in movements if m.get('typ_pohybu') == 'V')
             }
+        
+        response['data'] = {
+            'items': self._items(movements, filters),
+            'next_cursor': data.get('next_cursor'),
+            'summary': summary
         }
+        if 'trend' in data:
+            response['data']['trend'] = data['trend']
+        if 'freshness' in data:
+            response['data']['freshness'] = data['freshness']
         
-        response['message'] = f"Nalezeno {len(movements)} pohybů materiálu"
+        total = summary['movements_count']
+        shown_msg = f" (zobrazeno {len(movements)})" if total != len(movements) else ""
+        response['message'] = f"Nalezeno {total} pohybů materiálu{shown_msg}" + self._freshness_note(data)
         
         return response
     
+    async def stream_movements_response(self, chunks: AsyncIterator[List[Dict[str, Any]]], filters: Dict[str, Any],
+                                        aggregates: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Streamovaná odpověď pro pohyby materiálu - stejná struktura jako build_movements_response,
+        ale JSON se generuje po fragmentech a položky se v paměti nedrží.
+
+        aggregates: výsledek DatabaseManager.get_movement_summary (souhrn za celý filtr, trend);
+        bez něj se souhrn dopočítá ze streamovaných položek.
+        """
+        if aggregates and 'error' in aggregates:
+            yield json.dumps(self.build_movements_response(aggregates, filters), ensure_ascii=False)
+            return
+        
+        response = self._create_base_response()
+        response['action'] = {
+            'type': 'open_window',
+            'window': 'material_movements',
+            'filters': filters
+        }
+        
+        # První dávku načteme před hlavičkou, aby chyba dotazu nastala ještě před odesláním dat
+        iterator = chunks.__aiter__()
+        try:
+            chunk = await iterator.__anext__()
+        except StopAsyncIteration:
+            chunk = None
+        
+        # Sloupcový formát: sloupce z první dávky (řádky jednoho dotazu mají stejné klíče)
+        columns = None
+        if (filters or {}).get('format') == 'columnar':
+            columns = list(dict.fromkeys(key for m in chunk or [] for key in m))
+        
+        head = json.dumps({k: response[k] for k in ('status', 'timestamp', 'action')}, ensure_ascii=False)
+        if columns is None:
+            yield head[:-1] + ', "data": {"items": ['
+        else:
+            yield head[:-1] + ', "data": {"items": {"columns": ' + json.dumps(columns, ensure_ascii=False) + ', "rows": ['
+        
+        # Souhrn z řádků jen bez souhrnu z databáze
+        summarize = not (aggregates and aggregates.get('summary'))
+        count = 0
+        total_in = 0.0
+        total_out = 0.0
+        while chunk is not None:
+            if summarize:
+                for m in chunk:
+                    if m.get('typ_pohybu') == 'P':
+                        total_in += float(m.get('mnozstvi') or 0)
+                    elif m.get('typ_pohybu') == 'V':
+                        total_out += float(m.get('mnozstvi') or 0)
+            if chunk:
+                items = chunk if columns is None else ([m.get(key) for key in columns] for m in chunk)
+                yield (", " if count else "") + ", ".join(json.dumps(m, ensure_ascii=False) for m in items)
+                count += len(chunk)
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                chunk = None
+        
+        data = {'next_cursor': None}
+        if not summarize:
+            data['summary'] = {**aggregates['summary'], 'displayed_count': count}
+        else:
+            data['summary'] = {
+                'movements_count': count,
+                'total_in': total_in,
+                'total_out': total_out
+            }
+        for key in ('trend', 'freshness'):
+            if aggregates and key in aggregates:
+                data[key] = aggregates[key]
+        
+        total = data['summary']['movements_count']
+        shown_msg = f" (zobrazeno {count})" if total != count else ""
+        message = f"Nalezeno {total} pohybů materiálu{shown_msg}" + self._freshness_note(aggregates or {})
+        yield (
+            ('], ' if columns is None else ']}, ') + json.dumps(data, ensure_ascii=False)[1:]
+            + ', "message": ' + json.dumps(message, ensure_ascii=False) + '}'
+        )
+    
     # ==================== OPERACE ====================
     
     def build_operations_response(self, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict[str, Any]:
@@ -298,7 +497,8 @@ class ResponseBuilder:
         }
         
         response['data'] = {
-            'items': operations,
+            'items': self._items(operations, filters),
+            'next_cursor': data.get('next_cursor'),
             'summary': {
                 'total_count': len(operations)
             }
@@ -327,7 +527,8 @@ class ResponseBuilder:
         }
         
         response['data'] = {
-            'items': machines,
+            'items': self._items(machines, filters),
+            'next_cursor': data.get('next_cursor'),
             'summary': {
                 'total_count': len(machines),
                 'busy_count': busy_count,
@@ -367,9 +568,29 @@ class ResponseBuilder:
                 'days_count': len(daily_stats),
                 'average_hours_per_day': round(total_hours / len(daily_stats), 2) if daily_stats else 0
             },
-            'period': period
+            'period': period,
+            'freshness': data.get('freshness')
         }
         
-        response['message'] = f"Statistiky výroby za období {period.get('from')} - {period.get('to')}"
+        response['message'] = f"Statistiky výroby za období {period.get('from')} - {period.get('to')}" + self._freshness_note(data)
+        
+        return response
+    
+    # ==================== EXPORT ====================
+    
+    def build_export_response(self, descriptor: Dict[str, Any]) -> Dict[str, Any]:
+        """Odpověď pro export - data se nestahují přes MCP, ale streamem z uvedené URL"""
+        response = self._create_base_response()
+        
+        response['action'] = {
+            'type': 'download',
+            'url': descriptor['url'],
+            'filename': descriptor['filename'],
+            'content_type': descriptor['content_type']
+        }
+        
+        response['data'] = descriptor
+        
+        response['message'] = f"Export {descriptor['dataset']} ({descriptor['format']}) je připraven ke stažení: {descriptor['url']}"
         
         return response
@@ -0,0 +1,203 @@
+"""
+Result Cache pro eMISTR MCP Server
+LRU cache výsledků read tools s TTL podle toolu a volitelnou invalidací při změně
+podkladových tabulek (polling information_schema.TABLES.UPDATE_TIME / MAX(id))
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Iterable, Mapping, Tuple
+
+logger = logging.getLogger('emistr-mcp.cache')
+
+
+# Výchozí TTL (s) podle toolu; 0 = necachovat
+DEFAULT_TOOL_TTLS = {
+    "get_orders": 30,
+    "get_order_detail": 15,
+    "get_order_details": 15,
+    "search_orders": 30,
+    "get_workers": 300,
+    "get_worker_detail": 60,
+    "get_workers_stats": 60,
+    "get_materials": 60,
+    "get_material_movements": 30,
+    "get_operations": 600,
+    "get_machines": 600,
+    "get_production_stats": 120,
+}
+
+# Tabulky, ze kterých tool čte (pro invalidaci při změně)
+TOOL_TABLES = {
+    "get_orders": ("c_order",),
+    "get_order_detail": ("c_order", "order_work", "material"),
+    "get_order_details": ("c_order", "order_work", "material"),
+    "search_orders": ("c_order",),
+    "get_workers": ("worker",),
+    "get_worker_detail": ("worker", "readdata"),
+    "get_workers_stats": ("worker", "readdata"),
+    "get_materials": ("sklad_material",),
+    "get_material_movements": ("sklad_material_pohyb",),
+    "get_operations": ("operation",),
+    "get_machines": ("stroje",),
+    "get_production_stats": ("readdata",),
+}
+
+
+def make_key(tool: str, arguments: Optional[Mapping[str, Any]]) -> str:
+    """Klíč z názvu toolu a normalizovaných argumentů (pořadí klíčů a prázdné hodnoty nehrají roli)"""
+    normalized = {
+        k: v for k, v in (arguments or {}).items()
+        if v is not None and v != ""
+    }
+    return json.dumps([tool, normalized], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ResultCache:
+    """Velikostně omezená LRU cache s TTL podle toolu"""
+
+    def __init__(self, max_entries: int = 1000, default_ttl: float = 30, tool_ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.tool_ttls = dict(DEFAULT_TOOL_TTLS)
+        self.tool_ttls.update(tool_ttls or {})
+        # key -> (expires_at, tool, value)
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def ttl_for(self, tool: str) -> float:
+        return float(self.tool_ttls.get(tool, self.default_ttl))
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return False, None
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return True, value
+
+    def set(self, key: str, tool: str, value: Any) -> None:
+        ttl = self.ttl_for(tool)
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, tool, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_tools(self, tools: Iterable[str]) -> int:
+        tools = set(tools)
+        stale = [k for k, (_, tool, _) in self._entries.items() if tool in tools]
+        for k in stale:
+            del self._entries[k]
+        self._invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """Zneplatní záznamy všech toolů, které čtou z některé ze změněných tabulek"""
+        tables = set(tables)
+        tools = [tool for tool, deps in TOOL_TABLES.items() if tables.intersection(deps)]
+        return self.invalidate_tools(tools)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_ratio': round(self._hits / lookups, 3) if lookups else 0.0,
+            'invalidated': self._invalidations,
+        }
+
+
+class TableChangeWatcher:
+    """Levný polling změn tabulek a invalidace cache.
+
+    Primárně porovnává information_schema.TABLES.UPDATE_TIME; pro tabulky, kde
+    ho engine nevede (NULL, typicky InnoDB bez persistentních statistik), použije
+    watermark MAX(id) - ten zachytí nové řádky, ne však úpravy existujících.
+    """
+
+    def __init__(self, db, cache: ResultCache, interval: float = 10, tables: Optional[Iterable[str]] = None):
+        self._db = db
+        self._cache = cache
+        self.interval = interval
+        self.tables = sorted(set(tables) if tables else {t for deps in TOOL_TABLES.values() for t in deps})
+        self._signatures: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception("Table change polling failed")
+            await asyncio.sleep(self.interval)
+
+    async def poll_once(self) -> List[str]:
+        """Zjistí aktuální signatury tabulek; změněné tabulky zneplatní v cache a vrátí"""
+        signatures = await self._read_signatures()
+        changed = [
+            t for t, sig in signatures.items()
+            if t in self._signatures and self._signatures[t] != sig
+        ]
+        self._signatures.update(signatures)
+        if changed:
+            dropped = self._cache.invalidate_tables(changed)
+            logger.info("Tables changed: %s (%d cached results invalidated)", ", ".join(changed), dropped)
+        return changed
+
+    async def _read_signatures(self) -> Dict[str, Any]:
+        signatures: Dict[str, Any] = {}
+        db_config = getattr(self._db.config, 'database', None)
+        db_name = db_config.get('database') if isinstance(db_config, dict) else None
+        placeholders = ", ".join(["%s"] * len(self.tables))
+        rows = await self._db.execute_query(
+            f"""
+            SELECT TABLE_NAME, UPDATE_TIME
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders})
+            """,
+            (db_name, *self.tables)
+        )
+        for r in rows:
+            if r.get('UPDATE_TIME') is not None:
+                signatures[r['TABLE_NAME']] = r['UPDATE_TIME']
+        for table in self.tables:
+            if table in signatures:
+                continue
+            try:
+                wm = await self._db.execute_query(f"SELECT MAX(id) AS wm FROM {table}")
+                signatures[table] = wm[0].get('wm') if wm else None
+            except Exception:
+                # Tabulka bez sloupce id / neexistuje - nesledujeme
+                continue
+        return signatures
@@ -0,0 +1,189 @@
+"""
+Schema Catalog pro eMISTR MCP Server
+Drží v paměti metadata sloupců tabulek eMISTR (načtená jednou při connect) a detekované schopnosti schématu
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Any, Optional, Iterable
+
+logger = logging.getLogger('emistr-mcp.schema')
+
+
+# Tabulky, se kterými pracují dotazy DatabaseManageru
+TRACKED_TABLES = (
+    'c_order',
+    'order_stav',
+    'order_work',
+    'customer',
+    'material',
+    'operation',
+    'operation_group',
+    'worker',
+    'worker_group',
+    'readdata',
+    'sklad_material',
+    'sklad_material_pohyb',
+    'stroje',
+    'stroj_group',
+)
+
+# Volitelné sloupce, které se mezi verzemi eMISTR schématu liší
+CAPABILITY_COLUMNS = (
+    ('material', 'vydano_mnozstvi'),
+    ('material', 'cena_nakup'),
+    ('material', 'cena_celkem'),
+    ('operation', 'user_price'),
+    ('operation', 'user_time'),
+)
+
+DATETIME_TYPES = ('datetime', 'timestamp', 'date')
+
+
+class SchemaCatalog:
+    """Katalog sloupců sledovaných tabulek s TTL obnovou"""
+
+    def __init__(self, db, ttl: float = 3600, tables: Iterable[str] = TRACKED_TABLES):
+        self._db = db
+        self.ttl = ttl
+        self.tables = list(tables)
+        # table -> {column_name: data_type} (v pořadí ORDINAL_POSITION)
+        self._columns: Dict[str, Dict[str, str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        # Zvyšuje se při každém načtení; závislé cache podle něj poznají změnu
+        self.version = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        if self._checked_at is None:
+            return True
+        return self.ttl > 0 and time.monotonic() - self._checked_at > self.ttl
+
+    def _db_name(self) -> Optional[str]:
+        db_config = getattr(self._db.config, 'database', None)
+        return db_config.get('database') if isinstance(db_config, dict) else None
+
+    async def load(self) -> None:
+        """Načte metadata všech sledovaných tabulek (jeden dotaz do information_schema; fallback SHOW COLUMNS)"""
+        async with self._lock:
+            await self._load_locked()
+
+    async def _load_locked(self) -> None:
+        columns = await self._fetch_columns(self.tables)
+        self._columns = columns
+        self._loaded_at = self._checked_at = time.monotonic()
+        self.version += 1
+        logger.info("Schema catalog loaded: %d tables, capabilities: %s", len(columns), self.capabilities)
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Explicitní obnova katalogu (admin volání)"""
+        await self.load()
+        return self.describe()
+
+    async def ensure_fresh(self) -> None:
+        """Obnoví katalog, pokud ještě nebyl načten nebo mu vypršelo TTL"""
+        if not self.is_stale():
+            return
+        async with self._lock:
+            # Souběžná volání čekala na zámek; obnovu provede jen první z nich
+            if not self.is_stale():
+                return
+            try:
+                await self._load_locked()
+            except Exception:
+                logger.exception("Schema catalog refresh failed; keeping previous metadata")
+                # Odložíme další pokus o celé TTL, ať nezatěžujeme DB opakovanými chybami
+                self._checked_at = time.monotonic()
+
+    async def ensure_table(self, table_name: str) -> None:
+        """Doplní do katalogu tabulku, která zatím není sledována"""
+        if table_name in self.tables:
+            return
+        self.tables.append(table_name)
+        columns = await self._fetch_columns([table_name])
+        self._columns.update(columns)
+
+    async def _fetch_columns(self, tables: List[str]) -> Dict[str, Dict[str, str]]:
+        result: Dict[str, Dict[str, str]] = {}
+        db_name = self._db_name()
+        if db_name and tables:
+            try:
+                placeholders = ", ".join(["%s"] * len(tables))
+                rows = await self._db.execute_query(
+                    f"""
+                    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE
+                    FROM information_schema.COLUMNS
+                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders})
+                    ORDER BY TABLE_NAME, ORDINAL_POSITION
+                    """,
+                    (db_name, *tables)
+                )
+                for r in rows:
+                    result.setdefault(r.get('TABLE_NAME'), {})[r.get('COLUMN_NAME')] = (r.get('DATA_TYPE') or '').lower()
+                return result
+            except Exception:
+                logger.warning("information_schema not available, falling back to SHOW COLUMNS")
+        # Fallback SHOW COLUMNS (po jednotlivých tabulkách)
+        for table in tables:
+            if not table.replace('_', '').isalnum():
+                continue
+            try:
+                rows = await self._db.execute_query(f"SHOW COLUMNS FROM {table}")
+            except Exception:
+                continue
+            cols: Dict[str, str] = {}
+            for r in rows:
+                name = r.get('Field') or r.get('COLUMN_NAME')
+                # SHOW COLUMNS vrací např. 'datetime' nebo 'decimal(10,2)'
+                data_type = str(r.get('Type') or '').split('(')[0].lower()
+                cols[name] = data_type
+            result[table] = cols
+        return result
+
+    # ==================== LOOKUPY ====================
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name in self._columns
+
+    def columns(self, table_name: str) -> Dict[str, str]:
+        return dict(self._columns.get(table_name, {}))
+
+    def has_column(self, table_name: str, column: str, default: bool = False) -> bool:
+        """Existuje sloupec? Pro tabulku bez metadat vrací default."""
+        cols = self._columns.get(table_name)
+        if cols is None:
+            return default
+        return column in cols
+
+    def existing_columns(self, table_name: str, candidates: List[str]) -> List[str]:
+        cols = self._columns.get(table_name, {})
+        return [c for c in candidates if c in cols]
+
+    def datetime_columns(self, table_name: str) -> List[str]:
+        return [name for name, data_type in self._columns.get(table_name, {}).items() if data_type in DATETIME_TYPES]
+
+    @property
+    def capabilities(self) -> Dict[str, bool]:
+        """Detekované volitelné sloupce ve tvaru {'tabulka.sloupec': bool}"""
+        return {
+            f"{table}.{column}": self.has_column(table, column, default=True)
+            for table, column in CAPABILITY_COLUMNS
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        """Stav katalogu pro admin/diagnostiku"""
+        age = time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+        return {
+            'loaded': self.loaded,
+            'version': self.version,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'ttl_seconds': self.ttl,
+            'tables': {t: len(c) for t, c in self._columns.items()},
+            'capabilities': self.capabilities,
+        }
@@ -0,0 +1,205 @@
+"""
+Search Index pro eMISTR MCP Server
+In-memory trigramový index nad textovými sloupci c_order pro search_orders -
+hledání podřetězce se vyhodnotí v paměti a z databáze se načtou jen nalezené řádky
+"""
+
+import asyncio
+import logging
+import time
+import unicodedata
+from typing import Dict, List, Any, Optional, Set, Tuple, Iterable
+
+logger = logging.getLogger('emistr-mcp.search')
+
+
+# Sloupce prohledávané search_orders
+SEARCH_COLUMNS = ('code', 'name', 'customer_name', 'cislo_objednavky', 'note')
+
+# Kandidáti na sloupec s časem poslední změny (použije se první existující podle katalogu)
+CHANGE_COLUMNS = ('last_change', 'changed', 'updated_at', 'updated', 'modified', 'zmeneno')
+
+TRIGRAM = 3
+
+
+def normalize(text: Any, fold_accents: bool = True) -> str:
+    """Malá písmena, volitelně bez diakritiky ("Šroub" -> "sroub")"""
+    if text is None:
+        return ""
+    text = str(text).casefold()
+    if fold_accents:
+        text = ''.join(
+            ch for ch in unicodedata.normalize('NFKD', text)
+            if not unicodedata.combining(ch)
+        )
+    return text
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+class TrigramIndex:
+    """Trigramy -> množiny id; pro ověření shody drží i normalizované texty polí"""
+
+    def __init__(self, fold_accents: bool = True):
+        self.fold_accents = fold_accents
+        self._postings: Dict[str, Set[int]] = {}
+        # id -> (normalizované hodnoty polí, třídicí hodnota)
+        self._docs: Dict[int, Tuple[Tuple[str, ...], Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id: int, fields: Iterable[Any], sort_value: Any = None) -> None:
+        self.remove(doc_id)
+        normalized = tuple(normalize(f, self.fold_accents) for f in fields)
+        self._docs[doc_id] = (normalized, sort_value)
+        for field in normalized:
+            for gram in trigrams(field):
+                self._postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for field in doc[0]:
+            for gram in trigrams(field):
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._postings[gram]
+
+    def search(self, term: str, limit: Optional[int] = None) -> Optional[List[int]]:
+        """Id dokumentů obsahujících term (seřazená sestupně podle třídicí hodnoty, NULL na konci).
+
+        Vrací None, pokud je term kratší než trigram - takový dotaz index nezúží.
+        """
+        needle = normalize(term, self.fold_accents)
+        grams = trigrams(needle)
+        if not grams:
+            return None
+        posting_lists = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        candidates = set(posting_lists[0])
+        for ids in posting_lists[1:]:
+            if not candidates:
+                break
+            candidates &= ids
+        # Trigramy dávají jen kandidáty; shodu podřetězce ověříme
+        matches = [i for i in candidates if any(needle in f for f in self._docs[i][0])]
+        with_value = sorted((i for i in matches if self._docs[i][1] is not None),
+                            key=lambda i: self._docs[i][1], reverse=True)
+        without_value = [i for i in matches if self._docs[i][1] is None]
+        ordered = with_value + without_value
+        return ordered[:limit] if limit is not None else ordered
+
+
+class OrderSearchIndex:
+    """Trigramový index zakázek udržovaný aktuální pollingem databáze.
+
+    Při startu se index postaví streamem přes c_order, poté se periodicky
+    doindexují nové zakázky (id nad watermarkem) a - má-li tabulka sloupec
+    s časem změny - i změněné zakázky. Smazané záznamy a změny bez sloupce
+    s časem zachytí plné přestavění po rebuild_interval.
+    """
+
+    def __init__(self, db, interval: float = 30, rebuild_interval: float = 3600, fold_accents: bool = True):
+        self._db = db
+        self.interval = interval
+        self.rebuild_interval = rebuild_interval
+        self.fold_accents = fold_accents
+        self._index = TrigramIndex(fold_accents)
+        self._max_id = 0
+        self._change_column: Optional[str] = None
+        self._max_change: Any = None
+        self._built_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._built_at is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not self.ready or time.monotonic() - self._built_at > self.rebuild_interval:
+                    await self.build()
+                else:
+                    await self.refresh()
+            except Exception:
+                logger.exception("Order search index update failed")
+            await asyncio.sleep(self.interval)
+
+    def _select(self) -> str:
+        columns = ", ".join(f"o.{c}" for c in SEARCH_COLUMNS)
+        change = f", o.{self._change_column} AS _changed" if self._change_column else ""
+        return f"SELECT o.id, o.start, {columns}{change} FROM c_order o"
+
+    def _apply(self, index: TrigramIndex, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            index.add(row['id'], (row.get(c) for c in SEARCH_COLUMNS), row.get('start'))
+            if row['id'] > self._max_id:
+                self._max_id = row['id']
+            changed = row.get('_changed')
+            if changed is not None and (self._max_change is None or changed > self._max_change):
+                self._max_change = changed
+
+    async def build(self) -> None:
+        """Postaví index znovu od začátku; dotazy do té doby obsluhuje předchozí index"""
+        started = time.perf_counter()
+        catalog = getattr(self._db, 'catalog', None)
+        existing = catalog.existing_columns('c_order', list(CHANGE_COLUMNS)) if catalog else []
+        self._change_column = existing[0] if existing else None
+        self._max_id = 0
+        self._max_change = None
+        index = TrigramIndex(self.fold_accents)
+        async for chunk in self._db.stream_query(self._select(), chunk_size=2000):
+            self._apply(index, chunk)
+        self._index = index
+        self._built_at = time.monotonic()
+        logger.info("Order search index built: %d orders in %.2f s", len(index), time.perf_counter() - started)
+
+    async def refresh(self) -> int:
+        """Doindexuje nové (a při známém sloupci změny i upravené) zakázky; vrací počet
+
+        Nové a změněné zakázky se čtou dvěma dotazy - každý s rozsahem na vlastním
+        indexu (PK, sloupec změny); podmínka s OR by vedla na plný průchod c_order.
+        """
+        max_id, max_change = self._max_id, self._max_change
+        rows = await self._db.execute_query(self._select() + " WHERE o.id > %s", (max_id,))
+        if self._change_column and max_change is not None:
+            rows += await self._db.execute_query(
+                self._select() + f" WHERE o.{self._change_column} > %s AND o.id <= %s",
+                (max_change, max_id),
+            )
+        self._apply(self._index, rows)
+        return len(rows)
+
+    def search(self, term: str, limit: Optional[int] = None) -> Optional[List[int]]:
+        """Id zakázek obsahujících term; None = index nelze použít (není postaven / krátký term)"""
+        if not self.ready:
+            return None
+        return self._index.search(term, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'orders': len(self._index),
+            'max_id': self._max_id,
+            'change_column': self._change_column,
+            'fold_accents': self.fold_accents,
+        }
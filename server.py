@@ -5,14 +5,27 @@ Provides AI assistants access to eMISTR ERP via MCP protocol
 """
 
 import asyncio
+import contextlib
+import functools
+import hmac
 import json
 import logging
-from typing import Any, Sequence, Mapping, List, Dict
+import time
+from typing import Any, Sequence, Mapping, List, Dict, AsyncIterator, Tuple
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from aiohttp import web
 
 from database import DatabaseManager
+from pagination import InvalidCursorError
+from query_timeout import QueryTimeoutError
+from db_pool import PoolBusyError
+from admission import AdmissionController, AdmissionRejected
+from exporter import EXPORT_DATASETS, EXPORT_FORMATS, ExportError, Exporter
+from index_advisor import IndexAdvisor
+from singleflight import SingleFlight
+from workloads import DEFAULT_WORKLOAD
+from result_cache import TOOL_TABLES, ResultCache, TableChangeWatcher, make_key
 from anonymizer import DataAnonymizer
 from response_builder import ResponseBuilder
 from config import Config
@@ -29,9 +42,25 @@ config: Config = None
 _db: DatabaseManager = None
 _anonymizer: DataAnonymizer = None
 _response_builder: ResponseBuilder = None
+_result_cache: ResultCache | None = None
+_table_watcher: TableChangeWatcher | None = None
+_singleflight: SingleFlight | None = None
+_admission: AdmissionController | None = None
+_exporter: Exporter | None = None
 SERVER_VERSION = "0.2.5 beta" # Server version identifier
 CLIENT_PROTOCOL_VERSION: str | None = None
 
+# Tools, které přes HTTP umí streamovanou odpověď (argument "stream": true)
+STREAMABLE_TOOLS = {"get_material_movements"}
+
+# Argument "format" list tools: tvar data.items (sestavuje ResponseBuilder, do DB se nepředává)
+FORMAT_ARGUMENT = {"type": "string", "enum": ["rows", "columnar"], "default": "rows",
+                   "description": "rows = pole objektů, columnar = {columns, rows} bez opakování klíčů"}
+RESPONSE_ONLY_ARGUMENTS = ("format",)
+
+# Tool s odkazem na export; stejný název řídí třídu zátěže a časový limit HTTP exportu
+EXPORT_TOOL = "export_data"
+
 
 def _tool_to_dict(tool: Any) -> Dict[str, Any]:
     """Safely convert a Tool (or similar) to a plain JSON-serializable dict."""
@@ -83,14 +112,32 @@ async def _get_server_offerings() -> Dict[str, Any]:
 
 async def initialize() -> None:
     """Initialize configuration, database and helpers."""
-    global config, _db, _anonymizer, _response_builder
+    global config, _db, _anonymizer, _response_builder, _result_cache, _table_watcher, _singleflight, _admission, _exporter
 
     config = Config()
     _db = DatabaseManager(config)
     _anonymizer = DataAnonymizer(config)
     _response_builder = ResponseBuilder()
+    _exporter = Exporter(_db, _anonymizer, config.export)
 
     await _db.connect()
+
+    cache_config = config.cache
+    if cache_config.get('enabled', True):
+        _result_cache = ResultCache(
+            max_entries=int(cache_config.get('max_entries', 1000)),
+            default_ttl=float(cache_config.get('default_ttl', 30)),
+            tool_ttls=cache_config.get('ttl'),
+        )
+        invalidation = cache_config.get('invalidation') or {}
+        if invalidation.get('enabled', False):
+            _table_watcher = TableChangeWatcher(_db, _result_cache, interval=float(invalidation.get('interval', 10)))
+            _table_watcher.start()
+    if config.coalescing.get('enabled', True):
+        _singleflight = SingleFlight()
+    admission_config = config.admission
+    if admission_config.get('enabled', True):
+        _admission = AdmissionController(admission_config)
     logger.info(f"eMISTR MCP Server {SERVER_VERSION} initialized")
 
 
@@ -114,7 +161,9 @@ async def list_tools() -> List[Tool]:
                     "status": {"type": "string", "description": "Filtr podle statusu"},
                     "customer_id": {"type": "integer", "description": "ID zákazníka"},
                     "date_from": {"type": "string", "description": "Datum od (YYYY-MM-DD)"},
-                    "date_to": {"type": "string", "description": "Datum do (YYYY-MM-DD)"}
+                    "date_to": {"type": "string", "description": "Datum do (YYYY-MM-DD)"},
+                    "cursor": {"type": "string", "description": "Kurzor další stránky (next_cursor z předchozí odpovědi)"},
+                    "format": FORMAT_ARGUMENT
                 }
             }
         ),
@@ -129,6 +178,18 @@ async def list_tools() -> List[Tool]:
                 "required": ["order_id"]
             }
         ),
+        Tool(
+            name="get_order_details",
+            description="Detaily více zakázek najednou (operace a materiál) podle seznamu ID nebo kódů.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "order_ids": {"type": "array", "items": {"type": "integer"}, "description": "ID zakázek"},
+                    "order_codes": {"type": "array", "items": {"type": "string"}, "description": "Kódy zakázek"},
+                    "limit": {"type": "integer"}
+                }
+            }
+        ),
         Tool(
             name="search_orders",
             description="Fulltextové vyhledávání v zakázkách podle názvu, kódu, čísla objednávky nebo poznámek.",
@@ -136,7 +197,8 @@ async def list_tools() -> List[Tool]:
                 "type": "object",
                 "properties": {
                     "search_term": {"type": "string"},
-                    "limit": {"type": "integer"}
+                    "limit": {"type": "integer"},
+                    "format": FORMAT_ARGUMENT
                 },
                 "required": ["search_term"]
             }
@@ -149,7 +211,9 @@ async def list_tools() -> List[Tool]:
                 "properties": {
                     "status": {"type": "string"},
                     "group_name": {"type": "string"},
-                    "limit": {"type": "integer"}
+                    "limit": {"type": "integer"},
+                    "cursor": {"type": "string", "description": "Kurzor další stránky (next_cursor z předchozí odpovědi)"},
+                    "format": FORMAT_ARGUMENT
                 }
             }
         ),
@@ -164,6 +228,20 @@ async def list_tools() -> List[Tool]:
                 "required": ["worker_id"]
             }
         ),
+        Tool(
+            name="get_workers_stats",
+            description="Statistiky výkonu skupiny zaměstnanců (seznam id nebo skupina) za zvolené období.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "worker_ids": {"type": "array", "items": {"type": "integer"}},
+                    "group_name": {"type": "string"},
+                    "days": {"type": "integer", "description": "Počet dní zpětně (default 30)"},
+                    "limit": {"type": "integer"},
+                    "format": FORMAT_ARGUMENT
+                }
+            }
+        ),
         Tool(
             name="get_materials",
             description="Seznam materiálů na skladu.",
@@ -172,7 +250,9 @@ async def list_tools() -> List[Tool]:
                 "properties": {
                     "sklad_id": {"type": "integer"},
                     "low_stock_only": {"type": "boolean"},
-                    "limit": {"type": "integer"}
+                    "limit": {"type": "integer"},
+                    "cursor": {"type": "string", "description": "Kurzor další stránky (next_cursor z předchozí odpovědi)"},
+                    "format": FORMAT_ARGUMENT
                 }
             }
         ),
@@ -185,19 +265,41 @@ async def list_tools() -> List[Tool]:
                     "material_id": {"type": "integer"},
                     "date_from": {"type": "string"},
                     "date_to": {"type": "string"},
-                    "limit": {"type": "integer"}
+                    "limit": {"type": "integer"},
+                    "cursor": {"type": "string", "description": "Kurzor další stránky (next_cursor z předchozí odpovědi)"},
+                    "bucket": {"type": "string", "enum": ["day", "week", "month"], "description": "Trend pohybů po dnech/týdnech/měsících za celý filtr"},
+                    "stream": {"type": "boolean", "description": "Streamovaná odpověď po dávkách (jen přes HTTP)"},
+                    "format": FORMAT_ARGUMENT
                 }
             }
         ),
         Tool(
             name="get_operations",
             description="Seznam operací (pracovní postupy).",
-            inputSchema={"type": "object", "properties": {"operation_group": {"type": "string"}, "limit": {"type": "integer"}}}
+            inputSchema={"type": "object", "properties": {"operation_group": {"type": "string"}, "limit": {"type": "integer"}, "cursor": {"type": "string", "description": "Kurzor další stránky (next_cursor z předchozí odpovědi)"}, "format": FORMAT_ARGUMENT}}
         ),
         Tool(
             name="get_machines",
             description="Seznam strojů.",
-            inputSchema={"type": "object", "properties": {"status_filter": {"type": "string"}, "limit": {"type": "integer"}}}
+            inputSchema={"type": "object", "properties": {"status_filter": {"type": "string"}, "limit": {"type": "integer"}, "cursor": {"type": "string", "description": "Kurzor další stránky (next_cursor z předchozí odpovědi)"}, "format": FORMAT_ARGUMENT}}
+        ),
+        Tool(
+            name=EXPORT_TOOL,
+            description="Export celé knihy zakázek nebo pohybů materiálu (CSV/NDJSON/Parquet). Vrací URL pro streamované stažení přes HTTP.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": {"type": "string", "enum": list(EXPORT_DATASETS)},
+                    "format": {"type": "string", "enum": list(EXPORT_FORMATS), "default": "csv"},
+                    "status": {"type": "string"},
+                    "customer_id": {"type": "integer"},
+                    "material_id": {"type": "integer"},
+                    "date_from": {"type": "string"},
+                    "date_to": {"type": "string"},
+                    "limit": {"type": "integer", "description": "Maximální počet řádků (bez limitu = celý výřez)"}
+                },
+                "required": ["dataset"]
+            }
         ),
         Tool(
             name="get_production_stats",
@@ -239,9 +341,37 @@ def _get_client_ip(request: web.Request) -> str:
     return "unknown"
 
 
+async def _cached(name: str, kwargs: Mapping[str, Any], method) -> Any:
+    """Výsledek DB metody přes TTL cache (klíč = tool + normalizované argumenty)."""
+    kwargs = {k: v for k, v in kwargs.items() if k not in RESPONSE_ONLY_ARGUMENTS}
+    if _result_cache is None:
+        return await method(**kwargs)
+    key = make_key(name, kwargs)
+    hit, value = _result_cache.get(key)
+    if hit:
+        return value
+    value = await method(**kwargs)
+    # Chybové odpovědi (např. nenalezený záznam) necachujeme
+    if not (isinstance(value, Mapping) and 'error' in value):
+        _result_cache.set(key, name, value)
+    return value
+
+
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> Sequence[Any]:
+    """Process a tool call; souběžná identická volání read tools sdílí jedno provedení."""
+    if _singleflight is None or name not in TOOL_TABLES:
+        return await _call_tool(name, arguments)
+    key = make_key(name, arguments if isinstance(arguments, Mapping) else None)
+    return list(await _singleflight.do(key, lambda: _call_tool(name, arguments)))
+
+
+async def _call_tool(name: str, arguments: Any) -> Sequence[Any]:
     """Process a tool call (dispatcher)."""
+    # Deadline a směrování (primár / replika) pro všechny dotazy tohoto volání
+    scope = contextlib.ExitStack()
+    if hasattr(_db, 'tool_scope'):
+        scope.enter_context(_db.tool_scope(name))
     try:
         logger.info("Tool called: %s args_summary: %s", name, _redact_arguments(arguments))
         logger.debug("Tool full arguments: %r", arguments)
@@ -270,7 +400,7 @@ async def call_tool(name: str, arguments: Any) -> Sequence[Any]:
                 c = arguments.get('columns')
                 if isinstance(c, list) and all(isinstance(x, str) for x in c):
                     cols = c
-            result = await _db.get_orders(**{k: v for k, v in arguments.items() if k != 'columns'})
+            result = await _cached(name, {k: v for k, v in arguments.items() if k != 'columns'}, _db.get_orders)
             anonymized = _anonymizer.anonymize_orders(result) if hasattr(_anonymizer, 'anonymize_orders') else result
             if cols:
                 try:
@@ -291,57 +421,269 @@ async def call_tool(name: str, arguments: Any) -> Sequence[Any]:
                 response = _response_builder.build_orders_response(anonymized, arguments)
 
         elif name == "get_order_detail":
-            result = await _db.get_order_detail(**arguments)
+            result = await _cached(name, arguments, _db.get_order_detail)
             anonymized = _anonymizer.anonymize_order_detail(result) if hasattr(_anonymizer, 'anonymize_order_detail') else result
             response = _response_builder.build_order_detail_response(anonymized)
 
+        elif name == "get_order_details":
+            result = await _cached(name, arguments, _db.get_order_details)
+            if 'orders' in result and hasattr(_anonymizer, 'anonymize_order_detail'):
+                result = {**result, 'orders': [_anonymizer.anonymize_order_detail(d) for d in result['orders']]}
+            response = _response_builder.build_order_details_response(result)
+
         # Additional tools from old version
         elif name == "search_orders":
-            result = await _db.search_orders(**arguments)
+            result = await _cached(name, arguments, _db.search_orders)
             anonymized = _anonymizer.anonymize_orders(result) if hasattr(_anonymizer, 'anonymize_orders') else result
             response = _response_builder.build_search_response(anonymized, arguments) if hasattr(_response_builder, 'build_search_response') else {"result": anonymized}
 
         elif name == "get_workers":
-            result = await _db.get_workers(**arguments)
+            result = await _cached(name, arguments, _db.get_workers)
             anonymized = _anonymizer.anonymize_workers(result) if hasattr(_anonymizer, 'anonymize_workers') else result
             response = _response_builder.build_workers_response(anonymized, arguments) if hasattr(_response_builder, 'build_workers_response') else {"result": anonymized}
 
         elif name == "get_worker_detail":
-            result = await _db.get_worker_detail(**arguments)
+            result = await _cached(name, arguments, _db.get_worker_detail)
             anonymized = _anonymizer.anonymize_worker_detail(result) if hasattr(_anonymizer, 'anonymize_worker_detail') else result
             response = _response_builder.build_worker_detail_response(anonymized) if hasattr(_response_builder, 'build_worker_detail_response') else {"result": anonymized}
 
+        elif name == "get_workers_stats":
+            result = await _cached(name, arguments, _db.get_workers_stats)
+            anonymized = _anonymizer.anonymize_workers_stats(result) if hasattr(_anonymizer, 'anonymize_workers_stats') else result
+            response = _response_builder.build_workers_stats_response(anonymized, arguments)
+
         elif name == "get_materials":
-            result = await _db.get_materials(**arguments)
+            result = await _cached(name, arguments, _db.get_materials)
             anonymized = _anonymizer.anonymize_materials(result) if hasattr(_anonymizer, 'anonymize_materials') else result
             response = _response_builder.build_materials_response(anonymized, arguments) if hasattr(_response_builder, 'build_materials_response') else {"result": anonymized}
 
         elif name == "get_material_movements":
-            result = await _db.get_material_movements(**arguments)
+            # 'stream' má smysl jen přes HTTP (stream_tool); zde vracíme běžnou odpověď
+            result = await _cached(name, {k: v for k, v in arguments.items() if k != 'stream'}, _db.get_material_movements)
             response = _response_builder.build_movements_response(result, arguments) if hasattr(_response_builder, 'build_movements_response') else {"result": result}
 
         elif name == "get_operations":
-            result = await _db.get_operations(**arguments)
+            result = await _cached(name, arguments, _db.get_operations)
             response = _response_builder.build_operations_response(result, arguments) if hasattr(_response_builder, 'build_operations_response') else {"result": result}
 
         elif name == "get_machines":
-            result = await _db.get_machines(**arguments)
+            result = await _cached(name, arguments, _db.get_machines)
             response = _response_builder.build_machines_response(result, arguments) if hasattr(_response_builder, 'build_machines_response') else {"result": result}
 
         elif name == "get_production_stats":
-            result = await _db.get_production_stats(**arguments)
+            result = await _cached(name, arguments, _db.get_production_stats)
             response = _response_builder.build_stats_response(result, arguments) if hasattr(_response_builder, 'build_stats_response') else {"result": result}
 
+        elif name == EXPORT_TOOL:
+            # Data se přes MCP neposílají - tool vrací odkaz na streamovaný HTTP export
+            try:
+                descriptor = _exporter.describe(arguments.get('dataset'), arguments.get('format', 'csv'), arguments)
+                response = _response_builder.build_export_response(descriptor)
+            except ExportError as e:
+                response = {"status": "error", "message": str(e)}
+
         else:
             response = {"status": "error", "message": f"Neznámý tool: {name}"}
 
         return [TextContent(type="text", text=json.dumps(response, ensure_ascii=False))]
 
+    except InvalidCursorError as e:
+        logger.warning("Invalid pagination cursor in tool %s", name)
+        error_response = {"status": "error", "message": str(e)}
+        return [TextContent(type="text", text=json.dumps(error_response, ensure_ascii=False))]
+
+    except PoolBusyError as e:
+        logger.warning("Tool %s rejected: %s", name, e)
+        error_response = {"status": "error", "message": "Server je přetížen, zkuste to prosím za chvíli znovu"}
+        return [TextContent(type="text", text=json.dumps(error_response, ensure_ascii=False))]
+
+    except QueryTimeoutError as e:
+        logger.warning("Query timeout in tool %s: %s", name, e)
+        error_response = {"status": "error", "message": f"{e}, zužte prosím filtry"}
+        return [TextContent(type="text", text=json.dumps(error_response, ensure_ascii=False))]
+
     except Exception:
         logger.exception("Error in tool %s", name)
         error_response = {"status": "error", "message": "Chyba při zpracování"}
         return [TextContent(type="text", text=json.dumps(error_response, ensure_ascii=False))]
 
+    finally:
+        scope.close()
+
+
+def _wants_stream(name: Any, arguments: Any) -> bool:
+    return name in STREAMABLE_TOOLS and isinstance(arguments, Mapping) and arguments.get('stream') is True
+
+
+async def stream_tool(name: str, arguments: Mapping) -> AsyncIterator[str]:
+    """Streamované provedení toolu: DB dávky -> JSON fragmenty odpovědi.
+
+    Pohyby materiálu neobsahují osobní údaje, anonymizace se (stejně jako u
+    nestreamované odpovědi) neuplatňuje.
+
+    Výsledek se nikdy nedrží v paměti celý; spojení s DB se uvolní, jakmile konzument
+    iteraci dokončí nebo přeruší.
+    """
+    filters = {k: v for k, v in arguments.items() if k != 'stream'}
+    if name not in STREAMABLE_TOOLS:
+        raise ValueError(f"Tool {name} nepodporuje streamovanou odpověď")
+
+    # Deadline, směrování a limit souběhu jako u nestreamovaného volání (_call_tool)
+    with _db.tool_scope(name):
+        # Souhrn za celý filtr počítá databáze (stejně jako u stránkované odpovědi)
+        aggregates = await _db.get_movement_summary(
+            material_id=filters.get('material_id'),
+            date_from=filters.get('date_from'),
+            date_to=filters.get('date_to'),
+            bucket=filters.get('bucket'),
+        )
+        chunks = _db.iter_material_movements(
+            material_id=filters.get('material_id'),
+            date_from=filters.get('date_from'),
+            date_to=filters.get('date_to'),
+            limit=filters.get('limit'),
+            timeout=_db.timeout_for(name),
+        )
+        build = _response_builder.stream_movements_response(chunks, filters, aggregates)
+        async with contextlib.aclosing(chunks):
+            async with contextlib.aclosing(build) as fragments:
+                async for fragment in fragments:
+                    yield fragment
+
+
+def _json_string_body(text: str) -> bytes:
+    """Fragment textu escapovaný jako obsah JSON řetězce (bez uvozovek)"""
+    return json.dumps(text, ensure_ascii=False)[1:-1].encode('utf-8')
+
+
+async def _stream_jsonrpc_response(request: web.Request, payload_id: Any, name: str, arguments: Mapping) -> web.StreamResponse:
+    """JSON-RPC odpověď se streamovaným result.content[0].text (chunked HTTP)"""
+    fragments = stream_tool(name, arguments)
+    try:
+        first = await fragments.__anext__()
+    except Exception:
+        logger.exception("Error while starting streamed tool %s", name)
+        await fragments.aclose()
+        return web.json_response(
+            {"jsonrpc": "2.0", "id": payload_id, "error": {"code": -32000, "message": f"Internal server error while executing tool {name}"}},
+            status=200
+        )
+
+    response = web.StreamResponse(status=200)
+    response.content_type = 'application/json'
+    response.charset = 'utf-8'
+    await response.prepare(request)
+    prefix = '{"jsonrpc": "2.0", "id": %s, "result": {"content": [{"type": "text", "text": "' % json.dumps(payload_id)
+    try:
+        await response.write(prefix.encode('utf-8') + _json_string_body(first))
+        async for fragment in fragments:
+            await response.write(_json_string_body(fragment))
+        await response.write(b'"}]}}')
+        await response.write_eof()
+    except Exception:
+        # Hlavička už byla odeslána - klient dostane nedokončený JSON
+        logger.exception("Streaming of tool %s aborted", name)
+    finally:
+        await fragments.aclose()
+    return response
+
+
+def _admit(name: str, arguments: Mapping):
+    """Místo ve vstupní frontě třídy zátěže toolu (bez admission control nic neomezuje)"""
+    if _admission is None:
+        return contextlib.nullcontext()
+    workloads = getattr(_db, 'workloads', None)
+    workload = workloads.workload_for(name, streaming=_wants_stream(name, arguments)) if workloads else DEFAULT_WORKLOAD
+    return _admission.admit(workload)
+
+
+def _overloaded_response(payload_id: Any, error: AdmissionRejected) -> web.Response:
+    """JSON-RPC chyba "server přetížen" s doporučením Retry-After (hlavička i error.data)"""
+    logger.warning("Tool call rejected by admission control: %s", error)
+    return web.json_response(
+        {
+            "jsonrpc": "2.0",
+            "id": payload_id,
+            "error": {
+                "code": -32001,
+                "message": "Server je přetížen, zkuste to prosím znovu později",
+                "data": {"retry_after": error.retry_after, "workload": error.workload, "reason": error.reason},
+            },
+        },
+        status=503,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+async def open_export(dataset: str, fmt: str, filters: Mapping[str, Any]) -> Tuple[str, str, AsyncIterator[bytes]]:
+    """Streamovaný export pro oba transporty (aiohttp i REST adaptér): (content type, název souboru, tělo).
+
+    Export zabírá místo ve vstupní frontě třídy zátěže toolu export_data po celou
+    dobu streamu. První dávka se načte ještě před návratem, aby chyba dotazu
+    nastala před odesláním hlavičky, ne jako useknutý soubor.
+    Vyhazuje ExportError (neplatný požadavek) a AdmissionRejected (přetížení).
+    """
+    content_type, filename, body = _exporter.open(dataset, fmt, dict(filters), timeout=_db.timeout_for(EXPORT_TOOL))
+    stream = _admitted_export(body)
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except BaseException:
+        await stream.aclose()
+        raise
+    return content_type, filename, _prepend(first, stream)
+
+
+async def _admitted_export(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    async with contextlib.aclosing(body):
+        async with _admit(EXPORT_TOOL, {}):
+            async for data in body:
+                yield data
+
+
+async def _prepend(first: bytes, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    async with contextlib.aclosing(stream):
+        if first:
+            yield first
+        async for data in stream:
+            yield data
+
+
+async def export_handler(request: web.Request) -> web.StreamResponse:
+    """HTTP: streamovaný export /export/{dataset}?format=csv|ndjson|parquet&filtry (chunked, anonymizace po dávkách)"""
+    dataset = request.match_info['dataset']
+    try:
+        content_type, filename, body = await open_export(dataset, request.query.get('format', 'csv'), request.query)
+    except ExportError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    except AdmissionRejected as e:
+        logger.warning("Export rejected by admission control: %s", e)
+        return web.json_response(
+            {"error": "Server je přetížen, zkuste to prosím znovu později", "retry_after": e.retry_after},
+            status=503, headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception:
+        logger.exception("Export %s failed", dataset)
+        return web.json_response({"error": f"Internal server error while exporting {dataset}"}, status=500)
+
+    response = web.StreamResponse(status=200, headers={
+        'Content-Type': content_type,
+        'Content-Disposition': f'attachment; filename="{filename}"',
+    })
+    response.enable_chunked_encoding()
+    try:
+        await response.prepare(request)
+        async for data in body:
+            await response.write(data)
+        await response.write_eof()
+    except Exception:
+        # Hlavička už byla odeslána - klient dostane nedokončený soubor
+        logger.exception("Export %s aborted", dataset)
+    finally:
+        await body.aclose()
+    return response
+
 
 async def mcp_post_handler(request: web.Request):
     """HTTP handler for MCP tool calls."""
@@ -483,7 +825,12 @@ async def mcp_post_handler(request: web.Request):
             inner_args = {}
 
         try:
-            result_contents = await call_tool(inner_name, inner_args)
+            async with _admit(inner_name, inner_args):
+                if _wants_stream(inner_name, inner_args):
+                    return await _stream_jsonrpc_response(request, payload_id, inner_name, inner_args)
+                result_contents = await call_tool(inner_name, inner_args)
+        except AdmissionRejected as e:
+            return _overloaded_response(payload_id, e)
         except Exception:
             logger.exception("Error while executing tool %s via tools/call", inner_name)
             return web.json_response(
@@ -507,7 +854,12 @@ async def mcp_post_handler(request: web.Request):
     logger.info("MCP HTTP call received from %s: %s args_summary: %s", client_ip, tool_name, _redact_arguments(tool_arguments))
 
     try:
-        result_contents = await call_tool(tool_name, tool_arguments)
+        async with _admit(tool_name, tool_arguments):
+            if _wants_stream(tool_name, tool_arguments):
+                return await _stream_jsonrpc_response(request, payload_id, tool_name, tool_arguments)
+            result_contents = await call_tool(tool_name, tool_arguments)
+    except AdmissionRejected as e:
+        return _overloaded_response(payload_id, e)
     except Exception:
         logger.exception("Error while executing tool %s", tool_name)
         return web.json_response(
@@ -566,6 +918,135 @@ async def health_handler(request: web.Request):
     return web.json_response({"status": "ok"}, status=200)
 
 
+# Admin endpointy (/admin/*) - výchozí vypnuto; bez tokenu jen z localhostu
+DEFAULT_ADMIN_CONFIG = {"enabled": False, "token": "", "index_advice_ttl": 300}
+
+# Index advisor spouští EXPLAIN všech tvarů dotazů: jeden běh najednou ve třídě zátěže
+# analytics, hotový report se po index_advice_ttl sekund vrací z paměti
+INDEX_ADVICE_TOOL = "index_advice"
+_index_advice_lock = asyncio.Lock()
+_index_advice: Dict[str, Any] = {}   # jen poslední report: min_rows, at, report
+LOCAL_ADDRESSES = ("127.0.0.1", "::1")
+
+
+def _admin_denied(request: web.Request, admin_config: Mapping[str, Any]) -> web.Response | None:
+    """Odmítnutí požadavku na admin endpoint, nebo None, pokud je povolený.
+
+    S nastaveným tokenem se vyžaduje hlavička "Authorization: Bearer <token>"
+    (nebo X-Admin-Token); bez tokenu jsou admin endpointy dostupné jen z localhostu.
+    """
+    cfg = {**DEFAULT_ADMIN_CONFIG, **(admin_config or {})}
+    if not cfg['enabled']:
+        return web.json_response({"error": "Not found"}, status=404)
+    token = str(cfg['token'] or "")
+    if token:
+        supplied = request.headers.get('X-Admin-Token', "")
+        auth = request.headers.get('Authorization', "")
+        if auth.startswith('Bearer '):
+            supplied = auth[len('Bearer '):]
+        if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            logger.warning("Unauthorized admin request %s from %s", request.path, _get_client_ip(request))
+            return web.json_response({"error": "Unauthorized"}, status=401, headers={"WWW-Authenticate": "Bearer"})
+        return None
+    if request.remote not in LOCAL_ADDRESSES:
+        logger.warning("Admin request %s from non-local address %s rejected", request.path, _get_client_ip(request))
+        return web.json_response({"error": "Forbidden"}, status=403)
+    return None
+
+
+def admin_only(handler):
+    """Dekorátor admin handleru: přístup podle sekce admin (viz _admin_denied)"""
+    @functools.wraps(handler)
+    async def wrapper(request: web.Request):
+        denied = _admin_denied(request, config.admin if config else None)
+        if denied is not None:
+            return denied
+        return await handler(request)
+    return wrapper
+
+
+@admin_only
+async def metrics_handler(request: web.Request):
+    """Admin: provozní metriky (pool spojení, ...)."""
+    metrics = _db.get_metrics()
+    metrics['cache'] = _result_cache.stats() if _result_cache else None
+    metrics['coalescing'] = _singleflight.stats() if _singleflight else None
+    metrics['admission'] = _admission.stats() if _admission else None
+    return web.json_response(metrics, status=200)
+
+
+@admin_only
+async def slow_queries_handler(request: web.Request):
+    """Admin: nejhorší SQL příkazy (?limit=20&sort=total|max|avg|slow) a poslední pomalé příkazy."""
+    try:
+        limit = int(request.query.get('limit', 20))
+    except ValueError:
+        limit = 20
+    sort = request.query.get('sort', 'total')
+    slow_log = _db.slow_log
+    return web.json_response({
+        "threshold_ms": slow_log.threshold * 1000,
+        "sort": sort,
+        "statements": slow_log.worst(limit, sort),
+        "recent": slow_log.recent(limit),
+    }, status=200, dumps=lambda obj: json.dumps(obj, ensure_ascii=False, default=str))
+
+
+@admin_only
+async def index_advice_handler(request: web.Request):
+    """Admin: EXPLAIN tvarů dotazů všech tools a návrh chybějících indexů (?min_rows=1000); nic neaplikuje."""
+    try:
+        min_rows = int(request.query.get('min_rows', 1000))
+    except ValueError:
+        min_rows = 1000
+    ttl = float({**DEFAULT_ADMIN_CONFIG, **config.admin}['index_advice_ttl'])
+    if _index_advice.get('min_rows') == min_rows and time.monotonic() - _index_advice['at'] < ttl:
+        report = _index_advice['report']
+    elif _index_advice_lock.locked():
+        return web.json_response({"error": "Index advisor už běží, zkuste to prosím později"},
+                                 status=429, headers={"Retry-After": "30"})
+    else:
+        try:
+            async with _index_advice_lock, _admit(INDEX_ADVICE_TOOL, {}):
+                with _db.tool_scope(INDEX_ADVICE_TOOL):
+                    report = await IndexAdvisor(_db, min_rows=min_rows).run()
+        except AdmissionRejected as e:
+            return web.json_response({"error": "Server je přetížen, zkuste to prosím znovu později", "retry_after": e.retry_after},
+                                     status=503, headers={"Retry-After": str(e.retry_after)})
+        except Exception as e:
+            logger.exception("Index advisor failed")
+            return web.json_response({"error": str(e)}, status=500)
+        _index_advice.update(min_rows=min_rows, at=time.monotonic(), report=report)
+    return web.json_response(report, status=200, dumps=lambda obj: json.dumps(obj, ensure_ascii=False, default=str))
+
+
+@admin_only
+async def cache_clear_handler(request: web.Request):
+    """Admin: vyprázdnění cache výsledků."""
+    if _result_cache:
+        _result_cache.clear()
+    return web.json_response({"status": "ok"}, status=200)
+
+
+@admin_only
+async def schema_handler(request: web.Request):
+    """Admin: stav katalogu schématu a detekované schopnosti."""
+    return web.json_response(_db.catalog.describe(), status=200)
+
+
+@admin_only
+async def schema_refresh_handler(request: web.Request):
+    """Admin: explicitní obnova katalogu schématu."""
+    client_ip = _get_client_ip(request)
+    logger.info("Schema catalog refresh requested from %s", client_ip)
+    try:
+        described = await _db.refresh_schema()
+    except Exception:
+        logger.exception("Error while refreshing schema catalog")
+        return web.json_response({"error": "Internal server error during schema refresh"}, status=500)
+    return web.json_response(described, status=200)
+
+
 async def main() -> None:
     logger.info(f"=== Starting eMISTR MCP Server version {SERVER_VERSION} ===")
     await initialize()
@@ -575,8 +1056,16 @@ async def main() -> None:
     web_app.router.add_post('/mcp', mcp_post_handler) # Use new handler for POST
     web_app.router.add_get('/mcp', mcp_get_handler) # New handler for GET /mcp
     web_app.router.add_get('/mcp/tools', list_tools_handler) # Keep existing route for /mcp/tools
-
-    runner = web.AppRunner(web_app)
+    web_app.router.add_get('/export/{dataset}', export_handler)
+    web_app.router.add_get('/admin/metrics', metrics_handler)
+    web_app.router.add_get('/admin/slow-queries', slow_queries_handler)
+    web_app.router.add_get('/admin/index-advice', index_advice_handler)
+    web_app.router.add_post('/admin/cache/clear', cache_clear_handler)
+    web_app.router.add_get('/admin/schema', schema_handler)
+    web_app.router.add_post('/admin/schema/refresh', schema_refresh_handler)
+
+    # Odpojení klienta zruší handler -> rozběhnuté dotazy se zabijí (viz DatabaseManager._guarded)
+    runner = web.AppRunner(web_app, handler_cancellation=True)
     await runner.setup()
     site = web.TCPSite(runner, host='0.0.0.0', port=9201)
     await site.start()
@@ -589,6 +1078,8 @@ async def main() -> None:
     except asyncio.CancelledError:
         logger.info("Shutdown requested, stopping server")
     finally:
+        if _table_watcher:
+            await _table_watcher.stop()
         # Attempt DB disconnect
         try:
             disconnect = getattr(_db, 'disconnect', None)
@@ -0,0 +1,66 @@
+"""
+Single-flight pro eMISTR MCP Server
+Souběžná identická volání (stejný klíč) sdílí jedno rozběhnuté provedení -
+jeden dotaz do databáze a jedno sestavení odpovědi pro všechny čekající
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable
+
+logger = logging.getLogger('emistr-mcp.singleflight')
+
+
+class _Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Slučování souběžných volání podle klíče.
+
+    První volající spustí práci jako samostatnou úlohu, další se na ni jen
+    připojí. Zrušení jednoho čekajícího (klient odešel) práci nezruší, dokud
+    na výsledek čeká někdo jiný; zruší se až s posledním čekajícím. Výsledek
+    se po dokončení nikde neuchovává - to je úloha cache.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finish(key, flight))
+            self._executed += 1
+        else:
+            self._coalesced += 1
+            logger.debug("Coalesced in-flight call %s", key)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': len(self._flights),
+            'executed': self._executed,
+            'coalesced': self._coalesced,
+        }
@@ -0,0 +1,168 @@
+"""
+Slow Query Log pro eMISTR MCP Server
+Časování SQL příkazů podle normalizovaného otisku (fingerprint), kruhový buffer
+pomalých příkazů s EXPLAIN a volitelný zápis do souboru (JSON lines)
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+logger = logging.getLogger('emistr-mcp.slowlog')
+
+
+DEFAULT_SLOW_LOG_CONFIG = {
+    "enabled": True,
+    "threshold_ms": 500,
+    "capacity": 200,          # počet posledních pomalých příkazů v paměti
+    "max_fingerprints": 1000, # počet sledovaných otisků (LRU)
+    "explain": True,
+    "explain_interval": 600,  # s; EXPLAIN stejného otisku nejvýš jednou za interval
+    "file": None,             # cesta k JSON lines logu (None = jen v paměti)
+}
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(query: str) -> str:
+    """Normalizovaný tvar dotazu: literály a parametry -> ?, IN seznamy -> IN (...), jednotné mezery"""
+    text = _STRING_RE.sub("?", query)
+    text = _NUMBER_RE.sub("?", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (...)", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class _Statement:
+    """Souhrnné časy jednoho otisku"""
+
+    __slots__ = ('fingerprint', 'count', 'slow_count', 'total', 'max', 'rows', 'last_tool', 'explain', 'explained_at')
+
+    def __init__(self, fp: str):
+        self.fingerprint = fp
+        self.count = 0
+        self.slow_count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.last_tool: Optional[str] = None
+        self.explain: Optional[List[Dict[str, Any]]] = None
+        self.explained_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'fingerprint': self.fingerprint,
+            'count': self.count,
+            'slow_count': self.slow_count,
+            'total_ms': round(self.total * 1000, 1),
+            'avg_ms': round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 1),
+            'avg_rows': round(self.rows / self.count, 1) if self.count else 0.0,
+            'last_tool': self.last_tool,
+            'explain': self.explain,
+        }
+
+
+class SlowQueryLog:
+    """Statistiky příkazů podle otisku a záznam pomalých příkazů.
+
+    Parametry dotazů se neukládají (mohou obsahovat osobní údaje); použijí se
+    jen pro EXPLAIN, který běží na pozadí mimo měřený požadavek.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 explain: Optional[Callable[[str, tuple], Awaitable[List[Dict[str, Any]]]]] = None):
+        cfg = dict(DEFAULT_SLOW_LOG_CONFIG)
+        cfg.update(config or {})
+        self.enabled = bool(cfg['enabled'])
+        self.threshold = float(cfg['threshold_ms']) / 1000
+        self.max_fingerprints = int(cfg['max_fingerprints'])
+        self.explain_enabled = bool(cfg['explain']) and explain is not None
+        self.explain_interval = float(cfg['explain_interval'])
+        self.file = cfg['file']
+        self._explain = explain
+        self._statements: "OrderedDict[str, _Statement]" = OrderedDict()
+        self._recent: deque = deque(maxlen=int(cfg['capacity']))
+        self._tasks: set = set()
+
+    def record(self, query: str, params: Optional[tuple], duration: float, rows: int, tool: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        fp = fingerprint(query)
+        stmt = self._statements.get(fp)
+        if stmt is None:
+            stmt = self._statements[fp] = _Statement(fp)
+            while len(self._statements) > self.max_fingerprints:
+                self._statements.popitem(last=False)
+        else:
+            self._statements.move_to_end(fp)
+        stmt.count += 1
+        stmt.total += duration
+        stmt.rows += rows
+        stmt.last_tool = tool
+        if duration > stmt.max:
+            stmt.max = duration
+        if duration < self.threshold:
+            return
+
+        stmt.slow_count += 1
+        entry = {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'fingerprint': fp,
+            'duration_ms': round(duration * 1000, 1),
+            'rows': rows,
+            'tool': tool,
+        }
+        self._recent.append(entry)
+        logger.warning("Slow query (%.0f ms, %d rows, tool %s): %s", duration * 1000, rows, tool, fp)
+        if self.explain_enabled and (stmt.explained_at is None or time.monotonic() - stmt.explained_at > self.explain_interval):
+            stmt.explained_at = time.monotonic()
+            task = asyncio.create_task(self._capture_explain(stmt, query, params, entry))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._write(entry)
+
+    async def _capture_explain(self, stmt: _Statement, query: str, params: Optional[tuple], entry: Dict[str, Any]) -> None:
+        try:
+            stmt.explain = await self._explain(query, params)
+            entry['explain'] = stmt.explain
+        except Exception as e:
+            logger.debug("EXPLAIN failed for %s: %s", stmt.fingerprint, e)
+        self._write(entry)
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        if not self.file:
+            return
+        try:
+            with open(self.file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            logger.exception("Cannot write slow query log %s", self.file)
+
+    def worst(self, limit: int = 20, sort: str = 'total') -> List[Dict[str, Any]]:
+        """Nejhorší otisky podle celkového času ('total'), maxima ('max') nebo počtu pomalých ('slow')"""
+        keys = {
+            'total': lambda s: s.total,
+            'max': lambda s: s.max,
+            'slow': lambda s: s.slow_count,
+            'avg': lambda s: s.total / s.count if s.count else 0.0,
+        }
+        key = keys.get(sort, keys['total'])
+        return [s.as_dict() for s in sorted(self._statements.values(), key=key, reverse=True)[:limit]]
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return list(self._recent)[-limit:][::-1]
+
+    def reset(self) -> None:
+        self._statements.clear()
+        self._recent.clear()
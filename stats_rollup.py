@@ -0,0 +1,165 @@
+"""
+Stats Rollup pro eMISTR MCP Server
+Denní agregace readdata pro get_production_stats - uzavřené dny se spočítají
+jednou a drží v paměti, dotaz na rozsah se skládá z denních bucketů
+"""
+
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger('emistr-mcp.rollup')
+
+
+TOP_OPERATIONS = 10
+
+# Sdílený bucket dne bez záznamů (jen pro čtení)
+_EMPTY_BUCKET: Dict[str, Any] = {'daily': None, 'operations': {}}
+
+
+def parse_day(value: Any) -> Optional[date]:
+    """'YYYY-MM-DD' -> date; hodnoty s časem (nebo nevalidní) -> None"""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if not isinstance(value, str) or len(value.strip()) != 10:
+        return None
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        return None
+
+
+class DailyRollup:
+    """Denní buckety výrobních statistik.
+
+    Bucket dne obsahuje souhrn (hodiny, počet pracovníků a zakázek) a hodiny/počty
+    všech operací, aby šlo top operace za rozsah správně sloučit. Dny starší než
+    settle_days se považují za uzavřené a cachují se; dnešek a dny v "usazovací"
+    lhůtě (pozdě načtené záznamy z terminálů) se počítají při každém dotazu.
+    """
+
+    def __init__(self, db, settle_days: int = 1, max_days: int = 1100):
+        self._db = db
+        self.settle_days = max(0, settle_days)
+        self.max_days = max_days
+        # den -> {'daily': řádek nebo None, 'operations': {název: (count, hours)}}
+        self._buckets: "OrderedDict[date, Dict[str, Any]]" = OrderedDict()
+        self._computed_days = 0
+
+    def _first_open_day(self) -> date:
+        return date.today() - timedelta(days=self.settle_days)
+
+    def covers(self, day_from: date, day_to: date) -> bool:
+        """Rozsah, který se do cache vejde; delší (např. 1900-2100) by vytlačil všechny
+        uložené dny - ten se počítá přímo nad readdata"""
+        return (day_to - day_from).days < self.max_days
+
+    async def get_range(self, day_from: date, day_to: date) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Denní statistiky a top operace za dny day_from..day_to (včetně; rozsah viz covers)"""
+        first_open = self._first_open_day()
+        buckets: Dict[date, Dict[str, Any]] = {}
+        missing: List[date] = []
+        day = day_from
+        while day <= day_to:
+            bucket = self._buckets.get(day) if day < first_open else None
+            if bucket is not None:
+                self._buckets.move_to_end(day)
+                buckets[day] = bucket
+            else:
+                missing.append(day)
+            day += timedelta(days=1)
+
+        if missing:
+            ranges = self._contiguous(missing)
+            computed = await self._db._gather(*(self._compute(start, end) for start, end in ranges))
+            for result in computed:
+                buckets.update(result)
+            # Uzavřené dny se ukládají i bez záznamů, aby se znovu nepočítaly
+            for day in missing:
+                if day < first_open:
+                    self._store(day, buckets.get(day, _EMPTY_BUCKET))
+
+        daily = [buckets[d]['daily'] for d in sorted(buckets) if buckets[d]['daily']]
+        return daily, self._merge_operations(buckets.values())
+
+    @staticmethod
+    def _contiguous(days: List[date]) -> List[Tuple[date, date]]:
+        ranges: List[Tuple[date, date]] = []
+        for day in days:
+            if ranges and ranges[-1][1] + timedelta(days=1) == day:
+                ranges[-1] = (ranges[-1][0], day)
+            else:
+                ranges.append((day, day))
+        return ranges
+
+    async def _compute(self, day_from: date, day_to: date) -> Dict[date, Dict[str, Any]]:
+        """Buckety pro souvislý rozsah dnů (dva grupované dotazy nad readdata)"""
+        params = (day_from.isoformat(), (day_to + timedelta(days=1)).isoformat())
+        hours_query = """
+            SELECT
+                DATE(rd.start) as date,
+                SUM(TIMESTAMPDIFF(SECOND, rd.start, rd.finish)) / 3600.0 as total_hours,
+                COUNT(DISTINCT rd.worker_id) as workers_count,
+                COUNT(DISTINCT rd.order_id) as orders_count
+            FROM readdata rd
+            WHERE rd.start >= %s AND rd.start < %s
+            GROUP BY DATE(rd.start)
+        """
+        operations_query = """
+            SELECT
+                DATE(rd.start) as date,
+                op.name,
+                COUNT(*) as count,
+                SUM(TIMESTAMPDIFF(SECOND, rd.start, rd.finish)) / 3600.0 as total_hours
+            FROM readdata rd
+            LEFT JOIN operation op ON rd.operation_id = op.id
+            WHERE rd.start >= %s AND rd.start < %s
+            GROUP BY DATE(rd.start), op.name
+        """
+        hours, operations = await self._db._gather(
+            self._db.execute_query(hours_query, params),
+            self._db.execute_query(operations_query, params),
+        )
+        self._computed_days += (day_to - day_from).days + 1
+
+        # Buckety jen pro dny se záznamy
+        result: Dict[date, Dict[str, Any]] = {}
+        for row in hours:
+            day = parse_day(str(row['date'])[:10])
+            if day is not None and day_from <= day <= day_to:
+                result.setdefault(day, {'daily': None, 'operations': {}})['daily'] = row
+        for row in operations:
+            day = parse_day(str(row['date'])[:10])
+            if day is not None and day_from <= day <= day_to:
+                result.setdefault(day, {'daily': None, 'operations': {}})['operations'][row.get('name')] = (
+                    int(row.get('count') or 0), float(row.get('total_hours') or 0)
+                )
+        return result
+
+    def _store(self, day: date, bucket: Dict[str, Any]) -> None:
+        self._buckets[day] = bucket
+        self._buckets.move_to_end(day)
+        while len(self._buckets) > self.max_days:
+            self._buckets.popitem(last=False)
+
+    @staticmethod
+    def _merge_operations(buckets) -> List[Dict[str, Any]]:
+        totals: Dict[Any, List[float]] = {}
+        for bucket in buckets:
+            for name, (count, hours) in bucket['operations'].items():
+                acc = totals.setdefault(name, [0, 0.0])
+                acc[0] += count
+                acc[1] += hours
+        top = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:TOP_OPERATIONS]
+        return [{'name': name, 'count': count, 'total_hours': hours} for name, (count, hours) in top]
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'cached_days': len(self._buckets),
+            'computed_days': self._computed_days,
+            'settle_days': self.settle_days,
+        }
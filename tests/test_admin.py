@@ -0,0 +1,113 @@
+import os
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from aiohttp.test_utils import make_mocked_request
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from server import _admin_denied
+from workloads import DEFAULT_TOOL_WORKLOADS
+
+
+def _request(remote="10.0.0.5", headers=None):
+    transport = mock.Mock()
+    transport.get_extra_info.return_value = (remote, 40000)
+    return make_mocked_request("GET", "/admin/metrics", headers=headers or {}, transport=transport)
+
+
+def test_admin_endpoints_are_disabled_by_default():
+    assert _admin_denied(_request("127.0.0.1"), {}).status == 404
+
+
+def test_without_token_only_localhost_is_allowed():
+    cfg = {"enabled": True}
+    assert _admin_denied(_request("127.0.0.1"), cfg) is None
+    assert _admin_denied(_request("10.0.0.5"), cfg).status == 403
+
+
+def test_token_is_required_when_configured():
+    cfg = {"enabled": True, "token": "s3cret"}
+    assert _admin_denied(_request("127.0.0.1"), cfg).status == 401
+    assert _admin_denied(_request(headers={"Authorization": "Bearer nope"}), cfg).status == 401
+    assert _admin_denied(_request(headers={"Authorization": "Bearer s3cret"}), cfg) is None
+    assert _admin_denied(_request(headers={"X-Admin-Token": "s3cret"}), cfg) is None
+
+
+@pytest.mark.asyncio
+async def test_index_advice_runs_once_per_ttl_under_analytics_workload(monkeypatch):
+    import server
+    from contextlib import contextmanager
+
+    runs = []
+    scopes = []
+
+    class FakeAdvisor:
+        def __init__(self, db, min_rows=1000):
+            self.min_rows = min_rows
+
+        async def run(self):
+            runs.append(self.min_rows)
+            return {"missing_indexes": []}
+
+    class FakeDB:
+        @contextmanager
+        def tool_scope(self, tool):
+            scopes.append(tool)
+            yield
+
+    monkeypatch.setattr(server, "IndexAdvisor", FakeAdvisor)
+    monkeypatch.setattr(server, "config", SimpleNamespace(admin={"enabled": True}))
+    monkeypatch.setattr(server, "_db", FakeDB())
+    monkeypatch.setattr(server, "_index_advice", {})
+
+    first = await server.index_advice_handler(_request("127.0.0.1"))
+    second = await server.index_advice_handler(_request("127.0.0.1"))
+
+    assert (first.status, second.status) == (200, 200)
+    assert runs == [1000]
+    assert scopes == ["index_advice"]
+    assert DEFAULT_TOOL_WORKLOADS["index_advice"] == "analytics"
+
+
+@pytest.mark.asyncio
+async def test_index_advice_keeps_only_the_last_report(monkeypatch):
+    import server
+    from contextlib import contextmanager
+    from aiohttp.test_utils import make_mocked_request
+
+    runs = []
+
+    class FakeAdvisor:
+        def __init__(self, db, min_rows=1000):
+            self.min_rows = min_rows
+
+        async def run(self):
+            runs.append(self.min_rows)
+            return {"min_rows": self.min_rows}
+
+    class FakeDB:
+        @contextmanager
+        def tool_scope(self, tool):
+            yield
+
+    monkeypatch.setattr(server, "IndexAdvisor", FakeAdvisor)
+    monkeypatch.setattr(server, "config", SimpleNamespace(admin={"enabled": True}))
+    monkeypatch.setattr(server, "_db", FakeDB())
+    monkeypatch.setattr(server, "_index_advice", {})
+
+    def request(min_rows):
+        transport = mock.Mock()
+        transport.get_extra_info.return_value = ("127.0.0.1", 40000)
+        return make_mocked_request("GET", f"/admin/index-advice?min_rows={min_rows}", transport=transport)
+
+    for min_rows in (10, 20, 30, 30):
+        await server.index_advice_handler(request(min_rows))
+
+    assert runs == [10, 20, 30]
+    assert server._index_advice["min_rows"] == 30 and len(server._index_advice) == 3
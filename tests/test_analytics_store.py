@@ -0,0 +1,164 @@
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+from analytics_store import AnalyticsStore
+
+
+COLUMNS = {
+    "readdata": {"id": "int", "worker_id": "int", "order_id": "int", "operation_id": "int",
+                 "start": "datetime", "finish": "datetime", "datum": "datetime", "real_time": "decimal"},
+    "operation": {"id": "int", "name": "varchar"},
+    "sklad_material_pohyb": {"id": "int", "material_id": "int", "mnozstvi": "decimal", "datum": "datetime",
+                             "typ_pohybu": "varchar", "cena": "decimal"},
+}
+
+
+class FakeCatalog:
+    async def ensure_fresh(self):
+        pass
+
+    async def ensure_table(self, name):
+        pass
+
+    def columns(self, name):
+        return dict(COLUMNS.get(name, {}))
+
+
+class FakeSource:
+    """Zdrojová databáze: readdata a operation jako seznamy řádků"""
+
+    def __init__(self):
+        self.catalog = FakeCatalog()
+        self.tables = {"readdata": [], "operation": [{"id": 1, "name": "Svařování"}, {"id": 2, "name": "Lakování"}],
+                       "sklad_material_pohyb": []}
+        self.queries = []
+
+    async def stream_query(self, query, params=None, chunk_size=500, timeout=None):
+        self.queries.append((query, params))
+        table = next((t for t in ("readdata", "sklad_material_pohyb") if f"FROM {t} " in query), "operation")
+        rows = self.tables[table]
+        if "t.id > %s" in query:
+            rows = [r for r in rows if r["id"] > params[0]]
+        elif "t.start >= %s" in query:
+            rows = [r for r in rows if r["start"] >= params[0] and r["id"] <= params[1]]
+        for i in range(0, len(rows), chunk_size):
+            yield rows[i:i + chunk_size]
+
+
+def _work(id, day, hours, worker=1, operation=1, finish=True):
+    start = f"{day} 06:00:00"
+    return {"id": id, "worker_id": worker, "order_id": 100 + worker, "operation_id": operation,
+            "start": start, "finish": f"{day} {6 + hours:02d}:00:00" if finish else None,
+            "datum": start, "real_time": float(hours)}
+
+
+@pytest.mark.asyncio
+async def test_incremental_copy_and_production_stats(tmp_path):
+    source = FakeSource()
+    source.tables["readdata"] = [_work(1, "2024-05-01", 2), _work(2, "2024-05-01", 3, worker=2, operation=2)]
+    store = AnalyticsStore(source, {"path": str(tmp_path / "a.duckdb"), "batch_size": 1})
+    try:
+        await store.sync()
+        assert store.stats()["tables"]["readdata"]["rows"] == 2
+        assert store.is_fresh(("readdata", "operation"))
+
+        # Nový řádek se zkopíruje podle watermarku, starý se znovu nečte
+        source.tables["readdata"].append(_work(3, "2024-05-02", 4))
+        source.queries.clear()
+        await store.sync_table("readdata")
+        assert source.queries[0][1] == (2,)
+        assert store.stats()["tables"]["readdata"]["watermark"] == 3
+
+        stats = await store.production_stats("2024-05-01", "2024-05-02", whole_days=True)
+        assert [(d["date"], d["total_hours"], d["workers_count"]) for d in stats["daily_stats"]] == [
+            ("2024-05-01", 5.0, 2), ("2024-05-02", 4.0, 1)
+        ]
+        assert stats["top_operations"][0] == {"name": "Svařování", "count": 2, "total_hours": 6.0}
+        assert stats["freshness"]["source"] == "snapshot"
+    finally:
+        await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_recent_rows_are_recopied_to_pick_up_late_updates(tmp_path):
+    source = FakeSource()
+    today = date.today().isoformat()
+    source.tables["readdata"] = [_work(1, today, 2, finish=False)]
+    store = AnalyticsStore(source, {"path": str(tmp_path / "a.duckdb")})
+    try:
+        await store.sync_table("operation")
+        await store.sync_table("readdata")
+        source.tables["readdata"][0] = _work(1, today, 2)
+        await store.sync_table("readdata")
+
+        stats = await store.production_stats(today, today, whole_days=True)
+        assert stats["daily_stats"][0]["total_hours"] == 2.0
+        assert store.stats()["tables"]["readdata"]["rows"] == 1
+
+        workers = await store.worker_stats([1, 2], days=7)
+        assert [(w["worker_id"], w["total_hours"]) for w in workers] == [(1, 2.0)]
+    finally:
+        await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_bulk_loaded_with_source_types(tmp_path):
+    source = FakeSource()
+    row = _work(1, "2024-05-01", 2)
+    row.update({"start": datetime(2024, 5, 1, 6), "finish": "0000-00-00 00:00:00", "real_time": Decimal("2.5")})
+    source.tables["readdata"] = [row]
+    store = AnalyticsStore(source, {"path": str(tmp_path / "a.duckdb")})
+    try:
+        await store.sync()
+        rows = await store._run('SELECT start, finish, real_time FROM readdata')
+        assert rows == [{"start": datetime(2024, 5, 1, 6), "finish": None, "real_time": 2.5}]
+        names = await store._run('SELECT name FROM operation ORDER BY id')
+        assert [r["name"] for r in names] == ["Svařování", "Lakování"]
+    finally:
+        await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_movement_summary_is_served_from_fresh_snapshot(tmp_path):
+    from types import SimpleNamespace
+    from database import DatabaseManager
+
+    source = FakeSource()
+    source.tables["sklad_material_pohyb"] = [
+        {"id": 1, "material_id": 7, "mnozstvi": 10, "datum": "2024-05-02 08:00:00", "typ_pohybu": "P", "cena": 5},
+        {"id": 2, "material_id": 7, "mnozstvi": 4, "datum": "2024-05-20 08:00:00", "typ_pohybu": "V", "cena": None},
+        {"id": 3, "material_id": 7, "mnozstvi": 1, "datum": "2024-06-03 08:00:00", "typ_pohybu": "P", "cena": 2},
+        {"id": 4, "material_id": 8, "mnozstvi": 9, "datum": "2024-05-02 08:00:00", "typ_pohybu": "P", "cena": 1},
+    ]
+    store = AnalyticsStore(source, {"path": str(tmp_path / "a.duckdb")})
+    try:
+        await store.sync_table("sklad_material_pohyb")
+        db = DatabaseManager(SimpleNamespace(database={"database": "emistr"}))
+        db.analytics_store = store
+
+        async def execute_query(query, params=None):
+            raise AssertionError("summary must come from the snapshot")
+
+        db.execute_query = execute_query
+        result = await db.get_movement_summary(material_id=7, date_from="2024-05-01", bucket="month")
+
+        assert result["summary"]["movements_count"] == 3
+        assert (result["summary"]["total_in"], result["summary"]["value_in"]) == (11.0, 52.0)
+        assert (result["summary"]["total_out"], result["summary"]["value_out"]) == (4.0, 0.0)
+        assert [(p["period"], p["typ_pohybu"], p["movements_count"]) for p in result["trend"]["periods"]] == [
+            ("2024-05-01", "P", 1), ("2024-05-01", "V", 1), ("2024-06-01", "P", 1)
+        ]
+        assert result["freshness"]["source"] == "snapshot"
+    finally:
+        await store.stop()
@@ -0,0 +1,337 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database import DatabaseManager
+
+
+def _manager(**database):
+    database.setdefault("database", "emistr")
+    return DatabaseManager(SimpleNamespace(database=database))
+
+
+@pytest.mark.asyncio
+async def test_gather_runs_concurrently_with_bounded_fanout():
+    db = _manager(max_fanout=2)
+    running = 0
+    peak = 0
+
+    async def execute_routed(query, params=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [query]
+
+    db._execute_routed = execute_routed
+    results = await db._gather(*(db.execute_query(q) for q in ("a", "b", "c", "d")))
+    assert results == [["a"], ["b"], ["c"], ["d"]]
+    assert peak == 2
+
+    # Vnořené _gather v jednom tool volání sdílí stejný limit (ne max_fanout²)
+    async def nested(prefix):
+        return await db._gather(db.execute_query(prefix + "1"), db.execute_query(prefix + "2"))
+
+    peak = 0
+    with db.tool_scope("get_production_stats"):
+        results = await db._gather(nested("x"), nested("y"), nested("z"))
+    assert results[2] == [["z1"], ["z2"]]
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_gather_cancels_siblings_on_error():
+    db = _manager()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await db._gather(slow(), failing())
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+
+def test_row_converter_applies_per_column_conversions():
+    from datetime import datetime
+    from decimal import Decimal
+    from pymysql.constants import FIELD_TYPE
+    from database import build_row_converter
+
+    cursor = SimpleNamespace(
+        description=[
+            ("id", FIELD_TYPE.LONG, None, None, None, None, True),
+            ("start", FIELD_TYPE.DATETIME, None, None, None, None, True),
+            ("cena", FIELD_TYPE.NEWDECIMAL, None, None, None, None, True),
+            ("name", FIELD_TYPE.VAR_STRING, None, None, None, None, True),
+            ("name", FIELD_TYPE.VAR_STRING, None, None, None, None, True),
+            ("flag", FIELD_TYPE.BIT, None, None, None, None, True),
+        ],
+        _result=SimpleNamespace(fields=[
+            SimpleNamespace(table_name="c_order", charsetnr=63),
+            SimpleNamespace(table_name="c_order", charsetnr=63),
+            SimpleNamespace(table_name="c_order", charsetnr=63),
+            SimpleNamespace(table_name="c_order", charsetnr=33),
+            SimpleNamespace(table_name="customer", charsetnr=33),
+            SimpleNamespace(table_name="c_order", charsetnr=63),
+        ]),
+    )
+    convert = build_row_converter(cursor)
+    row = convert((1, datetime(2024, 5, 1, 8, 30), Decimal("12.50"), "A", "B", b"\x01"))
+    assert row == {"id": 1, "start": "2024-05-01T08:30:00", "cena": 12.5, "name": "A", "customer.name": "B", "flag": "\x01"}
+    # Nulové datum vrací PyMySQL jako řetězec a NULL zůstává NULL
+    assert convert((2, "0000-00-00 00:00:00", None, None, None, None))["start"] == "0000-00-00 00:00:00"
+
+
+@pytest.mark.asyncio
+async def test_order_counts_follow_filters_and_are_memoised():
+    db = _manager()
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append((query, params))
+        if "COUNT(*)" in query:
+            return [{"total": 7, "active_count": 5, "delayed_count": 2}]
+        return []
+
+    db.execute_query = execute_query
+    first = await db.get_orders(status="ANO", date_from="2024-01-01")
+    await db.get_orders(status="ANO", date_from="2024-01-01")
+
+    count_queries = [(q, p) for q, p in queries if "COUNT(*)" in q]
+    assert len(count_queries) == 1
+    query, params = count_queries[0]
+    assert "o.active = %s" in query and "o.start >= %s" in query
+    assert params == ("ANO", "2024-01-01")
+    assert first["stats"] == {"total": 7, "active_count": 5, "delayed_count": 2, "approximate": False}
+
+
+@pytest.mark.asyncio
+async def test_materials_low_stock_and_valuation_are_computed_in_sql():
+    db = _manager()
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append((query, params))
+        if "total_value" in query:
+            return [{"total_count": 40, "low_stock_count": 3, "total_value": 1250.5}]
+        return [{"id": 1, "name": "Plech", "stock_quantity": 1, "min_quantity": 5}]
+
+    db.execute_query = execute_query
+    result = await db.get_materials(sklad_id=2, low_stock_only=True, limit=10)
+
+    page_query, page_params = next((q, p) for q, p in queries if "total_value" not in q)
+    assert "IFNULL(sm.count, 0) < IFNULL(sm.limit_count, 0)" in page_query
+    assert page_params == (2, 11)
+    assert result["summary"] == {"total_count": 40, "low_stock_count": 3, "total_value": 1250.5}
+    assert len(result["materials"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_movement_totals_and_trend_cover_whole_filter_range():
+    db = _manager()
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append((query, params))
+        if "as period" in query:
+            return [{"period": "2024-05-01", "typ_pohybu": "P", "movements_count": 2, "total_quantity": 15, "total_value": 150}]
+        if "GROUP BY smp.typ_pohybu" in query:
+            return [
+                {"typ_pohybu": "P", "movements_count": 30, "total_quantity": 120, "total_value": 1200},
+                {"typ_pohybu": "V", "movements_count": 12, "total_quantity": 45.5, "total_value": 455},
+            ]
+        return [{"id": 9, "datum": "2024-05-02 10:00:00", "typ_pohybu": "V", "mnozstvi": 1}]
+
+    db.execute_query = execute_query
+    result = await db.get_material_movements(material_id=3, date_from="2024-05-01", limit=1, bucket="month")
+
+    assert len(queries) == 3
+    assert all(params[:2] == (3, "2024-05-01") for _, params in queries)
+    assert "DAYOFMONTH" in next(q for q, _ in queries if "as period" in q)
+    summary = result["summary"]
+    assert (summary["movements_count"], summary["total_in"], summary["total_out"], summary["value_out"]) == (42, 120.0, 45.5, 455.0)
+    assert result["trend"] == {"bucket": "month", "periods": [
+        {"period": "2024-05-01", "typ_pohybu": "P", "movements_count": 2, "total_quantity": 15.0, "total_value": 150.0}
+    ]}
+    assert (await db.get_material_movements(bucket="year"))["error"]
+
+
+@pytest.mark.asyncio
+async def test_workers_stats_use_one_grouped_query():
+    db = _manager()
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append((query, params))
+        if "GROUP BY rd.worker_id" in query:
+            return [{"worker_id": 2, "orders_count": 4, "total_hours": 12.5, "avg_hours_per_order": 3.1, "last_work_date": "2024-05-02"}]
+        return [{"id": 1, "name": "Novák"}, {"id": 2, "name": "Svoboda"}]
+
+    db.execute_query = execute_query
+    result = await db.get_workers_stats(worker_ids=[1, 2, 2], days=7)
+
+    assert len(queries) == 2
+    stats_query, stats_params = next((q, p) for q, p in queries if "GROUP BY" in q)
+    assert stats_params == (1, 2, 200, 7)
+    assert "LIMIT %s" in stats_query
+
+    queries.clear()
+    await db.get_workers_stats(group_name="Lakovna", days=7, limit=20)
+    stats_query, stats_params = next((q, p) for q, p in queries if "GROUP BY" in q)
+    assert "w.group_name = %s ORDER BY w.name, w.id LIMIT %s" in stats_query
+    assert stats_params == ("Lakovna", 20, 7)
+    assert result["workers"][0]["stats"]["orders_count"] == 0
+    assert result["workers"][1]["stats"]["total_hours"] == 12.5
+    assert (await db.get_workers_stats())["error"]
+
+
+@pytest.mark.asyncio
+async def test_order_details_fetch_each_table_once():
+    db = _manager()
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append((query, params))
+        if "FROM c_order" in query:
+            return [{"id": 1, "code": "Z1"}, {"id": 2, "code": "Z2"}]
+        if "FROM order_work" in query:
+            return [{"_order_id": "2", "id": 10, "poradi": 1}, {"_order_id": "1", "id": 11, "poradi": 1}]
+        return [{"_order_id": 1, "id": 20}]
+
+    db.execute_query = execute_query
+    result = await db.get_order_details(order_ids=[2, 1, 3])
+
+    assert len(queries) == 3
+    assert [d["order"]["id"] for d in result["orders"]] == [2, 1]
+    assert result["orders"][0]["operations"] == [{"id": 10, "poradi": 1}]
+    assert result["orders"][1]["materials"] == [{"id": 20}]
+    assert result["not_found"] == [3]
+
+
+MATERIAL_COLUMNS = [
+    {"TABLE_NAME": "material", "COLUMN_NAME": c, "DATA_TYPE": "int"}
+    for c in ("id", "material_id", "mnozstvi", "jednotka", "cena_nakup")
+]
+
+
+def _catalog_backed(db, columns):
+    """execute_query, které katalogu vrací zadané sloupce a ostatní dotazy zaznamenává"""
+    queries = []
+
+    async def execute_query(query, params=None):
+        if "information_schema.COLUMNS" in query:
+            return list(columns)
+        if "VERSION()" in query:
+            return [{"version": "10.6.12-MariaDB"}]
+        queries.append(query)
+        return []
+
+    db.execute_query = execute_query
+    return queries
+
+
+@pytest.mark.asyncio
+async def test_compiled_variant_replaces_missing_columns_and_is_cached_per_catalog_version():
+    db = _manager()
+    _catalog_backed(db, MATERIAL_COLUMNS)
+    await db.catalog.load()
+    builds = []
+
+    def builder():
+        builds.append(db.catalog.version)
+        return db._build_material_select()
+
+    query = db._compiled_query('material_select', builder)
+    assert "m.cena_nakup" in query
+    assert "0 as vydano_mnozstvi" in query and "0 as cena_celkem" in query
+    assert db._compiled_query('material_select', builder) is query
+    assert builds == [1]
+
+    await db.catalog.refresh()
+    db._compiled_query('material_select', builder)
+    assert builds == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_connect_clears_compiled_variants(monkeypatch):
+    class FakeManagedPool:
+        def __init__(self, name, kwargs, config=None):
+            pass
+
+        async def open(self):
+            pass
+
+    monkeypatch.setattr("database.ManagedPool", FakeManagedPool)
+    db = _manager(host="localhost", port=3306, user="u", password="p", search_index={"enabled": False})
+    _catalog_backed(db, MATERIAL_COLUMNS)
+    db._query_variants['stale'] = (0, "SELECT 1")
+
+    await db.connect(start_background=False)
+
+    assert 'stale' not in db._query_variants
+    assert "0 as vydano_mnozstvi" in db._query_variants['material_select'][1]
+
+
+@pytest.mark.asyncio
+async def test_unknown_column_refreshes_catalog_and_retries_once():
+    db = _manager()
+    columns = list(MATERIAL_COLUMNS) + [{"TABLE_NAME": "material", "COLUMN_NAME": "vydano_mnozstvi", "DATA_TYPE": "decimal"}]
+    _catalog_backed(db, columns)
+    await db.catalog.load()
+    issued = []
+    failures = ["Unknown column 'm.vydano_mnozstvi' in 'field list'"]
+
+    async def execute_query(query, params=None):
+        if "information_schema.COLUMNS" in query:
+            # Sloupec mezitím zmizel ze schématu
+            return list(MATERIAL_COLUMNS)
+        issued.append(query)
+        if failures:
+            raise Exception(failures.pop(0))
+        return [{"id": 1}]
+
+    db.execute_query = execute_query
+    rows = await db._execute_compiled('material_select', db._build_material_select, " WHERE m.order_id = %s", (5,))
+
+    assert rows == [{"id": 1}]
+    assert "m.vydano_mnozstvi" in issued[0]
+    assert "0 as vydano_mnozstvi" in issued[1]
+    assert db.catalog.version == 2
+
+    # Druhá chyba "Unknown column" už se neopakuje a propadne volajícímu
+    failures.extend(["Unknown column 'x'", "Unknown column 'x'"])
+    issued.clear()
+    with pytest.raises(Exception, match="Unknown column"):
+        await db._execute_compiled('material_select', db._build_material_select)
+    assert len(issued) == 2
+
+
+@pytest.mark.asyncio
+async def test_workers_cursor_with_deleted_anchor_is_rejected():
+    from pagination import InvalidCursorError, encode_cursor
+
+    db = _manager()
+
+    async def execute_query(query, params=None):
+        return []
+
+    db.execute_query = execute_query
+    with pytest.raises(InvalidCursorError):
+        await db.get_workers(cursor=encode_cursor({"id": 42}))
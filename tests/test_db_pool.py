@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from db_pool import ManagedPool
+
+
+def _adaptive_pool():
+    return ManagedPool('test', {}, {
+        "minsize": 2,
+        "maxsize": 4,
+        "adaptive": {"enabled": True, "min_size": 2, "max_size": 8, "target_wait_ms": 50},
+    })
+
+
+@pytest.mark.asyncio
+async def test_adaptive_pool_grows_on_wait():
+    pool = _adaptive_pool()
+    for _ in range(10):
+        pool._record_wait(0.2)
+    await pool._tune_once()
+    assert pool.stats()['limit'] == 5
+
+
+@pytest.mark.asyncio
+async def test_adaptive_pool_shrinks_when_idle():
+    pool = _adaptive_pool()
+    pool._record_wait(0.0)
+    await pool._tune_once()
+    assert pool.stats()['limit'] == 3
+
+
+def test_stats_report_wait_times():
+    pool = ManagedPool('test', {}, {"minsize": 1, "maxsize": 3})
+    pool._record_wait(0.010)
+    pool._record_wait(0.030)
+    stats = pool.stats()
+    assert stats['acquires'] == 2
+    assert stats['avg_wait_ms'] == pytest.approx(20.0)
+    assert stats['max_wait_ms'] == pytest.approx(30.0)
+    assert stats['limit'] == 3
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    from db_pool import PoolBusyError
+
+    pool = ManagedPool('busy', {}, {"minsize": 1, "maxsize": 2, "queue_depth": 1})
+    pool._limiter.in_use = 2
+    pool._limiter.waiting = 1
+    with pytest.raises(PoolBusyError):
+        async with pool.acquire():
+            pass
+    assert pool.stats()['rejected'] == 1
@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from exporter import ExportError, Exporter
+
+
+ORDERS = [
+    {"id": i, "code": f"Z{i:03d}", "name": f"Zakázka {i}", "customer_name": "ACME s.r.o.", "kusu": 2.5}
+    for i in range(1, 6)
+]
+
+
+class FakeDB:
+    def __init__(self):
+        self.calls = []
+
+    async def iter_orders(self, chunk_size=500, **filters):
+        self.calls.append(("orders", filters, chunk_size))
+        for i in range(0, len(ORDERS), chunk_size):
+            yield [dict(r) for r in ORDERS[i:i + chunk_size]]
+
+    async def iter_material_movements(self, chunk_size=500, **filters):
+        self.calls.append(("material_movements", filters, chunk_size))
+        yield [{"id": 1, "material_id": 7, "mnozstvi": 3, "datum": "2024-05-01", "note": None}]
+
+
+class FakeAnonymizer:
+    def __init__(self):
+        self.batches = []
+
+    def anonymize_orders(self, data):
+        self.batches.append(len(data["orders"]))
+        return {"orders": [{**o, "customer_name": "Zákazník"} for o in data["orders"]]}
+
+
+async def _read(body):
+    parts = [data async for data in body]
+    return parts, b"".join(parts)
+
+
+@pytest.mark.asyncio
+async def test_csv_export_streams_chunks_and_anonymizes_each():
+    db, anonymizer = FakeDB(), FakeAnonymizer()
+    exporter = Exporter(db, anonymizer, {"chunk_size": 2})
+
+    content_type, filename, body = exporter.open("orders", "csv", {"status": "active", "limit": "10", "material_id": 3})
+    parts, raw = await _read(body)
+
+    assert (content_type, filename) == ("text/csv; charset=utf-8", "orders.csv")
+    assert len(parts) == 3 and anonymizer.batches == [2, 2, 1]
+    assert db.calls[0][1]["status"] == "active" and db.calls[0][1]["limit"] == 10
+    assert raw.startswith(b"\xef\xbb\xbf")
+    rows = list(csv.DictReader(io.StringIO(raw.decode("utf-8-sig"))))
+    assert [r["code"] for r in rows] == ["Z001", "Z002", "Z003", "Z004", "Z005"]
+    assert {r["customer_name"] for r in rows} == {"Zákazník"}
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_of_movements():
+    exporter = Exporter(FakeDB(), FakeAnonymizer())
+    content_type, filename, body = exporter.open("material_movements", "ndjson", {"material_id": "7"})
+    _, raw = await _read(body)
+
+    assert filename == "material_movements.ndjson"
+    lines = raw.decode("utf-8").splitlines()
+    assert [json.loads(line)["material_id"] for line in lines] == [7]
+
+
+def test_invalid_requests_and_descriptor():
+    exporter = Exporter(FakeDB(), FakeAnonymizer(), {"base_url": "http://mcp:9201/"})
+    with pytest.raises(ExportError):
+        exporter.open("users", "csv", {})
+    with pytest.raises(ExportError):
+        exporter.open("orders", "xlsx", {})
+    with pytest.raises(ExportError):
+        exporter.describe("orders", "csv", {"customer_id": "abc"})
+
+    descriptor = exporter.describe("orders", "NDJSON", {"date_from": "2024-01-01", "search_term": "x"})
+    assert descriptor["filters"] == {"date_from": "2024-01-01"}
+    assert descriptor["url"] == "http://mcp:9201/export/orders?format=ndjson&date_from=2024-01-01"
+
+
+@pytest.mark.asyncio
+async def test_parquet_export_writes_row_group_per_chunk():
+    pq = pytest.importorskip("pyarrow.parquet")
+    exporter = Exporter(FakeDB(), FakeAnonymizer(), {"chunk_size": 2})
+    _, _, body = exporter.open("orders", "parquet", {})
+    _, raw = await _read(body)
+
+    parquet = pq.ParquetFile(io.BytesIO(raw))
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.read().column("code").to_pylist() == ["Z001", "Z002", "Z003", "Z004", "Z005"]
+
+
+@pytest.mark.asyncio
+async def test_open_export_holds_an_admission_slot_for_the_whole_stream(monkeypatch):
+    from types import SimpleNamespace
+    import server
+    from admission import AdmissionController, AdmissionRejected
+
+    admission = AdmissionController({"default": {"concurrency": 1, "queue_depth": 0, "queue_timeout": 0}})
+    monkeypatch.setattr(server, "_exporter", Exporter(FakeDB(), FakeAnonymizer(), {"chunk_size": 2}))
+    monkeypatch.setattr(server, "_db", SimpleNamespace(timeout_for=lambda tool: 0))
+    monkeypatch.setattr(server, "_admission", admission)
+
+    _, filename, body = await server.open_export("orders", "ndjson", {})
+    assert filename == "orders.ndjson"
+    with pytest.raises(AdmissionRejected):
+        await server.open_export("orders", "csv", {})
+
+    _, raw = await _read(body)
+    assert len(raw.decode("utf-8").splitlines()) == len(ORDERS)
+    stats = next(iter(admission.stats().values()))
+    assert (stats["active"], stats["admitted"], stats["rejected"]) == (0, 1, 1)
@@ -0,0 +1,91 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database import DatabaseManager
+from index_advisor import IndexAdvisor, is_covered, table_aliases
+
+
+def _manager():
+    return DatabaseManager(SimpleNamespace(database={"database": "emistr"}))
+
+
+def test_table_aliases_and_prefix_coverage():
+    query = "SELECT 1 FROM readdata rd JOIN worker w ON w.id = rd.worker_id LEFT JOIN operation op ON 1=1 WHERE 1=1"
+    assert table_aliases(query) == {"readdata": "readdata", "rd": "readdata", "worker": "worker", "w": "worker",
+                                    "operation": "operation", "op": "operation"}
+    indexes = {"PRIMARY": ["id"], "idx_worker_day": ["worker_id", "datum", "order_id"]}
+    assert is_covered(("worker_id", "datum"), indexes) == "idx_worker_day"
+    assert is_covered(("datum",), indexes) is None
+
+
+@pytest.mark.asyncio
+async def test_capture_collects_dependent_queries_without_touching_database():
+    db = _manager()
+
+    async def execute_query(query, params=None):
+        raise AssertionError("capture must not run queries")
+
+    db.execute_query = execute_query
+    advisor = IndexAdvisor(db, scenarios={"get_worker_detail": [{"worker_id": 7}]})
+    shapes = await advisor.capture_shapes()
+
+    assert [tool for tool, _, _ in shapes] == ["get_worker_detail", "get_worker_detail"]
+    assert "rd.worker_id = %s" in shapes[1][1] and shapes[1][2] == (7,)
+
+
+@pytest.mark.asyncio
+async def test_capture_covers_search_index_path_and_closes_shadow(monkeypatch):
+    db = _manager()
+    db.config.database["analytics_store"] = {"enabled": True}
+    closed = []
+    original_close = DatabaseManager.close
+
+    async def close(self):
+        closed.append(self)
+        assert self.analytics_store is None
+        await original_close(self)
+
+    monkeypatch.setattr(DatabaseManager, "close", close)
+    shapes = await IndexAdvisor(db, scenarios={"search_orders": [{"search_term": "abc"}, {"search_term": "ab"}]}).capture_shapes()
+
+    queries = [query for _, query, _ in shapes]
+    assert any("o.id IN (%s, %s)" in q for q in queries)
+    assert any("o.code LIKE %s" in q for q in queries)
+    assert len(closed) == 1 and closed[0] is not db
+
+
+@pytest.mark.asyncio
+async def test_report_flags_full_scans_and_suggests_missing_indexes():
+    db = _manager()
+
+    async def execute_query(query, params=None):
+        if "information_schema.STATISTICS" in query:
+            return [
+                {"TABLE_NAME": "readdata", "INDEX_NAME": "PRIMARY", "COLUMN_NAME": "id"},
+                {"TABLE_NAME": "readdata", "INDEX_NAME": "start_idx", "COLUMN_NAME": "start"},
+            ]
+        if "information_schema.COLUMNS" in query:
+            return [{"TABLE_NAME": "readdata", "COLUMN_NAME": c} for c in ("id", "start", "worker_id", "datum")]
+        raise AssertionError("unexpected query")
+
+    async def explain(query, params=None):
+        if "FROM readdata rd" in query:
+            return [{"table": "rd", "type": "ALL", "key": None, "rows": 250000, "Extra": "Using where"}]
+        return [{"table": "w", "type": "const", "key": "PRIMARY", "rows": 1, "Extra": None}]
+
+    db.execute_query = execute_query
+    db._explain = explain
+    report = await IndexAdvisor(db, scenarios={"get_worker_detail": [{"worker_id": 1}]}).run()
+
+    assert report["full_scan_tools"] == ["get_worker_detail"]
+    assert [i["statement"] for i in report["missing_indexes"]] == [
+        "CREATE INDEX idx_readdata_worker_id_datum ON readdata (worker_id, datum);"
+    ]
+    assert report["missing_indexes"][0]["full_scan_tools"] == ["get_worker_detail"]
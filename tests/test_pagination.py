@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_predicate, paginate
+
+KEYS = (('priorita', 'o.priorita', 'DESC'), ('start', 'o.start', 'ASC'), ('id', 'o.id', 'ASC'))
+
+
+def test_cursor_roundtrip():
+    values = {"priorita": 3, "start": "2024-05-01T08:00:00", "id": 42, "name": "Šroub"}
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+def test_invalid_cursor_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not a cursor!")
+    with pytest.raises(InvalidCursorError):
+        keyset_predicate(KEYS, {"id": 1})
+
+
+def test_keyset_predicate_mixed_directions():
+    sql, params = keyset_predicate(KEYS, {"priorita": 3, "start": "2024-05-01", "id": 42})
+    assert sql == (
+        "(((o.priorita < %s OR o.priorita IS NULL))"
+        " OR (o.priorita = %s AND o.start > %s)"
+        " OR (o.priorita = %s AND o.start = %s AND o.id > %s))"
+    )
+    assert params == [3, 3, "2024-05-01", 3, "2024-05-01", 42]
+
+
+def test_keyset_predicate_handles_nulls():
+    sql, params = keyset_predicate(KEYS, {"priorita": None, "start": None, "id": 7})
+    assert sql == "((o.priorita IS NULL AND o.start IS NOT NULL) OR (o.priorita IS NULL AND o.start IS NULL AND o.id > %s))"
+    assert params == [7]
+
+
+def test_paginate_emits_cursor_only_when_more_rows():
+    rows = [{"priorita": 1, "start": None, "id": i} for i in range(3)]
+    page, cursor = paginate(rows, 2, KEYS)
+    assert [r["id"] for r in page] == [0, 1]
+    assert decode_cursor(cursor) == {"priorita": 1, "start": None, "id": 1}
+    assert paginate(rows, 3, KEYS) == (rows, None)
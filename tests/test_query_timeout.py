@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import query_timeout
+from database import DatabaseManager
+from query_timeout import QueryTimeoutError, deadline, remaining, with_statement_timeout
+
+
+def test_statement_timeout_syntax_per_dialect():
+    query = "SELECT id FROM c_order"
+    assert with_statement_timeout(query, 2.5, "mariadb") == "SET STATEMENT max_statement_time=2.500 FOR SELECT id FROM c_order"
+    assert with_statement_timeout(query, 2.5, "mysql") == "SELECT /*+ MAX_EXECUTION_TIME(2500) */ id FROM c_order"
+    assert with_statement_timeout(query, None, "mariadb") == query
+    assert with_statement_timeout("SHOW TABLES", 5, "mariadb") == "SHOW TABLES"
+
+
+def test_deadline_is_scoped():
+    assert remaining() is None
+    assert remaining(30) == 30
+    with deadline(10):
+        assert 9 < remaining(30) <= 10
+    assert remaining() is None
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = False
+
+    def thread_id(self):
+        return 42
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_client_timeout_discards_connection_and_kills_query(monkeypatch):
+    monkeypatch.setattr(query_timeout, "CLIENT_GRACE", 0)
+    monkeypatch.setattr("database.CLIENT_GRACE", 0)
+    db = DatabaseManager(SimpleNamespace(database={"database": "emistr"}, limits={"query_timeout": 1}))
+    killed = []
+
+    async def kill_query(thread_id):
+        killed.append(thread_id)
+        return True
+
+    db.pool = SimpleNamespace(kill_query=kill_query, stats=lambda: {})
+    conn = FakeConn()
+    with pytest.raises(QueryTimeoutError):
+        await db._guarded(conn, asyncio.sleep(1), 0.01)
+    await asyncio.sleep(0)
+
+    assert conn.closed
+    assert killed == [42]
+    assert db.get_metrics()["queries"]["timeouts"] == 1
+    assert db.get_metrics()["queries"]["killed"] == 1
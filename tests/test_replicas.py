@@ -0,0 +1,134 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import aiomysql
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database import DatabaseManager
+from replicas import Replica, ReplicaSet
+
+
+class FakeCursor:
+    def __init__(self, status, legacy=False):
+        self.status = status
+        self.legacy = legacy
+        self.queries = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query):
+        self.queries.append(query)
+        if self.legacy and query == "SHOW REPLICA STATUS":
+            raise aiomysql.ProgrammingError(1064, "You have an error in your SQL syntax")
+
+    async def fetchone(self):
+        return self.status
+
+
+class FakePool:
+    is_open = True
+
+    def __init__(self, status, legacy=False):
+        self.status = status
+        self.legacy = legacy
+        self.cursors = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        def cursor(*_):
+            self.cursors.append(FakeCursor(self.status, self.legacy))
+            return self.cursors[-1]
+        yield SimpleNamespace(cursor=cursor)
+
+    def stats(self):
+        return {}
+
+
+@pytest.mark.asyncio
+async def test_replicas_are_used_only_within_lag_bound():
+    fresh = Replica("r1", FakePool({"Seconds_Behind_Master": 2}))
+    lagging = Replica("r2", FakePool({"Seconds_Behind_Master": 120}))
+    stopped = Replica("r3", FakePool({"Seconds_Behind_Master": None}))
+    replicas = ReplicaSet([fresh, lagging, stopped], max_lag=30)
+    await replicas.check_all()
+
+    assert [r.healthy for r in (fresh, lagging, stopped)] == [True, False, False]
+    assert replicas.choose() is fresh
+
+    fresh.pool.status = {"Seconds_Behind_Master": 45}
+    await replicas.check_all()
+    assert replicas.choose() is None
+
+
+
+@pytest.mark.asyncio
+async def test_lag_probe_prefers_replica_status_and_falls_back_to_slave_status():
+    current = Replica("r1", FakePool({"Seconds_Behind_Source": 3}))
+    legacy = Replica("r2", FakePool({"Seconds_Behind_Master": 4}, legacy=True))
+    await ReplicaSet([current, legacy], max_lag=30).check_all()
+
+    assert (current.healthy, current.lag) == (True, 3.0)
+    assert (legacy.healthy, legacy.lag) == (True, 4.0)
+    assert current.pool.cursors[0].queries == ["SHOW REPLICA STATUS"]
+    assert legacy.pool.cursors[0].queries == ["SHOW REPLICA STATUS", "SHOW SLAVE STATUS"]
+
+@pytest.mark.asyncio
+async def test_analytical_query_falls_back_to_primary_when_replica_fails():
+    db = DatabaseManager(SimpleNamespace(database={"database": "emistr"}))
+    replica = Replica("r1", FakePool({"Seconds_Behind_Master": 0}))
+    replica.healthy = True
+    db.replicas = ReplicaSet([replica])
+    db.pool = object()
+    used = []
+
+    async def execute_on(pool, query, params=None):
+        used.append(pool)
+        if pool is replica.pool:
+            raise ConnectionResetError("lost connection")
+        return [{"ok": 1}]
+
+    db._execute_on = execute_on
+
+    with db.tool_scope("get_order_detail"):
+        await db.execute_query("SELECT 1")
+    assert used == [db.pool]
+
+    with db.tool_scope("get_production_stats"):
+        assert await db.execute_query("SELECT 1") == [{"ok": 1}]
+    assert used[1:] == [replica.pool, db.pool]
+    assert not replica.healthy
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_to_primary_before_first_chunk():
+    db = DatabaseManager(SimpleNamespace(database={"database": "emistr"}))
+    replica = Replica("r1", FakePool({"Seconds_Behind_Master": 0}))
+    replica.healthy = True
+    db.replicas = ReplicaSet([replica])
+    db.pool = object()
+    used = []
+
+    async def stream_on(pool, sql, params, chunk_size, left):
+        used.append(pool)
+        if pool is replica.pool:
+            raise ConnectionResetError("lost connection")
+        yield [{"id": 1}]
+        yield [{"id": 2}]
+
+    db._stream_on = stream_on
+
+    with db.tool_scope("get_production_stats"):
+        chunks = [chunk async for chunk in db.stream_query("SELECT 1", chunk_size=1)]
+    assert chunks == [[{"id": 1}], [{"id": 2}]]
+    assert used == [replica.pool, db.pool]
+    assert not replica.healthy
@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from response_builder import ResponseBuilder
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_streamed_movements_match_buffered_response():
+    rows = [
+        {"id": 1, "typ_pohybu": "P", "mnozstvi": 10.0},
+        {"id": 2, "typ_pohybu": "V", "mnozstvi": 4.0},
+        {"id": 3, "typ_pohybu": "P", "mnozstvi": 2.5},
+        {"id": 4, "typ_pohybu": "V", "mnozstvi": None},
+    ]
+    builder = ResponseBuilder()
+    fragments = [f async for f in builder.stream_movements_response(_chunks(rows[:2], rows[2:]), {"material_id": 7})]
+    streamed = json.loads("".join(fragments))
+    buffered = builder.build_movements_response({"movements": rows}, {"material_id": 7})
+
+    assert streamed["data"]["items"] == rows
+    assert streamed["data"]["summary"] == buffered["data"]["summary"]
+    assert streamed["action"] == buffered["action"]
+    assert streamed["message"] == buffered["message"]
+
+
+
+@pytest.mark.asyncio
+async def test_streamed_movements_carry_database_summary_and_trend():
+    rows = [{"id": 1, "typ_pohybu": "P", "mnozstvi": 10.0}, {"id": 2, "typ_pohybu": "V", "mnozstvi": 4.0}]
+    aggregates = {
+        "summary": {
+            "movements_count": 40, "total_in": 120.0, "total_out": 30.0, "value_in": 900.0, "value_out": 210.0,
+            "by_type": [{"typ_pohybu": "P", "movements_count": 25, "total_quantity": 120.0, "total_value": 900.0},
+                        {"typ_pohybu": "V", "movements_count": 15, "total_quantity": 30.0, "total_value": 210.0}],
+        },
+        "trend": {"bucket": "month", "periods": []},
+    }
+    builder = ResponseBuilder()
+    fragments = [f async for f in builder.stream_movements_response(_chunks(rows), {"limit": 2}, aggregates)]
+    streamed = json.loads("".join(fragments))
+    buffered = builder.build_movements_response({"movements": rows, **aggregates}, {"limit": 2})
+
+    assert streamed["data"] == {**buffered["data"], "next_cursor": None}
+    assert streamed["data"]["summary"]["displayed_count"] == 2
+    assert streamed["message"] == buffered["message"] == "Nalezeno 40 pohybů materiálu (zobrazeno 2)"
+
+    error = {"error": "Neplatné období trendu: year"}
+    fragments = [f async for f in builder.stream_movements_response(_chunks(rows), {}, error)]
+    assert json.loads("".join(fragments))["status"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_streamed_movements_honour_columnar_format():
+    rows = [{"id": 1, "typ_pohybu": "P", "mnozstvi": 10.0}, {"id": 2, "typ_pohybu": "V", "mnozstvi": 4.0}]
+    filters = {"format": "columnar"}
+    builder = ResponseBuilder()
+    fragments = [f async for f in builder.stream_movements_response(_chunks(rows[:1], rows[1:]), filters)]
+    streamed = json.loads("".join(fragments))
+    buffered = builder.build_movements_response({"movements": rows}, filters)
+
+    assert streamed["data"]["items"] == buffered["data"]["items"] == {
+        "columns": ["id", "typ_pohybu", "mnozstvi"],
+        "rows": [[1, "P", 10.0], [2, "V", 4.0]],
+    }
+    assert streamed["data"]["summary"] == buffered["data"]["summary"]
+
+    fragments = [f async for f in builder.stream_movements_response(_chunks(), filters)]
+    assert json.loads("".join(fragments))["data"]["items"] == {"columns": [], "rows": []}
+
+@pytest.mark.asyncio
+async def test_streamed_movements_empty_result():
+    builder = ResponseBuilder()
+    fragments = [f async for f in builder.stream_movements_response(_chunks(), {})]
+    streamed = json.loads("".join(fragments))
+    assert streamed["data"]["items"] == []
+    assert streamed["data"]["summary"]["movements_count"] == 0
+
+
+def test_columnar_items_keep_summary_and_column_order():
+    orders = [
+        {"id": 1, "code": "Z001", "kusu": 2},
+        {"id": 2, "code": "Z002", "kusu": 5, "note": "x"},
+    ]
+    builder = ResponseBuilder()
+    rows = builder.build_orders_response({"orders": orders, "stats": {"total": 2}}, {})
+    columnar = builder.build_orders_response({"orders": orders, "stats": {"total": 2}}, {"format": "columnar"})
+
+    assert rows["data"]["items"] == orders
+    assert columnar["data"]["items"] == {
+        "columns": ["id", "code", "kusu", "note"],
+        "rows": [[1, "Z001", 2, None], [2, "Z002", 5, "x"]],
+    }
+    assert columnar["data"]["summary"] == rows["data"]["summary"]
+
+
+@pytest.mark.asyncio
+async def test_streamed_summary_runs_in_the_tool_scope_like_paged_call(monkeypatch):
+    import server
+    from types import SimpleNamespace
+    from database import DatabaseManager, _current_tool
+    from query_timeout import remaining
+
+    db = DatabaseManager(SimpleNamespace(database={"database": "emistr"},
+                                         limits={"tool_timeouts": {"get_material_movements": 30}}))
+    summaries = []
+
+    async def execute_routed(query, params=None):
+        if "GROUP BY smp.typ_pohybu" in query:
+            summaries.append((_current_tool.get(), round(remaining())))
+        return []
+
+    async def stream_query(query, params=None, chunk_size=500, timeout=None):
+        yield [{"id": 1, "typ_pohybu": "P", "mnozstvi": None}]
+
+    monkeypatch.setattr(db, "_execute_routed", execute_routed)
+    monkeypatch.setattr(db, "stream_query", stream_query)
+    monkeypatch.setattr(server, "_db", db)
+    monkeypatch.setattr(server, "_response_builder", ResponseBuilder())
+    monkeypatch.setattr(server, "_result_cache", None)
+
+    await server._call_tool("get_material_movements", {"material_id": 7})
+    fragments = [f async for f in server.stream_tool("get_material_movements", {"material_id": 7, "stream": True})]
+
+    assert summaries == [("get_material_movements", 30)] * 2
+    assert json.loads("".join(fragments))["data"]["items"] == [{"id": 1, "typ_pohybu": "P", "mnozstvi": None}]
+    assert _current_tool.get() is None
+
+
+def test_columnar_workers_stats_converts_only_the_outer_list():
+    entries = [
+        {"worker": {"id": 1, "name": "Novák"}, "stats": {"orders_count": 2, "total_hours": 5.0}},
+        {"worker": {"id": 2, "name": "Svoboda"}, "stats": {"orders_count": 0, "total_hours": 0.0}},
+    ]
+    builder = ResponseBuilder()
+    columnar = builder.build_workers_stats_response({"workers": entries, "days": 30}, {"format": "columnar"})
+    rows = builder.build_workers_stats_response({"workers": entries, "days": 30}, {})
+
+    assert columnar["data"]["items"] == {
+        "columns": ["worker", "stats"],
+        "rows": [[e["worker"], e["stats"]] for e in entries],
+    }
+    assert columnar["data"]["summary"] == rows["data"]["summary"]
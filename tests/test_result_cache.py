@@ -0,0 +1,60 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from result_cache import ResultCache, TableChangeWatcher, make_key
+
+
+def test_cache_key_ignores_argument_order_and_empty_values():
+    assert make_key("get_orders", {"status": "active", "limit": 10}) == \
+        make_key("get_orders", {"limit": 10, "status": "active", "customer_id": None})
+    assert make_key("get_orders", {"limit": 10}) != make_key("get_workers", {"limit": 10})
+
+
+def test_cache_expires_and_evicts_lru():
+    cache = ResultCache(max_entries=2, tool_ttls={"get_orders": 60, "get_machines": 0})
+    cache.set("a", "get_orders", 1)
+    cache.set("b", "get_orders", 2)
+    assert cache.get("a") == (True, 1)
+    cache.set("c", "get_orders", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+
+    cache.set("m", "get_machines", 4)
+    assert cache.get("m") == (False, None)
+
+    cache._entries["a"] = (0, "get_orders", 1)
+    assert cache.get("a") == (False, None)
+
+
+class FakeDB:
+    def __init__(self):
+        self.config = SimpleNamespace(database={"database": "emistr"})
+        self.update_time = "2024-01-01 10:00:00"
+
+    async def execute_query(self, query, params=None):
+        if "information_schema.TABLES" in query:
+            return [{"TABLE_NAME": "c_order", "UPDATE_TIME": self.update_time}]
+        return [{"wm": 1}]
+
+
+@pytest.mark.asyncio
+async def test_watcher_invalidates_tools_reading_changed_table():
+    db = FakeDB()
+    cache = ResultCache()
+    watcher = TableChangeWatcher(db, cache, tables=["c_order", "stroje"])
+    assert await watcher.poll_once() == []
+
+    cache.set(make_key("get_orders", {}), "get_orders", {"orders": []})
+    cache.set(make_key("get_machines", {}), "get_machines", {"machines": []})
+    db.update_time = "2024-01-01 10:05:00"
+
+    assert await watcher.poll_once() == ["c_order"]
+    assert cache.get(make_key("get_orders", {}))[0] is False
+    assert cache.get(make_key("get_machines", {}))[0] is True
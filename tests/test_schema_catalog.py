@@ -0,0 +1,53 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from schema_catalog import SchemaCatalog
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.config = SimpleNamespace(database={"database": "emistr"})
+        self.rows = rows
+        self.calls = 0
+
+    async def execute_query(self, query, params=None):
+        self.calls += 1
+        return self.rows
+
+
+@pytest.mark.asyncio
+async def test_catalog_serves_lookups_from_memory():
+    db = FakeDB([
+        {"TABLE_NAME": "material", "COLUMN_NAME": "id", "DATA_TYPE": "int"},
+        {"TABLE_NAME": "material", "COLUMN_NAME": "cena_nakup", "DATA_TYPE": "decimal"},
+        {"TABLE_NAME": "readdata", "COLUMN_NAME": "start", "DATA_TYPE": "datetime"},
+        {"TABLE_NAME": "operation", "COLUMN_NAME": "user_price", "DATA_TYPE": "decimal"},
+    ])
+    catalog = SchemaCatalog(db, ttl=3600)
+    await catalog.load()
+    await catalog.ensure_fresh()
+
+    assert db.calls == 1
+    assert catalog.has_column("material", "cena_nakup")
+    assert not catalog.has_column("material", "vydano_mnozstvi")
+    assert catalog.datetime_columns("readdata") == ["start"]
+    assert catalog.capabilities["material.vydano_mnozstvi"] is False
+    assert catalog.capabilities["operation.user_price"] is True
+
+
+@pytest.mark.asyncio
+async def test_catalog_reloads_after_ttl():
+    db = FakeDB([])
+    catalog = SchemaCatalog(db, ttl=0.0001)
+    await catalog.load()
+    catalog._checked_at -= 1
+    await catalog.ensure_fresh()
+    assert db.calls == 2
+    assert catalog.version == 2
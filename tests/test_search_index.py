@@ -0,0 +1,111 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from search_index import OrderSearchIndex, TrigramIndex
+
+
+def test_trigram_index_matches_substrings_without_accents_or_case():
+    index = TrigramIndex(fold_accents=True)
+    index.add(1, ["Z-100", "Šroubovák", "Železárny", None, ""], "2024-01-01")
+    index.add(2, ["Z-200", "Podložka", "Šroubárna s.r.o.", None, ""], "2024-03-01")
+    index.add(3, ["Z-300", "Hřídel", "Kovo", None, "šroub M8"], None)
+
+    assert index.search("SROUB") == [2, 1, 3]
+    assert index.search("zelez") == [1]
+    assert index.search("z-") is None
+
+    index.remove(2)
+    assert index.search("sroub", limit=1) == [1]
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.catalog = None
+
+    async def stream_query(self, query, params=None, chunk_size=500):
+        yield list(self.rows)
+
+    async def execute_query(self, query, params=None):
+        if "o.last_change > %s" in query:
+            return [r for r in self.rows if r["last_change"] > params[0] and r["id"] <= params[1]]
+        return [r for r in self.rows if r["id"] > params[0]]
+
+
+@pytest.mark.asyncio
+async def test_order_index_picks_up_new_orders_on_refresh():
+    db = FakeDB([{"id": 1, "start": "2024-01-01", "code": "A1", "name": "Rám stolu"}])
+    index = OrderSearchIndex(db)
+    assert index.search("stolu") is None
+
+    await index.build()
+    assert index.search("stolu") == [1]
+
+    db.rows.append({"id": 2, "start": "2024-02-01", "code": "A2", "name": "Noha stolu"})
+    assert await index.refresh() == 1
+    assert index.search("stolu") == [2, 1]
+
+
+class FakeCatalog:
+    def existing_columns(self, table, candidates):
+        return ["last_change"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_reads_new_and_changed_orders_without_or():
+    db = FakeDB([
+        {"id": 1, "start": "2024-01-01", "code": "A1", "name": "Rám stolu", "_changed": 5, "last_change": 5},
+        {"id": 2, "start": "2024-01-02", "code": "A2", "name": "Noha", "_changed": 6, "last_change": 6},
+    ])
+    db.catalog = FakeCatalog()
+    queries = []
+    execute_query = db.execute_query
+
+    async def recording(query, params=None):
+        queries.append(query)
+        return await execute_query(query, params)
+
+    db.execute_query = recording
+    index = OrderSearchIndex(db)
+    await index.build()
+
+    db.rows[0].update(name="Rám židle", _changed=7, last_change=7)
+    db.rows.append({"id": 3, "start": "2024-01-03", "code": "A3", "name": "Sedák židle", "_changed": 8, "last_change": 8})
+    assert await index.refresh() == 2
+    assert index.search("židle") == [3, 1]
+    assert not any(" OR " in q for q in queries)
+
+
+@pytest.mark.asyncio
+async def test_search_orders_verifies_candidates_and_falls_back_to_like():
+    from types import SimpleNamespace
+    from database import DatabaseManager
+
+    db = DatabaseManager(SimpleNamespace(database={"database": "emistr"}))
+    # Index ještě zná zakázky 3 a 4, které byly smazány / už term neobsahují
+    db.search_index = SimpleNamespace(search=lambda term, limit: [1, 2, 3, 4][:limit])
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append((query, params))
+        if "o.id IN" in query:
+            return [{"id": i} for i in params[:4] if i in (1,)]
+        return [{"id": 1}, {"id": 5}]
+
+    db.execute_query = execute_query
+
+    result = await db.search_orders("šroub", limit=2)
+    assert "o.code LIKE %s" in queries[0][0] and queries[0][1][-1] == 2
+    assert queries[0][1][:4] == (1, 2, 3, 4)
+    assert [o["id"] for o in result["orders"]] == [1, 5]
+    assert "o.id IN" not in queries[1][0]
+
+    queries.clear()
+    result = await db.search_orders("šroub", limit=3)
+    assert len(queries) == 1 and [o["id"] for o in result["orders"]] == [1]
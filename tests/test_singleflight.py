@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: work(1)),
+        flight.do("a", lambda: work(2)),
+        flight.do("b", lambda: work(3)),
+    )
+
+    assert calls == [1, 3]
+    assert results[0] is results[1]
+    assert results[2] == {"value": 3}
+    assert flight.stats() == {"in_flight": 0, "executed": 2, "coalesced": 1}
+
+    # Po dokončení se výsledek nedrží - další volání běží znovu
+    await flight.do("a", lambda: work(4))
+    assert calls == [1, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_work():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def work():
+        started.set()
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("k", work))
+    await started.wait()
+    second = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    release.set()
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_last_cancelled_waiter_cancels_work_and_errors_are_shared():
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(flight.do("e", failing), flight.do("e", failing), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,44 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from slow_query_log import SlowQueryLog, fingerprint
+
+
+def test_fingerprint_normalises_literals_and_in_lists():
+    a = fingerprint("SELECT *  FROM c_order o\n WHERE o.id IN (%s, %s, %s) AND o.code = 'Z-1' LIMIT 10")
+    b = fingerprint("SELECT * FROM c_order o WHERE o.id IN (%s) AND o.code = 'X' LIMIT 50")
+    assert a == b == "SELECT * FROM c_order o WHERE o.id IN (...) AND o.code = ? LIMIT ?"
+
+
+@pytest.mark.asyncio
+async def test_slow_statements_are_logged_with_explain(tmp_path):
+    explained = []
+
+    async def explain(query, params):
+        explained.append(params)
+        return [{"table": "c_order", "type": "ALL", "rows": 120000}]
+
+    log_file = tmp_path / "slow.jsonl"
+    log = SlowQueryLog({"threshold_ms": 100, "file": str(log_file)}, explain=explain)
+    log.record("SELECT * FROM c_order WHERE name LIKE %s", ("%Novák%",), 0.02, 5, "search_orders")
+    log.record("SELECT * FROM c_order WHERE name LIKE %s", ("%Svoboda%",), 0.4, 7, "search_orders")
+    log.record("SELECT * FROM worker WHERE id = %s", (1,), 0.001, 1, "get_worker_detail")
+    await asyncio.sleep(0)
+
+    worst = log.worst(limit=1)
+    assert worst[0]["count"] == 2 and worst[0]["slow_count"] == 1
+    assert worst[0]["explain"][0]["type"] == "ALL"
+    assert explained == [("%Svoboda%",)]
+
+    entries = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert len(entries) == 1
+    assert entries[0]["rows"] == 7
+    assert "Svoboda" not in log_file.read_text(encoding="utf-8")
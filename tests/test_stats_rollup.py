@@ -0,0 +1,100 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from stats_rollup import DailyRollup, parse_day
+
+
+class FakeDB:
+    def __init__(self):
+        self.queries = []
+
+    async def _gather(self, *coros):
+        return [await c for c in coros]
+
+    async def execute_query(self, query, params=None):
+        self.queries.append(params)
+        start = date.fromisoformat(params[0])
+        end = date.fromisoformat(params[1])
+        days = [start + timedelta(days=i) for i in range((end - start).days)]
+        if "op.name" in query:
+            return [
+                {"date": d.isoformat(), "name": name, "count": 1, "total_hours": hours}
+                for d in days for name, hours in (("Soustružení", 2.0), ("Frézování", 1.0))
+            ]
+        return [{"date": d.isoformat(), "total_hours": 3.0, "workers_count": 1, "orders_count": 1} for d in days]
+
+
+@pytest.mark.asyncio
+async def test_closed_days_are_computed_once_and_merged():
+    db = FakeDB()
+    rollup = DailyRollup(db, settle_days=1)
+    daily, top = await rollup.get_range(date(2024, 1, 1), date(2024, 1, 3))
+    assert [d["date"] for d in daily] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert top[0] == {"name": "Soustružení", "count": 3, "total_hours": 6.0}
+    assert len(db.queries) == 2
+
+    # Rozšířený rozsah dopočítá jen chybějící den
+    daily, top = await rollup.get_range(date(2024, 1, 1), date(2024, 1, 4))
+    assert len(daily) == 4
+    assert db.queries[-1] == ("2024-01-04", "2024-01-05")
+    assert top[1] == {"name": "Frézování", "count": 4, "total_hours": 4.0}
+
+
+@pytest.mark.asyncio
+async def test_open_days_are_always_recomputed():
+    db = FakeDB()
+    rollup = DailyRollup(db, settle_days=1)
+    today = date.today()
+    await rollup.get_range(today, today)
+    await rollup.get_range(today, today)
+    assert len(db.queries) == 4
+    assert rollup.stats()["cached_days"] == 0
+
+
+def test_parse_day_rejects_timestamps():
+    assert parse_day("2024-05-01") == date(2024, 5, 1)
+    assert parse_day("2024-05-01 12:00:00") is None
+
+
+@pytest.mark.asyncio
+async def test_ranges_longer_than_cache_skip_the_rollup():
+    from types import SimpleNamespace
+    from database import DatabaseManager
+
+    db = DatabaseManager(SimpleNamespace(database={"database": "emistr", "stats_rollup": {"max_days": 30}}))
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append(params)
+        return []
+
+    db.execute_query = execute_query
+    assert db.stats_rollup.covers(date(2024, 1, 1), date(2024, 1, 30))
+    assert not db.stats_rollup.covers(date(1900, 1, 1), date(2100, 12, 31))
+
+    await db.get_production_stats("1900-01-01", "2100-12-31")
+    assert queries == [("1900-01-01", "2100-12-31")] * 2
+    assert db.stats_rollup.stats()["cached_days"] == 0
+
+
+@pytest.mark.asyncio
+async def test_days_without_rows_are_cached_without_own_buckets():
+    class EmptyDB(FakeDB):
+        async def execute_query(self, query, params=None):
+            self.queries.append(params)
+            return []
+
+    db = EmptyDB()
+    rollup = DailyRollup(db, settle_days=1)
+    assert await rollup._compute(date(2024, 1, 1), date(2024, 1, 31)) == {}
+    await rollup.get_range(date(2024, 2, 1), date(2024, 2, 10))
+    await rollup.get_range(date(2024, 2, 1), date(2024, 2, 10))
+    assert len(db.queries) == 4
+    assert rollup.stats()["cached_days"] == 10
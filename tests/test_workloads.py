@@ -0,0 +1,51 @@
+import os
+import sys
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database import DatabaseManager
+
+
+def _manager():
+    return DatabaseManager(SimpleNamespace(
+        database={
+            "database": "emistr",
+            "workloads": {
+                "interactive": {"timeout": 5},
+                "analytics": {"timeout": 120},
+            },
+            "tool_workloads": {"get_machines": "interactive"},
+        },
+        limits={"query_timeout": 30, "tool_timeouts": {"get_order_detail": 3}},
+    ))
+
+
+def test_tools_are_assigned_to_workload_classes():
+    workloads = _manager().workloads
+    assert workloads.workload_for("get_order_detail") == "interactive"
+    assert workloads.workload_for("get_machines") == "interactive"
+    assert workloads.workload_for("get_production_stats") == "analytics"
+    assert workloads.workload_for("get_orders") == "default"
+    assert workloads.workload_for(None, streaming=True) == "analytics"
+
+
+def test_timeouts_prefer_tool_then_class_then_default():
+    db = _manager()
+    assert db.timeout_for("get_order_detail") == 3
+    assert db.timeout_for("search_orders") == 5
+    assert db.timeout_for("get_production_stats") == 120
+    assert db.timeout_for("get_orders") == 30
+
+
+def test_queries_use_the_class_pool():
+    db = _manager()
+    db.pool = "primary"
+    db.workloads._pools["analytics"] = "analytics-pool"
+    with db.tool_scope("get_production_stats"):
+        assert db._route() == ("analytics-pool", None)
+    with db.tool_scope("get_order_detail"):
+        # Třída bez vlastního poolu -> primární pool
+        assert db._route() == ("primary", None)
@@ -0,0 +1,91 @@
+"""
+Workload Classes pro eMISTR MCP Server
+Každý tool patří do třídy zátěže; třída má vlastní pool (velikost, hloubka fronty),
+časový limit a nastavení session, takže těžké analytické dotazy neblokují
+rychlé interaktivní lookupy
+"""
+
+import logging
+from typing import Dict, Any, Optional
+
+from db_pool import ManagedPool
+
+logger = logging.getLogger('emistr-mcp.workloads')
+
+
+DEFAULT_WORKLOAD = "default"
+
+# Streamy (velké výpisy, stavba indexu) bez explicitní třídy patří mezi těžké dotazy
+STREAM_WORKLOAD = "analytics"
+
+DEFAULT_TOOL_WORKLOADS = {
+    "get_order_detail": "interactive",
+    "get_order_details": "interactive",
+    "get_worker_detail": "interactive",
+    "search_orders": "interactive",
+    "get_production_stats": "analytics",
+    "get_workers_stats": "analytics",
+    "export_data": "analytics",
+    "index_advice": "analytics",
+}
+
+
+class WorkloadManager:
+    """Pooly a parametry tříd zátěže (database.workloads).
+
+    Třída bez konfigurace (a třída 'default') používá primární pool, takže bez
+    sekce workloads se chování nemění. Konfigurace třídy:
+    pool (jako database.pool), queue_depth, timeout, init_command, use_replicas.
+    """
+
+    def __init__(self, workloads: Optional[Dict[str, Dict[str, Any]]] = None, tool_workloads: Optional[Dict[str, str]] = None):
+        self.config: Dict[str, Dict[str, Any]] = dict(workloads or {})
+        self.tool_workloads = dict(DEFAULT_TOOL_WORKLOADS)
+        self.tool_workloads.update(tool_workloads or {})
+        self._pools: Dict[str, ManagedPool] = {}
+
+    def workload_for(self, tool: Optional[str], streaming: bool = False) -> str:
+        if tool in self.tool_workloads:
+            return self.tool_workloads[tool]
+        return STREAM_WORKLOAD if streaming else DEFAULT_WORKLOAD
+
+    async def open(self, conn_kwargs: Dict[str, Any], default_pool_config: Optional[Dict[str, Any]] = None) -> None:
+        """Otevře pooly nakonfigurovaných tříd (kromě 'default', ta je primární pool)"""
+        for name, cfg in self.config.items():
+            if name == DEFAULT_WORKLOAD:
+                continue
+            kwargs = dict(conn_kwargs)
+            if cfg.get('init_command'):
+                kwargs['init_command'] = cfg['init_command']
+            pool_config = dict(default_pool_config or {})
+            pool_config.update(cfg.get('pool') or {})
+            if cfg.get('queue_depth') is not None:
+                pool_config['queue_depth'] = cfg['queue_depth']
+            pool = ManagedPool(name, kwargs, pool_config)
+            await pool.open()
+            self._pools[name] = pool
+        if self._pools:
+            logger.info("Workload pools: %s", ", ".join(
+                f"{name}({pool.stats()['maxsize']})" for name, pool in self._pools.items()))
+
+    def pool(self, workload: str) -> Optional[ManagedPool]:
+        """Pool třídy; None = primární pool"""
+        return self._pools.get(workload)
+
+    def timeout(self, workload: str) -> Optional[float]:
+        value = self.config.get(workload, {}).get('timeout')
+        return float(value) if value is not None else None
+
+    def uses_replicas(self, workload: str) -> bool:
+        return bool(self.config.get(workload, {}).get('use_replicas', False))
+
+    async def close(self) -> None:
+        for pool in self._pools.values():
+            try:
+                await pool.close()
+            except Exception:
+                logger.exception("Error while closing workload pool '%s'", pool.name)
+        self._pools.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: pool.stats() for name, pool in self._pools.items()}